@@ -0,0 +1,181 @@
+from .api import Analytics
+from .backends import (
+    CHART_QUERIES,
+    QUERY_BACKEND,
+    QUERY_BACKENDS,
+    DuckDBBackend,
+    PandasBackend,
+    SQLBackend,
+    SQLiteBackend,
+    compare_backends,
+    open_backend,
+)
+from .charts import MAX_CHART_POINTS, ChartTooLarge, chart_points, check_chart, histogram_bins
+from .chunked import CHUNK_ROWS, ChunkedDataset, append_partitioned, build_partitioned, open_partitioned
+from .cube import CUBE_KEYS, DELIVERY_STATUS, SalesCube, delivery_status_counts, rollup, rollup_mean
+from .delivery import DELIVERY_DIMENSIONS, delivery_performance, delivery_rates
+from .derived import DATASET_SUMMARIES, DerivedSummaries
+from .figures import (
+    CHART_TABS,
+    DELAY_BREAKDOWNS,
+    DELIVERY_COLORS,
+    RESOLUTION_LABELS,
+    category_sales_figure,
+    country_sales_figure,
+    delay_breakdown_figure,
+    delivery_status_figure,
+    market_shipping_time_figure,
+    profit_trend_figure,
+    region_delivery_figure,
+    region_sales_figure,
+    sales_trend_figure,
+    segment_average_sales_figure,
+    segment_sales_figure,
+    shipping_mode_figure,
+    shipping_profit_figure,
+    shipping_time_figure,
+    shipping_time_histogram_figure,
+    tab_figures,
+    top_customers_figure,
+)
+from .filters import FILTER_DIMENSIONS, FilterIndex, take_rows
+from .ingest import (
+    CACHE_DIR,
+    build_cache,
+    dataset_version,
+    extend_cache,
+    load_dataset,
+    load_memory_report,
+    load_snapshot,
+    source_change,
+    source_signature,
+    source_watermark,
+)
+from .memo import AGGREGATION_CACHE_MB, AggregationCache, state_key
+from .paging import SORT_INDEX_COLUMNS, SortIndex, sort_order
+from .prefix import PREFIX_MEASURES, PrefixIndex, cube_totals, period_totals, previous_period
+from .profiling import PROFILE_LOG, PROFILE_MODE, SectionProfiler
+from .refresh import LiveDataset
+from .schema import CATEGORY_COLUMNS, add_derived_columns, apply_schema, extend_frame, memory_report
+from .shared import SharedDataset, frame_fingerprint
+from .sketches import DISTINCT_COLUMNS, EXACT_THRESHOLD, DistinctSketches, count_distinct
+from .stats import STATS_EXACT_ROWS, SummaryStatistics, measure_columns
+from .store import FrameStore, PartitionedStore
+from .synthetic import SOURCE_COLUMNS, synthetic_frame, synthetic_table, write_synthetic_csv
+from .topk import TOP_K, TOP_PARTITION_DIMENSIONS, PartitionTotals, top_k, top_k_series
+from .trends import TREND_MAX_POINTS, WEBGL_MIN_POINTS, TimeBuckets, downsample, lttb, pick_resolution, source_points
+
+__all__ = [
+    'AGGREGATION_CACHE_MB',
+    'AggregationCache',
+    'Analytics',
+    'CACHE_DIR',
+    'CATEGORY_COLUMNS',
+    'CHART_QUERIES',
+    'CHART_TABS',
+    'CHUNK_ROWS',
+    'CUBE_KEYS',
+    'ChartTooLarge',
+    'ChunkedDataset',
+    'DATASET_SUMMARIES',
+    'DELAY_BREAKDOWNS',
+    'DELIVERY_COLORS',
+    'DELIVERY_DIMENSIONS',
+    'DELIVERY_STATUS',
+    'DISTINCT_COLUMNS',
+    'DerivedSummaries',
+    'DistinctSketches',
+    'DuckDBBackend',
+    'EXACT_THRESHOLD',
+    'FILTER_DIMENSIONS',
+    'FilterIndex',
+    'FrameStore',
+    'LiveDataset',
+    'MAX_CHART_POINTS',
+    'PREFIX_MEASURES',
+    'PROFILE_LOG',
+    'PROFILE_MODE',
+    'PandasBackend',
+    'PartitionTotals',
+    'PartitionedStore',
+    'PrefixIndex',
+    'QUERY_BACKEND',
+    'QUERY_BACKENDS',
+    'RESOLUTION_LABELS',
+    'SORT_INDEX_COLUMNS',
+    'SOURCE_COLUMNS',
+    'SQLBackend',
+    'SQLiteBackend',
+    'STATS_EXACT_ROWS',
+    'SalesCube',
+    'SectionProfiler',
+    'SharedDataset',
+    'SortIndex',
+    'SummaryStatistics',
+    'TOP_K',
+    'TOP_PARTITION_DIMENSIONS',
+    'TREND_MAX_POINTS',
+    'TimeBuckets',
+    'WEBGL_MIN_POINTS',
+    'add_derived_columns',
+    'append_partitioned',
+    'apply_schema',
+    'build_cache',
+    'build_partitioned',
+    'category_sales_figure',
+    'chart_points',
+    'check_chart',
+    'compare_backends',
+    'count_distinct',
+    'country_sales_figure',
+    'cube_totals',
+    'dataset_version',
+    'delay_breakdown_figure',
+    'delivery_performance',
+    'delivery_rates',
+    'delivery_status_counts',
+    'delivery_status_figure',
+    'downsample',
+    'extend_cache',
+    'extend_frame',
+    'frame_fingerprint',
+    'histogram_bins',
+    'load_dataset',
+    'load_memory_report',
+    'load_snapshot',
+    'lttb',
+    'market_shipping_time_figure',
+    'measure_columns',
+    'memory_report',
+    'open_backend',
+    'open_partitioned',
+    'period_totals',
+    'pick_resolution',
+    'previous_period',
+    'profit_trend_figure',
+    'region_delivery_figure',
+    'region_sales_figure',
+    'rollup',
+    'rollup_mean',
+    'sales_trend_figure',
+    'segment_average_sales_figure',
+    'segment_sales_figure',
+    'shipping_mode_figure',
+    'shipping_profit_figure',
+    'shipping_time_figure',
+    'shipping_time_histogram_figure',
+    'sort_order',
+    'source_change',
+    'source_points',
+    'source_signature',
+    'source_watermark',
+    'state_key',
+    'synthetic_frame',
+    'synthetic_table',
+    'tab_figures',
+    'take_rows',
+    'top_customers_figure',
+    'top_k',
+    'top_k_series',
+    'write_synthetic_csv',
+]
@@ -0,0 +1,180 @@
+import threading
+
+from .backends import QUERY_BACKEND, open_backend
+from .charts import histogram_bins
+from .chunked import CHUNK_ROWS
+from .filters import FILTER_DIMENSIONS
+from .ingest import CACHE_DIR
+from .prefix import PrefixIndex, period_totals, previous_period
+from .refresh import LiveDataset
+from .sketches import count_distinct
+from .stats import STATS_EXACT_ROWS, measure_columns
+from .trends import TimeBuckets, pick_resolution
+from .trends import downsample as downsample_series
+
+
+class Analytics:
+    """The dashboard's filters and aggregations on one dataset snapshot, without any UI.
+
+    Every query takes the sidebar filters as ``date_range`` plus one keyword per
+    dimension, like the stores. Derived indexes (prefix sums, time buckets, and the
+    dataset's summary statistics) are built on first use and shared by all callers; results
+    are not cached here, so the dashboard memoizes them per filter state.
+    """
+
+    def __init__(self, dataset, backend=None, derived=None):
+        self.dataset = dataset
+        self.version = dataset.version
+        self.store = dataset.store
+        self.cube = dataset.cube
+        self.sketches = dataset.sketches
+        self.backend = backend if backend is not None else open_backend(QUERY_BACKEND, dataset)
+        self._derived = dict(derived or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path, mode='memory', backend=QUERY_BACKEND, cache_dir=CACHE_DIR, chunksize=CHUNK_ROWS):
+        """Load (or reuse the cache of) a CSV file, as the dashboard does."""
+        dataset = LiveDataset(path, mode=mode, cache_dir=cache_dir, chunksize=chunksize).current()
+        return cls(dataset, open_backend(backend, dataset))
+
+    def _get(self, name, build):
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = build()
+            return self._derived[name]
+
+    @property
+    def prefix_index(self):
+        return self._get('prefix_index', lambda: PrefixIndex(self.cube))
+
+    @property
+    def time_buckets(self):
+        return self._get('time_buckets', lambda: TimeBuckets.from_cube(self.cube))
+
+    @property
+    def summary_statistics(self):
+        # Kept on the dataset, so a snapshot with appended rows extends it instead of rebuilding
+        return self.dataset.summaries.get('summary_statistics', self.store)
+
+    def warm(self):
+        """Build every derived index and dataset summary the charts use now instead of on first use; returns self."""
+        for name in ('prefix_index', 'time_buckets'):
+            getattr(self, name)
+        for name in self.dataset.summaries.kinds:
+            self.dataset.summaries.get(name, self.store)
+        return self
+
+    def prebuilt(self):
+        """The warmed indexes and summaries of the dataset and of this object, picklable.
+
+        Everything but the rows, which another process maps from the same cache; the
+        report workers are rebuilt from it instead of scanning the data again.
+        """
+        self.warm()
+        with self._lock:
+            derived = dict(self._derived)
+        return {'dataset': self.dataset.prebuilt(), 'derived': derived}
+
+    # Filters
+
+    @property
+    def columns(self):
+        return self.store.columns
+
+    def date_bounds(self):
+        return self.store.date_bounds()
+
+    def options(self, dim, date_range=None, **selections):
+        """Values of ``dim`` that have rows under the filters."""
+        return self.store.options(dim, date_range, **selections)
+
+    def select(self, date_range=None, **choices):
+        """Filters for sidebar choices, applied in the order the sidebar cascades.
+
+        A choice that has no rows under the filters before it is dropped, as the
+        sidebar would not offer it. Returns the filters as keyword arguments.
+        """
+        selection = {}
+        if date_range is not None and 'order_date' in self.columns:
+            selection['date_range'] = tuple(date_range)
+        for dim in FILTER_DIMENSIONS:
+            value = choices.get(dim)
+            if dim in self.columns and value not in (None, 'All') and value in self.options(dim, **selection):
+                selection[dim] = value
+        return selection
+
+    def count(self, date_range=None, **selections):
+        return self.store.count(date_range, **selections)
+
+    # Aggregations
+
+    def kpi_totals(self, date_range=None, **selections):
+        """Totals of the additive measures and delivery statuses, from the prefix index."""
+        return period_totals(self.prefix_index, self.cube, date_range, **selections)
+
+    def previous_kpi_totals(self, date_range=None, **selections):
+        """Totals over the same-length period just before ``date_range``; None without one or without rows."""
+        if date_range is None:
+            return None
+        previous = self.kpi_totals(previous_period(date_range), **selections)
+        return previous if previous['rows'] > 0 else None
+
+    def distinct_count(self, column, date_range=None, **selections):
+        """Distinct count of ``column`` and its relative standard error (0.0 when exact)."""
+        return count_distinct(self.sketches, column, self.store, date_range=date_range, **selections)
+
+    def trend_resolution(self, date_range=None):
+        """Resolution picked for a trend over ``date_range`` (the whole data span by default)."""
+        start, end = date_range if date_range is not None else self.date_bounds()
+        return pick_resolution((end - start).days + 1)
+
+    def trend(self, measure, resolution=None, date_range=None, downsample=True, **selections):
+        """Sum of a measure per day, week or month start.
+
+        With ``downsample``, a series longer than the point budget (TREND_MAX_POINTS)
+        is reduced with LTTB and keeps its original length in ``attrs['points']``.
+        """
+        resolution = resolution or self.trend_resolution(date_range)
+        daily = self.backend.daily(measure, date_range, **selections)
+        series = self.time_buckets.series(daily, measure, resolution)
+        return downsample_series(series) if downsample else series
+
+    def rollup(self, by, measure, date_range=None, **selections):
+        return self.backend.rollup(by, measure, date_range, **selections)
+
+    def rollup_mean(self, by, measure, date_range=None, **selections):
+        return self.backend.rollup_mean(by, measure, date_range, **selections)
+
+    def delivery_performance(self, date_range=None, **selections):
+        """Early/on-time/delayed counts for every breakdown dimension."""
+        return self.backend.delivery_performance(date_range=date_range, **selections)
+
+    def top_customers(self, k, date_range=None, **selections):
+        return self.backend.top_customers(k, date_range, **selections)
+
+    def histogram(self, column, nbins=30, date_range=None, **selections):
+        return histogram_bins(self.store.read([column], date_range, **selections)[column].to_numpy(), nbins)
+
+    def statistics(self, date_range=None, **selections):
+        """describe()-style table of the measure columns, and whether its quartiles are estimated.
+
+        Selections above STATS_EXACT_ROWS rows are answered from the per-partition
+        summaries when they can be; returns (None, False) without measure columns.
+        """
+        numeric_cols = measure_columns(self.store.numeric_columns)
+        if not numeric_cols:
+            return None, False
+        stats_df = None
+        if self.count(date_range, **selections) > STATS_EXACT_ROWS:
+            stats_df = self.summary_statistics.query(self.store, date_range, **selections)
+        estimated = stats_df is not None
+        if not estimated:
+            stats_df = self.store.read(numeric_cols, date_range, **selections).describe().T
+        stats_df = stats_df.reset_index()
+        stats_df.columns = ['Metric'] + list(stats_df.columns[1:])
+        return stats_df, estimated
+
+    def page(self, columns, start, stop, sort_by=None, descending=False, date_range=None, **selections):
+        """Rows ``start:stop`` of the selection, optionally sorted by a column."""
+        return self.store.page(columns, start, stop, sort_by, descending, date_range, **selections)
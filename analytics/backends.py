@@ -0,0 +1,337 @@
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from .chunked import ChunkedDataset
+from .cube import CUBE_KEYS, DELIVERY_STATUS, SUM_MEASURES, day_to_date, rollup, rollup_mean
+from .delivery import DELIVERY_DIMENSIONS, delivery_performance
+from .filters import to_day_number
+from .store import _active, _selection_key
+from .topk import top_k
+
+# Engine for the chart aggregations: 'pandas' (cube roll-ups), 'duckdb' or 'sqlite'
+QUERY_BACKEND = os.environ.get('DASHBOARD_QUERY_BACKEND', 'pandas')
+
+QUERY_BACKENDS = ['pandas', 'duckdb', 'sqlite']
+
+# Row-level columns the SQL engines need for the chart queries
+QUERY_COLUMNS = [key for key in CUBE_KEYS if key != 'order_day'] + SUM_MEASURES + ['customer_id', 'order_date']
+
+
+def _delivery_frame(counts, dim):
+    # Long (value, label, rows) counts into the layout of delivery_performance
+    statuses = sorted(DELIVERY_STATUS.values())
+    # observed=True: DuckDB returns categoricals, and labels without rows are dropped below anyway
+    frame = counts.pivot_table(index=dim, columns='label', values='rows', aggfunc='sum', fill_value=0, observed=True)
+    frame.columns = frame.columns.map(DELIVERY_STATUS)
+    frame = frame.reindex(columns=statuses, fill_value=0).astype(np.int64)
+    frame.columns.name = None
+    frame['Total'] = frame.sum(axis=1)
+    return frame[frame['Total'] > 0]
+
+
+class PandasBackend:
+    """Chart aggregations in pandas: roll-ups of the cube cells matching the filters.
+
+    Top customers come from the dataset's per-partition totals, read from the row
+    store only for filters on non-partition dimensions.
+    """
+
+    name = 'pandas'
+
+    def __init__(self, dataset):
+        self.cube = dataset.cube
+        self.store = dataset.store
+        self.summaries = dataset.summaries
+        self._last = (None, None)
+
+    def cells(self, date_range=None, **selections):
+        """Cube cells matching the filters; the last selection is memoized."""
+        key = _selection_key(date_range, **selections)
+        last_key, last_cells = self._last
+        if key == last_key:
+            return last_cells
+        cells = self.cube.slice(date_range, **selections)
+        self._last = (key, cells)
+        return cells
+
+    def rollup(self, by, measure, date_range=None, **selections):
+        return rollup(self.cells(date_range, **selections), by, measure)
+
+    def rollup_mean(self, by, measure, date_range=None, **selections):
+        return rollup_mean(self.cells(date_range, **selections), by, measure)
+
+    def daily(self, measure, date_range=None, **selections):
+        return self.cells(date_range, **selections)[['order_day', measure]]
+
+    def delivery_performance(self, dimensions=DELIVERY_DIMENSIONS, date_range=None, **selections):
+        return delivery_performance(self.cells(date_range, **selections), dimensions)
+
+    def customer_totals(self):
+        # Built on first use (it grows with the number of customers), then extended on appends
+        return self.summaries.get('customer_totals', self.store)
+
+    def top_customers(self, k, date_range=None, **selections):
+        top_customers = self.customer_totals().query(k, self.store, date_range, **selections)
+        if top_customers is None:
+            # Filtered on region or category, which are not partitions: sum the selected rows
+            rows = self.store.read(['customer_id', 'sales'], date_range, **selections)
+            customer_sales = rows.groupby('customer_id')['sales'].sum()
+            customer_ids, sales = top_k(customer_sales.index.to_numpy(), customer_sales.to_numpy(), k)
+            top_customers = pd.DataFrame({'customer_id': customer_ids, 'sales': sales})
+        return top_customers
+
+
+class SQLBackend(ABC):
+    """Chart aggregations as SQL on a ``data`` relation, with the filters in the WHERE clause.
+
+    Subclasses provide ``execute``, the day-number expression ``DAY`` and the date condition.
+    """
+
+    DAY = '"order_day"'
+    INTEGER_TYPE = 'BIGINT'
+
+    def __init__(self, columns, integer_columns):
+        self.columns = list(columns)
+        self.integer_columns = set(integer_columns)
+
+    @abstractmethod
+    def execute(self, sql, params):
+        """Run a query with ``?`` placeholders; returns a frame."""
+
+    @abstractmethod
+    def _date_condition(self, date_range):
+        """SQL condition and parameters for an inclusive date range."""
+
+    def _where(self, date_range, selections, extra=()):
+        conditions, params = list(extra), []
+        if date_range is not None:
+            condition, values = self._date_condition(date_range)
+            conditions.append(condition)
+            params += values
+        for dim, value in _active(selections).items():
+            conditions.append(f'"{dim}" = ?')
+            params.append(value)
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ''), params
+
+    def _sum(self, measure):
+        if measure == 'rows':
+            return 'COUNT(*)'
+        if measure in self.integer_columns:
+            return f'CAST(SUM("{measure}") AS {self.INTEGER_TYPE})'
+        return f'SUM("{measure}")'
+
+    def _key(self, by):
+        return self.DAY if by == 'order_day' else f'"{by}"'
+
+    def rollup(self, by, measure, date_range=None, **selections):
+        where, params = self._where(date_range, selections, [f'{self._key(by)} IS NOT NULL'])
+        result = self.execute(
+            f'SELECT {self._key(by)} AS "{by}", {self._sum(measure)} AS "{measure}" '
+            f'FROM data {where} GROUP BY 1 ORDER BY 1',
+            params,
+        ).set_index(by)[measure]
+        if by == 'order_day':
+            result.index = day_to_date(result.index)
+        return result
+
+    def rollup_mean(self, by, measure, date_range=None, **selections):
+        where, params = self._where(date_range, selections, [f'"{by}" IS NOT NULL'])
+        result = self.execute(
+            f'SELECT "{by}", CAST(SUM("{measure}") AS DOUBLE) / COUNT("{measure}") AS "{measure}" '
+            f'FROM data {where} GROUP BY 1 HAVING COUNT("{measure}") > 0 ORDER BY 1',
+            params,
+        )
+        return result.set_index(by)[measure]
+
+    def daily(self, measure, date_range=None, **selections):
+        where, params = self._where(date_range, selections, [f'{self.DAY} IS NOT NULL'])
+        return self.execute(
+            f'SELECT {self.DAY} AS "order_day", {self._sum(measure)} AS "{measure}" FROM data {where} GROUP BY 1',
+            params,
+        ).astype({'order_day': np.int64})
+
+    def delivery_performance(self, dimensions=DELIVERY_DIMENSIONS, date_range=None, **selections):
+        statuses = ', '.join(str(code) for code in DELIVERY_STATUS)
+        result = {}
+        for dim in [dim for dim in dimensions if dim in self.columns]:
+            where, params = self._where(
+                date_range, selections, [f'"{dim}" IS NOT NULL', f'"label" IN ({statuses})'],
+            )
+            counts = self.execute(
+                f'SELECT "{dim}", "label", COUNT(*) AS "rows" FROM data {where} GROUP BY 1, 2', params,
+            )
+            result[dim] = _delivery_frame(counts, dim)
+        return result
+
+    def top_customers(self, k, date_range=None, **selections):
+        where, params = self._where(date_range, selections, ['"customer_id" IS NOT NULL'])
+        return self.execute(
+            f'SELECT "customer_id", {self._sum("sales")} AS "sales" FROM data {where} '
+            f'GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT ?',
+            params + [int(k)],
+        )
+
+
+class DuckDBBackend(SQLBackend):
+    """DuckDB over the month-partitioned Parquet files, or over the in-memory frame without copying it.
+
+    Queries run on all cores; Parquet scans skip month partitions and row groups
+    ruled out by the filters and read only the queried columns.
+    """
+
+    name = 'duckdb'
+    DAY = 'CAST(CAST("order_date" AS DATE) - DATE \'1970-01-01\' AS BIGINT)'
+
+    def __init__(self, parquet_root=None, frame=None):
+        import duckdb
+
+        self.partitioned = parquet_root is not None
+        self._connection = duckdb.connect()
+        self._lock = threading.Lock()
+        if self.partitioned:
+            pattern = os.path.join(parquet_root, '**', '*.parquet').replace("'", "''")
+            self._connection.execute(
+                f"CREATE VIEW data AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)"
+            )
+        else:
+            self._connection.register('data', frame)
+        schema = self._connection.execute('DESCRIBE data').df()
+        integer = schema['column_type'].str.contains('INT')
+        super().__init__(schema['column_name'], schema.loc[integer, 'column_name'])
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        if isinstance(dataset, ChunkedDataset):
+            return cls(parquet_root=os.path.join(dataset.root, 'parts'))
+        return cls(frame=dataset.frame)
+
+    def execute(self, sql, params):
+        with self._lock:
+            return self._connection.execute(sql, params).df()
+
+    def _date_condition(self, date_range):
+        start, end = (pd.Timestamp(value) for value in date_range)
+        condition = '"order_date" >= ? AND "order_date" < ?'
+        params = [start.to_pydatetime(), (end + pd.Timedelta(days=1)).to_pydatetime()]
+        if self.partitioned:
+            # Prunes whole month directories before any file is opened
+            condition += ' AND "order_month" BETWEEN ? AND ?'
+            params += [start.strftime('%Y-%m'), end.strftime('%Y-%m')]
+        return condition, params
+
+
+class SQLiteBackend(SQLBackend):
+    """SQLite fallback for when DuckDB is not installed.
+
+    The queried columns are copied into an SQLite database batch by batch, with the
+    order date stored as a day number and indexed.
+    """
+
+    name = 'sqlite'
+    INTEGER_TYPE = 'INTEGER'
+
+    def __init__(self, store, database=':memory:'):
+        self._connection = sqlite3.connect(database, check_same_thread=False)
+        self._lock = threading.Lock()
+        columns = [col for col in QUERY_COLUMNS if col in store.columns]
+        integer_columns = set()
+        for chunk in store.batches(columns):
+            chunk = chunk.astype({
+                col: object for col in chunk.columns if isinstance(chunk[col].dtype, pd.CategoricalDtype)
+            })
+            integer_columns |= {col for col in chunk.columns if pd.api.types.is_integer_dtype(chunk[col])}
+            days = chunk['order_date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+            chunk = chunk.assign(order_day=pd.array(days, dtype='Int64'))
+            chunk.loc[chunk['order_date'].isna(), 'order_day'] = pd.NA
+            chunk.drop(columns='order_date').to_sql('data', self._connection, if_exists='append', index=False)
+        self._connection.execute('CREATE INDEX IF NOT EXISTS data_order_day ON data (order_day)')
+        super().__init__(columns, integer_columns)
+
+    def execute(self, sql, params):
+        with self._lock:
+            return pd.read_sql_query(sql, self._connection, params=params)
+
+    def _date_condition(self, date_range):
+        return '"order_day" BETWEEN ? AND ?', [to_day_number(date_range[0]), to_day_number(date_range[1])]
+
+
+def open_backend(name, dataset):
+    """Query backend ``name`` for a SharedDataset or ChunkedDataset.
+
+    'duckdb' falls back to SQLite when DuckDB is not installed.
+    """
+    if name == 'pandas':
+        return PandasBackend(dataset)
+    if name == 'duckdb':
+        try:
+            return DuckDBBackend.from_dataset(dataset)
+        except ImportError:
+            name = 'sqlite'
+    if name == 'sqlite':
+        return SQLiteBackend(dataset.store)
+    raise ValueError(f"Unknown query backend {name!r}; expected one of {', '.join(QUERY_BACKENDS)}")
+
+
+def _same(left, right, rtol):
+    if isinstance(left, pd.Series):
+        left, right = left.sort_index().to_frame(), right.sort_index().to_frame()
+    left, right = left.reset_index(), right.reset_index()
+    if left.shape != right.shape:
+        return False
+    for col in left.columns:
+        a, b = left[col].to_numpy(), right[col].to_numpy()
+        if pd.api.types.is_numeric_dtype(left[col]) and pd.api.types.is_numeric_dtype(right[col]):
+            if not np.allclose(a.astype(np.float64), b.astype(np.float64), rtol=rtol, atol=0, equal_nan=True):
+                return False
+        elif [str(value) for value in a] != [str(value) for value in b]:
+            return False
+    return True
+
+
+# Queries behind the dashboard charts, as (description, method, arguments)
+CHART_QUERIES = [
+    ("sales trend", 'daily', ('sales',)),
+    ("profit trend", 'daily', ('order_profit_per_order',)),
+    ("sales by category", 'rollup', ('category_name', 'sales')),
+    ("sales by region", 'rollup', ('order_region', 'sales')),
+    ("profit by shipping mode", 'rollup', ('shipping_mode', 'order_profit_per_order')),
+    ("sales by segment", 'rollup', ('customer_segment', 'sales')),
+    ("mean sales per customer by segment", 'rollup_mean', ('customer_segment', 'sales_per_customer')),
+    ("sales by country", 'rollup', ('customer_country', 'sales')),
+    ("orders by shipping mode", 'rollup', ('shipping_mode', 'rows')),
+    ("mean shipping time by mode", 'rollup_mean', ('shipping_mode', 'shipping_time')),
+    ("mean shipping time by market", 'rollup_mean', ('market', 'shipping_time')),
+    ("delivery crosstab", 'delivery_performance', ()),
+    ("top customers", 'top_customers', (10,)),
+]
+
+
+def compare_backends(reference, other, selections, rtol=1e-9):
+    """Run every chart query on two backends for each filter state; returns the mismatches.
+
+    ``selections`` are filter states as passed to the store (``date_range`` plus
+    dimensions). An empty result means both backends agree within ``rtol``.
+    """
+    mismatches = []
+    for filters in selections:
+        for description, method, args in CHART_QUERIES:
+            expected = getattr(reference, method)(*args, **filters)
+            actual = getattr(other, method)(*args, **filters)
+            if method == 'daily':
+                measure = args[0]
+                expected = expected.groupby('order_day')[measure].sum()
+                actual = actual.groupby('order_day')[measure].sum()
+            if method == 'delivery_performance':
+                same = expected.keys() == actual.keys() and all(
+                    _same(expected[dim], actual[dim], rtol) for dim in expected
+                )
+            else:
+                same = _same(expected, actual, rtol)
+            if not same:
+                mismatches.append({'query': description, 'filters': filters})
+    return mismatches
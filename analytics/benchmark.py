@@ -0,0 +1,186 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .api import Analytics
+from .backends import CHART_QUERIES, QUERY_BACKENDS, open_backend
+from .filters import FILTER_DIMENSIONS
+from .synthetic import write_synthetic_csv
+
+BENCHMARK_SIZES = [100_000, 1_000_000, 10_000_000, 50_000_000]
+
+# Timing runs per query; the first run is reported separately (it builds lazy indexes)
+BENCHMARK_REPEAT = 3
+
+
+def _timed(func, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def _record(results, times, **fields):
+    results.append({
+        **fields,
+        'first': times[0],
+        'best': min(times),
+        'median': statistics.median(times),
+        'runs': len(times),
+    })
+
+
+def benchmark_filters(queries):
+    """Named filter states to time: none, one market, the last year of one segment, a region and category."""
+    start, end = queries.date_bounds()
+    year_ago = max(start, end - datetime.timedelta(days=364))
+
+    def first(dim):
+        return (queries.options(dim) or [None])[0]
+
+    return {
+        'all': {},
+        'market': queries.select(market=first('market')),
+        'last_year_segment': queries.select(date_range=(year_ago, end), customer_segment=first('customer_segment')),
+        'region_category': queries.select(order_region=first('order_region'), category_name=first('category_name')),
+    }
+
+
+def benchmark_queries(queries, filters):
+    """The dashboard's aggregations for one filter state, as (stage, callable) pairs."""
+    stages = [
+        ('kpi_totals', lambda: queries.kpi_totals(**filters)),
+        ('distinct_orders', lambda: queries.distinct_count('order_id', **filters)),
+        ('distinct_customers', lambda: queries.distinct_count('customer_id', **filters)),
+        ('trend', lambda: queries.trend('sales', **filters)),
+        ('histogram', lambda: queries.histogram('shipping_time', **filters)),
+        ('statistics', lambda: queries.statistics(**filters)),
+        ('page_sorted', lambda: queries.page(['order_id', 'sales', 'market'], 0, 20, sort_by='sales', **filters)),
+    ]
+    for description, method, args in CHART_QUERIES:
+        stage = description.replace(' ', '_')
+        stages.append((stage, lambda method=method, args=args: getattr(queries.backend, method)(*args, **filters)))
+    return stages
+
+
+def run_benchmark(path, size, mode='memory', backend='pandas', cache_dir=None, repeat=BENCHMARK_REPEAT):
+    """Time load, filtering and each aggregation on one CSV; returns a list of result records."""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), f'.cache-{mode}')
+    common = {'size': size, 'mode': mode, 'backend': backend}
+    results = []
+
+    # Cold load parses the CSV and builds the cache; warm load reuses it
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    _, times = _timed(lambda: Analytics.open(path, mode=mode, backend='pandas', cache_dir=cache_dir), 1)
+    _record(results, times, stage='load_cold', filters=None, **common)
+    dataset, times = _timed(lambda: Analytics.open(path, mode=mode, backend='pandas', cache_dir=cache_dir).dataset, 1)
+    _record(results, times, stage='load_warm', filters=None, **common)
+    engine, times = _timed(lambda: open_backend(backend, dataset), 1)
+    _record(results, times, stage='backend_open', filters=None, **common)
+    queries = Analytics(dataset, engine)
+
+    for name, filters in benchmark_filters(queries).items():
+        # What the sidebar does: cascade the options, then count the selection
+        def select(filters=filters):
+            selection = {'date_range': filters['date_range']} if 'date_range' in filters else {}
+            for dim in FILTER_DIMENSIONS:
+                queries.options(dim, **selection)
+                if dim in filters:
+                    selection[dim] = filters[dim]
+            return queries.count(**selection)
+
+        rows, times = _timed(select, repeat)
+        _record(results, times, stage='filter', filters=name, rows=int(rows), **common)
+        for stage, func in benchmark_queries(queries, filters):
+            _, times = _timed(func, repeat)
+            _record(results, times, stage=stage, filters=name, rows=int(rows), **common)
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Where and on what the benchmark ran, stored next to the results."""
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_suite(sizes=BENCHMARK_SIZES[:2], modes=('memory',), backends=('pandas',), data_dir='.benchmark',
+              repeat=BENCHMARK_REPEAT, seed=0):
+    """Generate (or reuse) a synthetic CSV per size and benchmark every mode and backend on it."""
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    for size in sizes:
+        path = os.path.join(data_dir, f'synthetic-{size}-{seed}.csv')
+        if not os.path.exists(path):
+            _, times = _timed(lambda: write_synthetic_csv(path, size, seed=seed), 1)
+            _record(results, times, size=size, mode=None, backend=None, stage='generate', filters=None)
+        for mode in modes:
+            for backend in backends:
+                results += run_benchmark(path, size, mode, backend, repeat=repeat)
+    return {'environment': environment(), 'results': results}
+
+
+def compare_results(old, new):
+    """Join two result files on (size, mode, backend, stage, filters) with the ratio of best times."""
+    keys = ['size', 'mode', 'backend', 'stage', 'filters']
+    frames = [pd.DataFrame(report['results'])[keys + ['best']] for report in (old, new)]
+    joined = frames[0].merge(frames[1], on=keys, how='outer', suffixes=('_old', '_new'))
+    joined['ratio'] = joined['best_new'] / joined['best_old']
+    return joined.sort_values(keys, na_position='first').reset_index(drop=True)
+
+
+def main(argv=None):
+    # python -m analytics.benchmark --sizes 100000 1000000 --output benchmark.json [--compare old.json]
+    parser = argparse.ArgumentParser(description="Time load, filters and chart aggregations on synthetic data.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=BENCHMARK_SIZES[:2], help='rows per synthetic dataset')
+    parser.add_argument('--modes', nargs='+', default=['memory'], choices=['memory', 'chunked'])
+    parser.add_argument('--backends', nargs='+', default=['pandas'], choices=QUERY_BACKENDS)
+    parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT)
+    parser.add_argument('--data-dir', default='.benchmark', help='where synthetic CSVs and caches are kept')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help='earlier result file to compare the new results with')
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.sizes, args.modes, args.backends, args.data_dir, args.repeat)
+    with open(args.output, 'w') as handle:
+        json.dump(report, handle, indent=1)
+    print(f"{len(report['results'])} results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as handle:
+            old = json.load(handle)
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(compare_results(old, report).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Most data points one chart may send to the browser; raw-row charts above it are refused
+MAX_CHART_POINTS = int(os.environ.get('DASHBOARD_MAX_CHART_POINTS', 50_000))
+
+# Trace attributes that carry one entry per data point
+POINT_ATTRIBUTES = ('x', 'y', 'z', 'values', 'labels', 'locations', 'lat', 'lon')
+
+
+class ChartTooLarge(ValueError):
+    """A chart would ship more data points to the browser than MAX_CHART_POINTS."""
+
+
+def chart_points(fig):
+    """Number of data points a Plotly figure serializes, summed over its traces."""
+    total = 0
+    for trace in fig.data:
+        sizes = [0]
+        for attribute in POINT_ATTRIBUTES:
+            value = getattr(trace, attribute, None)
+            if value is not None and not isinstance(value, str) and hasattr(value, '__len__'):
+                sizes.append(len(value))
+        total += max(sizes)
+    return total
+
+
+def check_chart(fig, limit=MAX_CHART_POINTS):
+    """Return fig unchanged, or raise ChartTooLarge when it carries more than ``limit`` points."""
+    points = chart_points(fig)
+    if points > limit:
+        raise ChartTooLarge(f"chart has {points:,} data points (limit {limit:,})")
+    return fig
+
+
+def histogram_bins(values, nbins=30):
+    """Bin counts of a numeric array, computed on the server so only the bins are sent.
+
+    Integer values (such as day counts) get whole-unit bins, at most ``nbins`` of them,
+    counted with ``np.bincount``; floats use ``np.histogram``. Returns a frame with
+    ``bin_start``, ``bin_end`` (exclusive), ``bin_center`` and ``count``.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return pd.DataFrame({'bin_start': [], 'bin_end': [], 'bin_center': [], 'count': []})
+
+    if values.dtype.kind in 'iub':
+        values = values.astype(np.int64)
+        lo = int(values.min())
+        width = max(1, -(-(int(values.max()) - lo + 1) // nbins))
+        counts = np.bincount((values - lo) // width)
+        starts = lo + width * np.arange(len(counts))
+        ends = starts + width
+        # Bars cover the whole units start..end-1
+        centers = starts + (width - 1) / 2
+    else:
+        counts, edges = np.histogram(values, bins=nbins)
+        starts, ends = edges[:-1], edges[1:]
+        centers = (starts + ends) / 2
+    return pd.DataFrame({'bin_start': starts, 'bin_end': ends, 'bin_center': centers, 'count': counts})
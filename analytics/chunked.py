@@ -0,0 +1,365 @@
+import collections
+import copy
+import json
+import os
+import pickle
+import re
+import shutil
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .cube import SalesCube
+from .derived import DerivedSummaries
+from .ingest import (
+    CACHE_DIR,
+    complete_size,
+    dataset_version,
+    normalize_dates,
+    read_tail,
+    source_change,
+    source_watermark,
+)
+from .schema import FIXED_DTYPES, add_derived_columns
+from .sketches import DistinctSketches
+from .store import SOURCE_ROW, PartitionedStore
+
+# Rows per CSV chunk in the out-of-core ingestion mode
+CHUNK_ROWS = int(os.environ.get('DASHBOARD_CHUNK_ROWS', 250_000))
+
+
+def _prepare(chunks):
+    for chunk in chunks:
+        chunk = add_derived_columns(normalize_dates(chunk))
+        yield chunk.astype({col: dtype for col, dtype in FIXED_DTYPES.items() if col in chunk.columns})
+
+
+def iter_source_chunks(path, chunksize=CHUNK_ROWS):
+    """Parse the CSV chunk by chunk, with the same date normalization as load_dataset."""
+    return _prepare(pd.read_csv(path, chunksize=chunksize))
+
+
+def partitioned_path(path, cache_dir=CACHE_DIR):
+    # Base name of the partitioned copies of one source file: every full build is a
+    # '<base>-<version>' directory, and '<base>.json' names the current one.
+    # Appended rows are added to the current directory as new part files.
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}.parts")
+
+
+def _pointer_path(base):
+    return f"{base}.json"
+
+
+def _root_base(root):
+    # '<base>-<version>' or '<base>-<version>.<n>' back to '<base>'; None for any other directory
+    match = re.fullmatch(r'(.+\.parts)-[0-9a-f]+(\.\d+)?', root)
+    return match.group(1) if match else None
+
+
+def current_root(base):
+    """The directory of the current build for a ``partitioned_path``, or None before the first build."""
+    try:
+        with open(_pointer_path(base)) as handle:
+            return os.path.join(os.path.dirname(base), json.load(handle)['root'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _set_current_root(base, root):
+    # Replace atomically: a reader sees either the old or the new directory
+    tmp = f"{_pointer_path(base)}.tmp-{os.getpid()}"
+    with open(tmp, 'w') as handle:
+        json.dump({'root': os.path.basename(root)}, handle)
+    os.replace(tmp, _pointer_path(base))
+
+
+# Snapshots (stores) open per partitioned directory in this process. Other processes
+# announce theirs with a lease file per process id, so no process deletes files
+# that a snapshot somewhere still reads.
+_open_roots = collections.Counter()
+_open_roots_lock = threading.Lock()
+
+
+def _lease_path(root, pid):
+    return os.path.join(root, 'leases', str(pid))
+
+
+def _acquire(root):
+    with _open_roots_lock:
+        _open_roots[root] += 1
+        if _open_roots[root] > 1:
+            return
+        try:
+            os.makedirs(os.path.join(root, 'leases'), exist_ok=True)
+            open(_lease_path(root, os.getpid()), 'w').close()
+        except OSError:
+            # Read-only deployment: nothing is ever deleted there either
+            pass
+
+
+def _release(root):
+    with _open_roots_lock:
+        _open_roots[root] -= 1
+        if _open_roots[root] > 0:
+            return
+        del _open_roots[root]
+        try:
+            os.remove(_lease_path(root, os.getpid()))
+        except OSError:
+            pass
+    base = _root_base(root)
+    if base is not None:
+        remove_unused_roots(base)
+
+
+def _process_alive(pid):
+    if os.name == 'nt':
+        # os.kill would terminate the process on Windows: treat every lease as live
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _in_use(root):
+    with _open_roots_lock:
+        if _open_roots[root] > 0:
+            return True
+    try:
+        pids = [int(name) for name in os.listdir(os.path.join(root, 'leases')) if name.isdigit()]
+    except OSError:
+        return False
+    return any(pid != os.getpid() and _process_alive(pid) for pid in pids)
+
+
+def remove_unused_roots(base):
+    """Delete the builds of a ``partitioned_path`` other than the current one that no snapshot reads any more."""
+    current = current_root(base)
+    folder, prefix = os.path.split(base)
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+    for name in names:
+        root = os.path.join(folder, name)
+        # The unversioned directory is the layout before builds were versioned
+        if '.tmp-' in name or root == current or not (name == prefix or name.startswith(f"{prefix}-")):
+            continue
+        if os.path.isdir(root) and not _in_use(root):
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def _conform(table, schema):
+    # Later chunks follow the column types inferred from the first one
+    if schema is None:
+        return table
+    columns = []
+    for field in schema:
+        column = table.column(field.name)
+        if column.null_count == len(column):
+            column = pa.nulls(len(column), type=field.type)
+        columns.append(column.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ChunkedDataset:
+    """Handle on a chunk-ingested dataset: partitioned Parquet rows plus prebuilt aggregates.
+
+    Unlike SharedDataset there is no in-memory frame; row-level reads go to the files.
+    While a snapshot's store is alive, its directory is kept even after a rebuild
+    made another one current.
+    """
+
+    def __init__(self, root, version, cube, sketches, watermark=None, schema=None, summaries=None):
+        self.root = root
+        self.version = version
+        self.cube = cube
+        self.sketches = sketches
+        self.watermark = watermark
+        self.schema = schema
+        self.summaries = summaries if summaries is not None else DerivedSummaries()
+        self.store = PartitionedStore(os.path.join(root, 'parts'), cube)
+        # Relabeled copies share the store, so the directory is released with the last of them
+        _acquire(root)
+        weakref.finalize(self.store, _release, root)
+
+    def prebuilt(self):
+        """The aggregates and summaries built so far, picklable for ``from_prebuilt`` in another process."""
+        return {
+            'root': self.root,
+            'version': self.version,
+            'cube': self.cube,
+            'sketches': self.sketches,
+            'watermark': self.watermark,
+            'schema': self.schema,
+            'summaries': self.summaries,
+        }
+
+    @classmethod
+    def from_prebuilt(cls, prebuilt):
+        return cls(**prebuilt)
+
+    def relabeled(self, version, watermark):
+        dataset = copy.copy(self)
+        dataset.version = version
+        dataset.watermark = watermark
+        return dataset
+
+    def is_unmodified(self):
+        return True
+
+
+def _write_chunk(chunk, root, schema, basename, first_row):
+    import pyarrow.dataset as ds
+
+    table = _conform(pa.Table.from_pandas(chunk, preserve_index=False), schema)
+    months = pa.array(chunk['order_date'].dt.strftime('%Y-%m'), type=pa.string())
+    # Position in the CSV, as the month partitions do not keep the file order
+    rows = pa.array(np.arange(first_row, first_row + len(chunk), dtype=np.int64))
+    ds.write_dataset(
+        table.append_column(SOURCE_ROW, rows).append_column('order_month', months),
+        os.path.join(root, 'parts'),
+        format='parquet',
+        partitioning=['order_month'],
+        partitioning_flavor='hive',
+        basename_template=basename,
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    return table.schema
+
+
+def _save_aggregates(root, **aggregates):
+    # Replace atomically: a reader never sees a half-written file
+    target = os.path.join(root, 'aggregates.pkl')
+    tmp = f"{target}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as handle:
+        pickle.dump(aggregates, handle)
+    os.replace(tmp, target)
+
+
+def _new_root(base, version):
+    # The same version is only built again when its files were damaged or removed
+    root = f"{base}-{version}"
+    copies = 0
+    while os.path.exists(root):
+        copies += 1
+        root = f"{base}-{version}.{copies}"
+    return root
+
+
+def build_partitioned(path, cache_dir=CACHE_DIR, chunksize=CHUNK_ROWS):
+    """Stream the CSV into month-partitioned Parquet and build the aggregates chunk by chunk.
+
+    Peak memory is one chunk plus the aggregates (cube cells and sketches),
+    independent of the size of the input. Each build gets a new directory, which
+    becomes current once complete; the directories of older builds are deleted
+    when no snapshot reads them any more. Returns the new directory.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    base = partitioned_path(path, cache_dir)
+    version = dataset_version(path)
+    target = _new_root(base, version)
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    watermark = source_watermark(path)
+
+    schema = None
+    cube = None
+    sketches = DistinctSketches()
+    first_row = 0
+    for number, chunk in enumerate(iter_source_chunks(path, chunksize)):
+        part = SalesCube.from_frame(chunk)
+        cube = part if cube is None else cube.merge(part)
+        sketches.update(chunk)
+        schema = _write_chunk(chunk, tmp, schema, f"chunk-{number:06d}-{{i}}.parquet", first_row)
+        first_row += len(chunk)
+    if os.path.getsize(path) != watermark['size']:
+        # The file grew while it was read: the next change rebuilds instead of appending
+        watermark = None
+
+    _save_aggregates(tmp, version=version, watermark=watermark, schema=schema, cube=cube, sketches=sketches.finish())
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Another process finished a build of the same version under this name first
+        shutil.rmtree(tmp, ignore_errors=True)
+    _set_current_root(base, target)
+    remove_unused_roots(base)
+    return target
+
+
+def append_partitioned(dataset, path, chunksize=CHUNK_ROWS):
+    """A new snapshot of a chunk-ingested dataset with the rows appended to the CSV since.
+
+    Only the new tail is parsed; it is written as extra part files and merged into
+    copies of the cube, sketches and the summaries built so far, so ``dataset``
+    itself stays usable.
+    """
+    start = dataset.watermark['size']
+    stop = complete_size(path)
+    version = dataset_version(path)
+    cube = dataset.cube
+    sketches = copy.deepcopy(dataset.sketches)
+    summaries = dataset.summaries.copy()
+    schema = dataset.schema
+    # Appended rows follow every row already in the files
+    first_row = int(dataset.store.row_groups()[2][-1])
+    for number, chunk in enumerate(_prepare(read_tail(path, start, stop, chunksize))):
+        cube = cube.merge(SalesCube.from_frame(chunk))
+        sketches.update(chunk)
+        summaries.update(chunk)
+        schema = _write_chunk(chunk, dataset.root, schema, f"append-{start}-{number:06d}-{{i}}.parquet", first_row)
+        first_row += len(chunk)
+
+    appended = ChunkedDataset(
+        dataset.root, version, cube, sketches.finish(), source_watermark(path, stop), schema, summaries.finish(),
+    )
+    _save_aggregates(
+        dataset.root,
+        version=appended.version,
+        watermark=appended.watermark,
+        schema=appended.schema,
+        cube=appended.cube,
+        sketches=appended.sketches,
+    )
+    return appended
+
+
+def _load(root):
+    with open(os.path.join(root, 'aggregates.pkl'), 'rb') as handle:
+        aggregates = pickle.load(handle)
+    return ChunkedDataset(
+        root,
+        aggregates.get('version'),
+        aggregates['cube'],
+        aggregates['sketches'],
+        aggregates.get('watermark'),
+        aggregates.get('schema'),
+    )
+
+
+def open_partitioned(path, cache_dir=CACHE_DIR, chunksize=CHUNK_ROWS):
+    """Open the partitioned copy of the CSV, ingesting it first when it is missing or stale.
+
+    When rows were only appended to the CSV since the last ingestion, just those are added.
+    """
+    target = current_root(partitioned_path(path, cache_dir))
+    if target is not None and os.path.exists(os.path.join(target, 'aggregates.pkl')):
+        dataset = _load(target)
+        version = dataset_version(path)
+        if dataset.version == version:
+            return dataset
+        change = source_change(path, dataset.watermark)
+        if change == 'unchanged':
+            return dataset.relabeled(version, dataset.watermark)
+        if change == 'appended':
+            return append_partitioned(dataset, path, chunksize)
+    return _load(build_partitioned(path, cache_dir, chunksize))
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from .filters import to_day_number
+from .schema import shipping_days
+
+# Cell key of the pre-aggregated cube. customer_country is included so the
+# country map can be answered from the cube; it adds few cells because it is
+# nearly constant within an order region.
+CUBE_KEYS = [
+    'order_day',
+    'market',
+    'order_region',
+    'customer_segment',
+    'category_name',
+    'shipping_mode',
+    'customer_country',
+    'label',
+]
+
+# Additive measures summed per cell
+SUM_MEASURES = ['sales', 'order_profit_per_order', 'order_item_quantity', 'sales_per_customer', 'shipping_time']
+
+# Non-null counts kept next to measures that are averaged
+COUNT_MEASURES = ['sales_per_customer', 'shipping_time']
+
+DELIVERY_STATUS = {-1: 'Early Arrival', 0: 'On Time', 1: 'Delayed'}
+
+
+def order_days(df):
+    """Order date as integer days since the epoch."""
+    return df['order_date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def day_to_date(days):
+    return pd.to_datetime(np.asarray(days, dtype='int64'), unit='D').date
+
+
+def _as_objects(cells):
+    # Categoricals from different chunks have different categories; concat them as plain values
+    return cells.astype({col: object for col in cells.columns if isinstance(cells[col].dtype, pd.CategoricalDtype)})
+
+
+class SalesCube:
+    """Sums and counts per (day, dimension...) cell, so charts roll up cells instead of rows."""
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def from_frame(cls, df):
+        keys = [key for key in CUBE_KEYS if key == 'order_day' or key in df.columns]
+        frame = pd.DataFrame({key: df[key] for key in keys if key != 'order_day'}, index=df.index)
+        frame['order_day'] = order_days(df)
+        for measure in SUM_MEASURES:
+            if measure in df.columns:
+                frame[measure] = df[measure]
+        if 'shipping_time' not in frame.columns:
+            frame['shipping_time'] = shipping_days(df)
+        # Sum in 64 bits: the compact schema stores small integers as int8/int16
+        frame = frame.astype({
+            measure: np.int64 if pd.api.types.is_integer_dtype(frame[measure]) else np.float64
+            for measure in SUM_MEASURES if measure in frame.columns
+        })
+        sums = [measure for measure in SUM_MEASURES if measure in frame.columns]
+
+        grouped = frame.groupby(keys, observed=True, dropna=False, sort=False)
+        cells = grouped[sums].sum()
+        for measure in COUNT_MEASURES:
+            if measure in frame.columns:
+                cells[f"{measure}_count"] = grouped[measure].count()
+        cells['rows'] = grouped.size()
+        return cls(cells.reset_index())
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build the cube one chunk at a time; only the cells are kept between chunks."""
+        cube = None
+        for chunk in chunks:
+            part = cls.from_frame(chunk)
+            cube = part if cube is None else cube.merge(part)
+        return cube
+
+    def merge(self, other):
+        """Cube over the rows of both cubes: cells with the same key are added up."""
+        cells = pd.concat([_as_objects(self.cells), _as_objects(other.cells)], ignore_index=True)
+        keys = [key for key in CUBE_KEYS if key in cells.columns]
+        measures = [col for col in cells.columns if col not in keys]
+        merged = cells.groupby(keys, dropna=False, sort=False)[measures].sum().reset_index()
+        for key in keys:
+            if key not in ('order_day', 'label'):
+                merged[key] = merged[key].astype('category')
+        return SalesCube(merged)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def slice(self, date_range=None, **selections):
+        """Cells matching the sidebar filters (same arguments as FilterIndex.select)."""
+        mask = np.ones(len(self.cells), dtype=bool)
+        if date_range is not None:
+            days = self.cells['order_day'].to_numpy()
+            mask &= (days >= to_day_number(date_range[0])) & (days <= to_day_number(date_range[1]))
+        for dim, value in selections.items():
+            if value is None or value == 'All':
+                continue
+            mask &= (self.cells[dim] == value).to_numpy()
+        return self.cells[mask]
+
+
+def rollup(cells, by, measure):
+    """Sum of a measure per value of ``by`` ('order_day' yields dates)."""
+    result = cells.groupby(by, observed=True)[measure].sum()
+    if by == 'order_day':
+        result.index = day_to_date(result.index)
+    return result
+
+
+def rollup_mean(cells, by, measure):
+    """Mean of a row-level measure per value of ``by``, from its sum and non-null count."""
+    grouped = cells.groupby(by, observed=True)[[measure, f"{measure}_count"]].sum()
+    grouped = grouped[grouped[f"{measure}_count"] > 0]
+    return (grouped[measure] / grouped[f"{measure}_count"]).rename(measure)
+
+
+def delivery_status_counts(cells, by=None):
+    """Row counts per delivery status, optionally crossed with another dimension."""
+    cells = cells[cells['label'].isin(list(DELIVERY_STATUS))]
+    if by is None:
+        counts = cells.groupby('label')['rows'].sum()
+        counts.index = counts.index.map(DELIVERY_STATUS)
+        return counts[counts > 0]
+    counts = cells.groupby([by, 'label'], observed=True)['rows'].sum().unstack('label', fill_value=0)
+    counts.columns = counts.columns.map(DELIVERY_STATUS)
+    return counts[sorted(counts.columns)]
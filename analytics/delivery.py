@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from .cube import DELIVERY_STATUS
+
+# Dimensions with a delivery-performance breakdown
+DELIVERY_DIMENSIONS = ['order_region', 'market', 'shipping_mode', 'customer_segment', 'category_name']
+
+
+def delivery_performance(cells, dimensions=DELIVERY_DIMENSIONS):
+    """Row counts per delivery status for every value of each dimension, in one pass.
+
+    Cube cells are mapped to (dimension value code x status code) slots, with the
+    dimensions laid out one after another, and counted with a single ``np.bincount``.
+    Returns ``{dimension: frame}``, each frame indexed by the values that have rows,
+    with one count column per status (in name order) and ``Total``.
+    """
+    dimensions = [dim for dim in dimensions if dim in cells.columns]
+    codes = np.array(sorted(DELIVERY_STATUS))
+    statuses = [DELIVERY_STATUS[code] for code in codes]
+    labels = cells['label'].to_numpy()
+    status = np.searchsorted(codes, labels).clip(0, len(codes) - 1)
+    known = codes[status] == labels
+    rows = cells['rows'].to_numpy(dtype=np.float64)
+
+    slots, weights, layout = [], [], []
+    offset = 0
+    for dim in dimensions:
+        values = cells[dim].astype('category')
+        value_codes = values.cat.codes.to_numpy().astype(np.int64)
+        valid = known & (value_codes >= 0)
+        slots.append(offset + value_codes[valid] * len(codes) + status[valid])
+        weights.append(rows[valid])
+        layout.append((dim, values.cat.categories, offset))
+        offset += len(values.cat.categories) * len(codes)
+
+    counts = np.bincount(
+        np.concatenate(slots) if slots else np.empty(0, dtype=np.int64),
+        weights=np.concatenate(weights) if weights else None,
+        minlength=offset,
+    ).astype(np.int64)
+
+    result = {}
+    for dim, categories, start in layout:
+        block = counts[start:start + len(categories) * len(codes)].reshape(len(categories), len(codes))
+        frame = pd.DataFrame(block, index=pd.Index(categories, name=dim), columns=statuses)
+        frame = frame[sorted(statuses)]
+        frame['Total'] = block.sum(axis=1)
+        result[dim] = frame[frame['Total'] > 0]
+    return result
+
+
+def delivery_rates(counts, top=None, sort_by='Delayed'):
+    """Long frame of count and percentage per (value, status) for plotting.
+
+    With ``top``, only the values with the highest ``sort_by`` percentage are kept.
+    """
+    dim = counts.index.name
+    statuses = [col for col in counts.columns if col != 'Total']
+    if top is not None:
+        rate = counts[sort_by] / counts['Total']
+        counts = counts.loc[rate.sort_values(ascending=False, kind='stable').index[:top]].sort_index()
+    n_values = len(counts)
+    return pd.DataFrame({
+        dim: np.tile(counts.index.to_numpy(), len(statuses)),
+        'Status': np.repeat(statuses, n_values),
+        'Count': counts[statuses].to_numpy().T.ravel(),
+        'Total': np.tile(counts['Total'].to_numpy(), len(statuses)),
+        'Percentage': (counts[statuses].to_numpy() / counts['Total'].to_numpy()[:, None]).T.ravel() * 100,
+    })
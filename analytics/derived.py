@@ -0,0 +1,65 @@
+import copy
+import threading
+
+from .stats import SummaryStatistics
+from .topk import PartitionTotals
+
+# Row-level summaries a dataset snapshot builds on first use, by name
+DATASET_SUMMARIES = {
+    'customer_totals': PartitionTotals,
+    'summary_statistics': SummaryStatistics,
+}
+
+
+class DerivedSummaries:
+    """The row-level summaries of one dataset snapshot, built from its store on first use.
+
+    Each kind has ``from_store`` plus the ``update``/``finish`` pair of the partitioned
+    summaries. A snapshot with appended rows takes a ``copy`` of these, updated with
+    just the new rows: summaries built so far are extended instead of rebuilt, the
+    others stay lazy. The copy leaves this snapshot's summaries untouched.
+    """
+
+    def __init__(self, kinds=DATASET_SUMMARIES):
+        self.kinds = dict(kinds)
+        self._built = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, store):
+        with self._lock:
+            if name not in self._built:
+                self._built[name] = self.kinds[name].from_store(store)
+            return self._built[name]
+
+    @property
+    def built(self):
+        """Names of the summaries built so far."""
+        with self._lock:
+            return sorted(self._built)
+
+    def copy(self):
+        """Independent copies of the summaries built so far, to update with appended rows."""
+        summaries = DerivedSummaries(self.kinds)
+        with self._lock:
+            summaries._built = copy.deepcopy(self._built)
+        return summaries
+
+    def update(self, df):
+        """Add the rows of df to every built summary."""
+        for summary in self._built.values():
+            summary.update(df)
+        return self
+
+    def finish(self):
+        for summary in self._built.values():
+            summary.finish()
+        return self
+
+    def __getstate__(self):
+        # Locks do not pickle; the summaries built so far travel to other processes
+        with self._lock:
+            return {'kinds': self.kinds, '_built': dict(self._built)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
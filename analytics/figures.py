@@ -0,0 +1,349 @@
+import pandas as pd
+
+# plotly.express is imported by the figure functions themselves: it is slow to import,
+# and the first render from the startup snapshot draws no new figures
+
+from .cube import DELIVERY_STATUS
+from .delivery import delivery_rates
+from .topk import TOP_K, top_k_series
+from .trends import WEBGL_MIN_POINTS, source_points
+
+# Colours of the delivery statuses, shared by the delivery charts
+DELIVERY_COLORS = {'Early Arrival': '#28a745', 'On Time': '#17a2b8', 'Delayed': '#dc3545'}
+
+RESOLUTION_LABELS = {'day': "Harian", 'week': "Mingguan", 'month': "Bulanan"}
+
+# Dimensions offered in the delay breakdown, with their labels
+DELAY_BREAKDOWNS = {
+    'market': "Market",
+    'shipping_mode': "Mode Pengiriman",
+    'customer_segment': "Segmen Pelanggan",
+    'category_name': "Kategori Produk",
+    'order_region': "Region",
+}
+
+# Dashboard tabs that have charts, in display order
+CHART_TABS = ["Performa Penjualan", "Analisis Pelanggan", "Performa Pengiriman"]
+
+
+def _trend_figure(trend, name, title, label):
+    import plotly.express as px
+
+    points = source_points(trend)
+    if points > len(trend):
+        # Downsampled: say how many of the points are drawn
+        title = f"{title}<br><sup>{len(trend):,} dari {points:,} titik ditampilkan (LTTB)</sup>"
+    trend = trend.reset_index()
+    trend.columns = ['Date', name]
+    fig = px.line(
+        trend,
+        x='Date',
+        y=name,
+        title=title,
+        labels={name: label, 'Date': 'Tanggal'},
+        render_mode='webgl' if len(trend) > WEBGL_MIN_POINTS else 'auto',
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def sales_trend_figure(trend, resolution):
+    return _trend_figure(trend, 'Sales', f'Penjualan {RESOLUTION_LABELS[resolution]}', 'Penjualan ($)')
+
+
+def profit_trend_figure(trend, resolution):
+    return _trend_figure(trend, 'Profit', f'Tren Profit {RESOLUTION_LABELS[resolution]}', 'Profit ($)')
+
+
+def category_sales_figure(sales):
+    import plotly.express as px
+
+    sales_by_category = sales.reset_index().sort_values('sales', ascending=False)
+    fig = px.bar(
+        sales_by_category,
+        x='category_name',
+        y='sales',
+        title='Penjualan berdasarkan Kategori Produk',
+        labels={'sales': 'Penjualan ($)', 'category_name': 'Kategori Produk'},
+        color='sales',
+        color_continuous_scale=px.colors.sequential.Blues,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def region_sales_figure(sales, top_n=TOP_K):
+    import plotly.express as px
+
+    sales_by_region = top_k_series(sales, top_n).reset_index()
+    fig = px.bar(
+        sales_by_region,
+        x='sales',
+        y='order_region',
+        title=f'Top {top_n} Region berdasarkan Penjualan',
+        labels={'sales': 'Penjualan ($)', 'order_region': 'Region'},
+        orientation='h',
+        color='sales',
+        color_continuous_scale=px.colors.sequential.Blues,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def shipping_profit_figure(profit):
+    import plotly.express as px
+
+    profit_by_shipping = profit.reset_index().sort_values('order_profit_per_order', ascending=False)
+    fig = px.pie(
+        profit_by_shipping,
+        values='order_profit_per_order',
+        names='shipping_mode',
+        title='Profit berdasarkan Mode Pengiriman',
+        hole=0.4,
+        labels={'order_profit_per_order': 'Profit ($)', 'shipping_mode': 'Mode Pengiriman'},
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def segment_sales_figure(sales):
+    import plotly.express as px
+
+    fig = px.pie(
+        sales.reset_index(),
+        values='sales',
+        names='customer_segment',
+        title='Penjualan berdasarkan Segmen Pelanggan',
+        hole=0.4,
+        labels={'sales': 'Penjualan ($)', 'customer_segment': 'Segmen Pelanggan'},
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def segment_average_sales_figure(average):
+    import plotly.express as px
+
+    fig = px.bar(
+        average.reset_index(),
+        x='customer_segment',
+        y='sales_per_customer',
+        title='Rata-rata Penjualan per Segmen Pelanggan',
+        labels={'sales_per_customer': 'Rata-rata Penjualan ($)', 'customer_segment': 'Segmen Pelanggan'},
+        color='sales_per_customer',
+        color_continuous_scale=px.colors.sequential.Viridis,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def country_sales_figure(sales):
+    import plotly.express as px
+
+    sales_by_country = sales.reset_index().sort_values('sales', ascending=False)
+    fig = px.choropleth(
+        sales_by_country,
+        locations='customer_country',
+        locationmode='country names',
+        color='sales',
+        hover_name='customer_country',
+        title='Penjualan berdasarkan Negara',
+        color_continuous_scale=px.colors.sequential.Plasma,
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+def top_customers_figure(top_customers, top_n=TOP_K):
+    import plotly.express as px
+
+    top_customers = top_customers.assign(customer_id=top_customers['customer_id'].astype(str))
+    fig = px.bar(
+        top_customers,
+        x='customer_id',
+        y='sales',
+        title=f'Top {top_n} Pelanggan berdasarkan Penjualan',
+        labels={'sales': 'Penjualan ($)', 'customer_id': 'ID Pelanggan'},
+        color='sales',
+        color_continuous_scale=px.colors.sequential.Greens,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def delivery_status_figure(kpis):
+    import plotly.express as px
+
+    # Delivery status counts under their descriptive names
+    delivery_status = pd.Series({status: kpis[status] for status in DELIVERY_STATUS.values() if kpis[status] > 0})
+    delivery_status = delivery_status.sort_values(ascending=False).reset_index()
+    delivery_status.columns = ['Status', 'Count']
+    fig = px.pie(
+        delivery_status,
+        values='Count',
+        names='Status',
+        title='Status Pengiriman',
+        hole=0.4,
+        color_discrete_map=DELIVERY_COLORS,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def shipping_mode_figure(counts):
+    import plotly.express as px
+
+    shipping_mode_counts = counts.sort_values(ascending=False).reset_index()
+    shipping_mode_counts.columns = ['Shipping Mode', 'Count']
+    fig = px.bar(
+        shipping_mode_counts,
+        x='Shipping Mode',
+        y='Count',
+        title='Jumlah Pesanan berdasarkan Mode Pengiriman',
+        labels={'Count': 'Jumlah Pesanan', 'Shipping Mode': 'Mode Pengiriman'},
+        color='Count',
+        color_continuous_scale=px.colors.sequential.Oranges,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def shipping_time_figure(average):
+    import plotly.express as px
+
+    average = average.reset_index().sort_values('shipping_time')
+    fig = px.bar(
+        average,
+        x='shipping_mode',
+        y='shipping_time',
+        title='Rata-rata Waktu Pengiriman berdasarkan Mode',
+        labels={'shipping_time': 'Rata-rata Waktu (hari)', 'shipping_mode': 'Mode Pengiriman'},
+        color='shipping_time',
+        color_continuous_scale=px.colors.sequential.Purples,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def market_shipping_time_figure(average):
+    import plotly.express as px
+
+    average = average.reset_index().sort_values('shipping_time', ascending=False)
+    fig = px.bar(
+        average,
+        x='market',
+        y='shipping_time',
+        title='Rata-rata Waktu Pengiriman berdasarkan Market',
+        labels={'shipping_time': 'Rata-rata Waktu (hari)', 'market': 'Market'},
+        color='shipping_time',
+        color_continuous_scale=px.colors.sequential.Purples,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def shipping_time_histogram_figure(bins):
+    import plotly.express as px
+
+    # Bins come from the server; bars span their bins
+    fig = px.bar(
+        bins,
+        x='bin_center',
+        y='count',
+        title='Distribusi Waktu Pengiriman',
+        labels={'bin_center': 'Waktu Pengiriman (hari)', 'count': 'Jumlah Pesanan'},
+        color_discrete_sequence=['#6c5ce7'],
+    )
+    fig.update_traces(width=(bins['bin_end'] - bins['bin_start']).tolist())
+    fig.update_layout(height=400, bargap=0)
+    return fig
+
+
+def region_delivery_figure(delivery_counts):
+    import plotly.express as px
+
+    plot_data = delivery_rates(delivery_counts['order_region'], top=10)
+    fig = px.bar(
+        plot_data,
+        x='order_region',
+        y='Percentage',
+        color='Status',
+        title='Top 10 Region dengan Persentase Keterlambatan Tertinggi',
+        labels={'Percentage': 'Persentase (%)', 'order_region': 'Region', 'Status': 'Status Pengiriman'},
+        color_discrete_map=DELIVERY_COLORS,
+        barmode='group',
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+def delay_breakdown_figure(delivery_counts, dim):
+    import plotly.express as px
+
+    breakdown = delivery_rates(delivery_counts[dim])
+    delayed_order = breakdown[breakdown['Status'] == 'Delayed'].sort_values('Percentage')[dim].tolist()
+    fig = px.bar(
+        breakdown,
+        x='Percentage',
+        y=dim,
+        color='Status',
+        orientation='h',
+        title=f'Status Pengiriman berdasarkan {DELAY_BREAKDOWNS[dim]}',
+        labels={'Percentage': 'Persentase (%)', dim: DELAY_BREAKDOWNS[dim], 'Status': 'Status Pengiriman'},
+        color_discrete_map=DELIVERY_COLORS,
+        category_orders={dim: delayed_order[::-1]},
+        hover_data=['Count', 'Total'],
+    )
+    fig.update_layout(height=max(400, 28 * len(delayed_order)), barmode='stack')
+    return fig
+
+
+def tab_figures(queries, tab, filters, top_n=TOP_K, resolution=None, breakdown='market', downsample=True):
+    """The charts of one dashboard tab under ``filters``, by name, as the dashboard draws them.
+
+    ``queries`` is an Analytics; charts whose columns are missing are left out, and
+    tabs without charts give an empty dict. ``downsample`` is passed on to the trends.
+    """
+    columns = queries.columns
+    figures = {}
+    if tab == "Performa Penjualan":
+        resolution = resolution or queries.trend_resolution(filters.get('date_range'))
+        if 'order_date' in columns and 'sales' in columns:
+            figures['sales'] = sales_trend_figure(queries.trend('sales', resolution, downsample=downsample, **filters), resolution)
+        if 'category_name' in columns and 'sales' in columns:
+            figures['category'] = category_sales_figure(queries.rollup('category_name', 'sales', **filters))
+        if 'order_region' in columns and 'sales' in columns:
+            figures['region'] = region_sales_figure(queries.rollup('order_region', 'sales', **filters), top_n)
+        if 'order_profit_per_order' in columns and 'order_date' in columns:
+            figures['profit'] = profit_trend_figure(
+                queries.trend('order_profit_per_order', resolution, downsample=downsample, **filters), resolution,
+            )
+        if 'shipping_mode' in columns and 'order_profit_per_order' in columns:
+            figures['shipping_profit'] = shipping_profit_figure(queries.rollup('shipping_mode', 'order_profit_per_order', **filters))
+    elif tab == "Analisis Pelanggan":
+        if 'customer_segment' in columns and 'sales' in columns:
+            figures['segment'] = segment_sales_figure(queries.rollup('customer_segment', 'sales', **filters))
+        if 'sales_per_customer' in columns and 'customer_segment' in columns:
+            figures['avg_sales'] = segment_average_sales_figure(
+                queries.rollup_mean('customer_segment', 'sales_per_customer', **filters)
+            )
+        if 'customer_country' in columns and 'sales' in columns:
+            figures['country'] = country_sales_figure(queries.rollup('customer_country', 'sales', **filters))
+        if 'customer_id' in columns and 'sales' in columns:
+            figures['top_customers'] = top_customers_figure(queries.top_customers(top_n, **filters), top_n)
+    elif tab == "Performa Pengiriman":
+        if 'label' in columns:
+            figures['delivery'] = delivery_status_figure(queries.kpi_totals(**filters))
+        if 'shipping_mode' in columns:
+            figures['shipping_mode'] = shipping_mode_figure(queries.rollup('shipping_mode', 'rows', **filters))
+        if 'order_date' in columns and 'shipping_date' in columns:
+            figures['shipping_time'] = shipping_time_figure(queries.rollup_mean('shipping_mode', 'shipping_time', **filters))
+            if 'market' in columns:
+                figures['market_time'] = market_shipping_time_figure(queries.rollup_mean('market', 'shipping_time', **filters))
+            figures['hist'] = shipping_time_histogram_figure(queries.histogram('shipping_time', **filters))
+        if 'label' in columns and 'order_region' in columns:
+            delivery_counts = queries.delivery_performance(**filters)
+            figures['region_delivery'] = region_delivery_figure(delivery_counts)
+            if breakdown in delivery_counts:
+                figures['breakdown'] = delay_breakdown_figure(delivery_counts, breakdown)
+    return figures
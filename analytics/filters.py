@@ -0,0 +1,187 @@
+import calendar
+import copy
+
+import numpy as np
+import pandas as pd
+
+# Sidebar dimensions, in the order the filters cascade
+FILTER_DIMENSIONS = ['market', 'order_region', 'customer_segment', 'category_name']
+
+
+def to_day_number(value):
+    """Days since the epoch for a date, datetime or numpy datetime64."""
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def month_number(dates):
+    """Months since January 1970 for a datetime Series."""
+    return dates.to_numpy(dtype='datetime64[M]').astype(np.int64)
+
+
+def split_months(date_range):
+    """Split a date range into whole months and partial months.
+
+    Returns the first and last month number fully inside the range, and the
+    (start, end) date ranges of the partial months at its edges.
+    """
+    start, end = (pd.Timestamp(value) for value in date_range)
+    first = (start.year - 1970) * 12 + start.month - 1
+    last = (end.year - 1970) * 12 + end.month - 1
+    edges = []
+    if start.day != 1:
+        month_end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+        edges.append((start.date(), min(month_end, end).date()))
+        first += 1
+    if end.day != calendar.monthrange(end.year, end.month)[1] and last >= first:
+        edges.append((max(end.replace(day=1), start).date(), end.date()))
+        last -= 1
+    return first, last, edges
+
+
+class DimensionIndex:
+    """Row positions of one categorical column, grouped by category code."""
+
+    def __init__(self, series):
+        series = series.astype('category')
+        self.categories = series.cat.categories
+        self.codes = series.cat.codes.to_numpy()
+        valid = self.codes >= 0
+        counts = np.bincount(self.codes[valid], minlength=len(self.categories))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        # Stable sort keeps the positions of each code in ascending row order; missing values sort first
+        order = np.argsort(self.codes, kind='stable')
+        self.postings = order[len(order) - valid.sum():]
+
+    def extended(self, series, first_row):
+        """A new index for ``series``, whose rows before ``first_row`` are already indexed here.
+
+        Existing codes must be unchanged (new categories appended at the end); the
+        appended rows are merged into the posting lists instead of re-sorting everything.
+        """
+        series = series.astype('category')
+        index = copy.copy(self)
+        index.categories = series.cat.categories
+        index.codes = series.cat.codes.to_numpy()
+        added = index.codes[first_row:]
+        valid = added >= 0
+        order = np.argsort(added[valid], kind='stable')
+        added_codes = added[valid][order]
+        added_rows = (first_row + np.flatnonzero(valid))[order]
+
+        n_new = len(index.categories) - len(self.categories)
+        offsets = np.concatenate([self.offsets, np.repeat(self.offsets[-1], n_new)])
+        # Appended rows follow every existing row, so they go at the end of their code's list
+        index.postings = np.insert(self.postings, offsets[added_codes + 1], added_rows)
+        counts = np.diff(offsets) + np.bincount(added_codes, minlength=len(index.categories))
+        index.offsets = np.concatenate([[0], np.cumsum(counts)])
+        return index
+
+    def code_of(self, value):
+        position = self.categories.get_indexer([value])[0]
+        return None if position < 0 else position
+
+    def rows_for(self, code):
+        return self.postings[self.offsets[code]:self.offsets[code + 1]]
+
+    def size_of(self, code):
+        return int(self.offsets[code + 1] - self.offsets[code])
+
+    def present(self, rows=None):
+        """Categories that occur in the given rows (all rows when None)."""
+        if rows is None:
+            counts = np.diff(self.offsets)
+        else:
+            codes = self.codes[rows]
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.categories))
+        return sorted(self.categories[counts > 0].tolist())
+
+
+class FilterIndex:
+    """Indexes built once per dataset so sidebar filters avoid full-frame boolean masks.
+
+    Rows are kept in a date-sorted order for binary-searched date ranges, and every
+    filter dimension has a code-to-rows posting list. A selection starts from the
+    smallest candidate set and checks the remaining filters on those rows only.
+    """
+
+    def __init__(self, df, date_column='order_date', dimensions=FILTER_DIMENSIONS):
+        self.n_rows = len(df)
+        self.date_column = date_column
+        if date_column in df.columns:
+            self.days = df[date_column].to_numpy(dtype='datetime64[D]').astype(np.int64)
+            self.date_order = np.argsort(self.days, kind='stable')
+            self.sorted_days = self.days[self.date_order]
+        self.dimensions = {dim: DimensionIndex(df[dim]) for dim in dimensions if dim in df.columns}
+
+    def extended(self, df, first_row):
+        """A new index for ``df``, whose rows before ``first_row`` are already indexed here."""
+        index = copy.copy(self)
+        index.n_rows = len(df)
+        if hasattr(self, 'days'):
+            added = df[self.date_column].to_numpy(dtype='datetime64[D]').astype(np.int64)[first_row:]
+            order = np.argsort(added, kind='stable')
+            positions = np.searchsorted(self.sorted_days, added[order], side='right')
+            index.days = np.concatenate([self.days, added])
+            index.date_order = np.insert(self.date_order, positions, first_row + order)
+            index.sorted_days = np.insert(self.sorted_days, positions, added[order])
+        index.dimensions = {
+            dim: dim_index.extended(df[dim], first_row) for dim, dim_index in self.dimensions.items()
+        }
+        return index
+
+    def date_slice(self, start, end):
+        lo = np.searchsorted(self.sorted_days, to_day_number(start), side='left')
+        hi = np.searchsorted(self.sorted_days, to_day_number(end), side='right')
+        return lo, hi
+
+    def select(self, date_range=None, **selections):
+        """Sorted row positions matching all filters, or None when nothing is filtered.
+
+        ``selections`` maps a dimension to a single value; ``None`` and ``'All'`` mean no filter.
+        """
+        constraints = []
+        if date_range is not None:
+            lo, hi = self.date_slice(*date_range)
+            if lo > 0 or hi < self.n_rows:
+                constraints.append(('date', date_range, hi - lo))
+        for dim, value in selections.items():
+            if value is None or value == 'All':
+                continue
+            index = self.dimensions[dim]
+            code = index.code_of(value)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            constraints.append((dim, code, index.size_of(code)))
+
+        if not constraints:
+            return None
+
+        # Start from the smallest candidate set and check the rest on those rows
+        constraints.sort(key=lambda item: item[2])
+        kind, arg, _ = constraints[0]
+        if kind == 'date':
+            lo, hi = self.date_slice(*arg)
+            rows = np.sort(self.date_order[lo:hi])
+        else:
+            rows = self.dimensions[kind].rows_for(arg)
+        for kind, arg, _ in constraints[1:]:
+            if kind == 'date':
+                days = self.days[rows]
+                rows = rows[(days >= to_day_number(arg[0])) & (days <= to_day_number(arg[1]))]
+            else:
+                rows = rows[self.dimensions[kind].codes[rows] == arg]
+        return rows
+
+    def options(self, dim, rows=None):
+        return self.dimensions[dim].present(rows)
+
+
+def take_rows(df, rows):
+    """The filtered frame for a selection returned by FilterIndex.select.
+
+    Never returns the shared frame itself: adding a column to the result must not
+    leak into other sessions.
+    """
+    if rows is None:
+        return df.copy(deep=False)
+    return df.take(rows)
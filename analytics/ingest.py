@@ -0,0 +1,312 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .schema import add_derived_columns, apply_schema, extend_frame, memory_report
+
+# Directory holding the columnar copies of the source CSV
+CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', '.cache')
+
+DATE_COLUMNS = ['shipping_date', 'order_date']
+
+# Bumped whenever the cached layout changes, so old caches are rebuilt
+CACHE_FORMAT = 2
+
+# Bytes hashed at the start of the CSV and just before a watermark, to tell an append from a rewrite
+WATERMARK_PROBE = 64 * 1024
+
+# Appended segments a cache may chain before the next append writes one compacted file
+CACHE_MAX_SEGMENTS = int(os.environ.get('DASHBOARD_CACHE_MAX_SEGMENTS', 16))
+
+
+def source_signature(path):
+    """Identity of a source file: absolute path, size and modification time."""
+    stat = os.stat(path)
+    return {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+def dataset_version(path):
+    """Short hash of the source signature, changes whenever the CSV changes."""
+    payload = json.dumps({'format': CACHE_FORMAT, **source_signature(path)}, sort_keys=True).encode()
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def _digest(handle, start, stop):
+    handle.seek(start)
+    return hashlib.sha1(handle.read(stop - start)).hexdigest()
+
+
+def source_watermark(path, size=None):
+    """How much of the CSV has been ingested: a byte size plus hashes of the bytes around it.
+
+    The head hash covers the header and first rows, the tail hash the bytes just
+    before ``size``. ``complete`` records whether the ingested part ends with a line break.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    with open(path, 'rb') as handle:
+        head = _digest(handle, 0, min(size, WATERMARK_PROBE))
+        tail = _digest(handle, max(size - WATERMARK_PROBE, 0), size)
+        handle.seek(max(size - 1, 0))
+        complete = size > 0 and handle.read(1) == b'\n'
+    return {'size': size, 'head': head, 'tail': tail, 'complete': complete}
+
+
+def source_change(path, watermark):
+    """Compare the CSV with a watermark: 'unchanged', 'appended' or 'rewritten'."""
+    if not watermark:
+        return 'rewritten'
+    size = os.path.getsize(path)
+    if size < watermark['size'] or source_watermark(path, watermark['size']) != watermark:
+        return 'rewritten'
+    if size == watermark['size']:
+        return 'unchanged'
+    # New rows can only follow a line break
+    return 'appended' if watermark['complete'] else 'rewritten'
+
+
+def complete_size(path):
+    """Size of the CSV up to its last line break, leaving out a row that is still being written."""
+    end = os.path.getsize(path)
+    with open(path, 'rb') as handle:
+        while end > 0:
+            start = max(end - WATERMARK_PROBE, 0)
+            handle.seek(start)
+            position = handle.read(end - start).rfind(b'\n')
+            if position >= 0:
+                return start + position + 1
+            end = start
+    return 0
+
+
+def read_tail(path, start, stop, chunksize=None):
+    """Parse the raw rows between two byte offsets of the CSV, using the file's header.
+
+    Returns a frame, or an iterator of frames when ``chunksize`` is given.
+    """
+    columns = pd.read_csv(path, nrows=0).columns
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        # Appends are small next to the file, so the new bytes are read in one go
+        data = handle.read(stop - start)
+    if not data.strip():
+        empty = pd.DataFrame(columns=columns)
+        return iter([]) if chunksize else empty
+    return pd.read_csv(io.BytesIO(data), header=None, names=columns, chunksize=chunksize)
+
+
+def normalize_dates(df):
+    # Convert date columns to datetime
+    df["shipping_date"], df["order_date"] = df["shipping_date"].str[:10], df["shipping_date"].str[:10]
+    df["shipping_date"], df["order_date"] = pd.to_datetime(df["shipping_date"], format='%Y-%m-%d'), pd.to_datetime(df["order_date"], format='%Y-%m-%d')
+    return df
+
+
+def read_source(path):
+    """Parse the raw CSV into a frame with datetime columns (the slow path)."""
+    return normalize_dates(pd.read_csv(path))
+
+
+def report_path(target):
+    return f"{os.path.splitext(target)[0]}.memory.json"
+
+
+def watermark_path(target):
+    return f"{os.path.splitext(target)[0]}.watermark.json"
+
+
+def segments_path(target):
+    return f"{os.path.splitext(target)[0]}.segments.json"
+
+
+def cache_path(path, cache_dir=CACHE_DIR, version=None):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}-{version or dataset_version(path)}.arrow")
+
+
+def cache_segments(target):
+    """Files holding the rows of a cache, in row order.
+
+    A cache written in one go is a single file; a cache extended with appended rows
+    is the file of the previous version followed by one segment per append.
+    """
+    try:
+        with open(segments_path(target)) as handle:
+            names = json.load(handle)
+    except (OSError, ValueError):
+        return [target]
+    return [os.path.join(os.path.dirname(target), name) for name in names]
+
+
+def _remove_stale(path, cache_dir, keep):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    kept = {report_path(keep), watermark_path(keep), segments_path(keep), *cache_segments(keep)}
+    for name in os.listdir(cache_dir):
+        full = os.path.join(cache_dir, name)
+        if '.tmp-' in name or not name.startswith(f"{stem}-"):
+            continue
+        if full != keep and full not in kept:
+            os.remove(full)
+
+
+def _write_cache(df, target, watermark, segments=None):
+    # Write to a temporary file first so a crashed build never leaves a half-written cache
+    tmp = f"{target}.tmp-{os.getpid()}"
+    feather.write_feather(df, tmp, compression='uncompressed')
+    with open(watermark_path(target), 'w') as handle:
+        json.dump(watermark, handle)
+    if segments is not None:
+        with open(segments_path(target), 'w') as handle:
+            json.dump([os.path.basename(segment) for segment in segments], handle)
+    elif os.path.exists(segments_path(target)):
+        os.remove(segments_path(target))
+    os.replace(tmp, target)
+
+
+def read_watermark(target):
+    """Watermark stored next to a cache file, or None for caches built without one."""
+    try:
+        with open(watermark_path(target)) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def build_cache(path, cache_dir=CACHE_DIR):
+    """Convert the CSV once into an uncompressed Arrow IPC file next to the old ones."""
+    os.makedirs(cache_dir, exist_ok=True)
+    target = cache_path(path, cache_dir)
+    watermark = source_watermark(path)
+    raw = read_source(path)
+    df = add_derived_columns(apply_schema(raw))
+    if os.path.getsize(path) != watermark['size']:
+        # The file grew while it was parsed: the next change rebuilds instead of appending
+        watermark = None
+
+    memory_report(raw, df).to_json(report_path(target), orient='records')
+    _write_cache(df, target, watermark)
+    _remove_stale(path, cache_dir, keep=target)
+    return target
+
+
+def _previous_cache(path, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if not os.path.isdir(cache_dir):
+        return None
+    candidates = [
+        os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+        if name.startswith(f"{stem}-") and name.endswith('.arrow')
+    ]
+    return max(candidates, key=os.path.getmtime, default=None)
+
+
+def _keep_report(previous, target):
+    if previous is not None and previous != target and os.path.exists(report_path(previous)):
+        shutil.copyfile(report_path(previous), report_path(target))
+
+
+def save_cache(df, path, watermark, cache_dir=CACHE_DIR):
+    """Store an already-loaded frame as the cache of the current CSV, keeping the old memory report."""
+    target = cache_path(path, cache_dir)
+    _keep_report(_previous_cache(path, cache_dir), target)
+    _write_cache(df, target, watermark)
+    _remove_stale(path, cache_dir, keep=target)
+    return target
+
+
+def save_appended(df, first_row, path, watermark, previous, cache_dir=CACHE_DIR):
+    """Store a frame extended with appended rows as the cache of the current CSV.
+
+    Only the rows from ``first_row`` on are written, as a segment chained after the
+    cache file ``previous`` holding the rows before them. Without a usable previous
+    cache, or once CACHE_MAX_SEGMENTS segments are chained, the whole frame is
+    written as one file instead.
+    """
+    segments = cache_segments(previous) if previous is not None and os.path.exists(previous) else []
+    if not segments or len(segments) > CACHE_MAX_SEGMENTS:
+        return save_cache(df, path, watermark, cache_dir)
+    target = cache_path(path, cache_dir)
+    _keep_report(previous, target)
+    _write_cache(df.iloc[first_row:].reset_index(drop=True), target, watermark, segments + [target])
+    _remove_stale(path, cache_dir, keep=target)
+    return target
+
+
+def extend_cache(path, cache_dir=CACHE_DIR):
+    """Bring the newest cache up to date when rows were only appended to the CSV.
+
+    Only the new tail is parsed. Returns the new cache file, or None when the CSV
+    was rewritten and needs a full build.
+    """
+    previous = _previous_cache(path, cache_dir)
+    if previous is None:
+        return None
+    watermark = read_watermark(previous)
+    change = source_change(path, watermark)
+    if change == 'rewritten':
+        return None
+    df = read_cache(previous)
+    if change == 'unchanged':
+        return save_cache(df, path, watermark, cache_dir)
+    stop = complete_size(path)
+    first_row = len(df)
+    df = extend_frame(df, normalize_dates(read_tail(path, watermark['size'], stop)))
+    return save_appended(df, first_row, path, source_watermark(path, stop), previous, cache_dir)
+
+
+def read_cache(target):
+    # Uncompressed IPC can be memory-mapped, so only the pages actually touched are read.
+    # One block per column lets pandas wrap the Arrow buffers without copying them;
+    # those arrays are read-only, so in-place writes to the shared frame raise.
+    tables = [feather.read_table(segment, memory_map=True) for segment in cache_segments(target)]
+    if len(tables) == 1:
+        return tables[0].to_pandas(split_blocks=True)
+    # Appended segments: the last one has the widest types and every category, in code order.
+    # Columns spanning several segments are concatenated into new arrays here.
+    schema = tables[-1].schema.remove_metadata()
+    table = pa.concat_tables([table.replace_schema_metadata(None).cast(schema) for table in tables])
+    return table.to_pandas(split_blocks=True)
+
+
+def load_snapshot(path, cache_dir=CACHE_DIR):
+    """The dataset and its watermark, from the columnar cache.
+
+    A missing cache is extended from the previous one when the CSV only grew,
+    and rebuilt otherwise.
+    """
+    target = cache_path(path, cache_dir)
+    if not os.path.exists(target):
+        try:
+            target = extend_cache(path, cache_dir) or build_cache(path, cache_dir)
+        except OSError:
+            # Read-only deployment: fall back to parsing the CSV directly
+            watermark = source_watermark(path)
+            return add_derived_columns(apply_schema(read_source(path))), watermark
+    try:
+        return read_cache(target), read_watermark(target)
+    except (OSError, pa.ArrowInvalid):
+        target = build_cache(path, cache_dir)
+        return read_cache(target), read_watermark(target)
+
+
+def load_dataset(path, cache_dir=CACHE_DIR):
+    """Load the dataset from its columnar cache, rebuilding it when the CSV changed."""
+    return load_snapshot(path, cache_dir)[0]
+
+
+def load_memory_report(path, cache_dir=CACHE_DIR):
+    """Memory report written when the current cache was built, or None."""
+    target = report_path(cache_path(path, cache_dir))
+    if not os.path.exists(target):
+        return None
+    return pd.read_json(target, orient='records')
@@ -0,0 +1,134 @@
+import datetime
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Memory budget of the aggregation cache, in megabytes
+AGGREGATION_CACHE_MB = float(os.environ.get('DASHBOARD_AGG_CACHE_MB', 256))
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return [[str(key), _canonical(value[key])] for key in sorted(value, key=str)]
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (datetime.date, datetime.datetime, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def state_key(*parts):
+    """Stable hash of filter state and other key parts, independent of dict order."""
+    payload = json.dumps(_canonical(list(parts)), separators=(',', ':')).encode()
+    return hashlib.sha1(payload).hexdigest()
+
+
+def estimate_size(value):
+    """Approximate memory held by a cached result, in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    if hasattr(value, '__dict__'):
+        # Index objects: count the arrays they hold
+        return sys.getsizeof(value) + estimate_size(vars(value))
+    return sys.getsizeof(value)
+
+
+class AggregationCache:
+    """Process-wide LRU cache of aggregation results with a memory budget.
+
+    Results are shared between sessions and must be treated as read-only by callers.
+    """
+
+    def __init__(self, max_mb=AGGREGATION_CACHE_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.evictions = 0
+
+    def get(self, name, key):
+        with self._lock:
+            entry = self._entries.get((name, key))
+            if entry is None:
+                self.misses[name] += 1
+                return None
+            self._entries.move_to_end((name, key))
+            self.hits[name] += 1
+            return entry
+
+    def put(self, name, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((name, key), None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[(name, key)] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Hits, misses, entries and bytes per cached function."""
+        with self._lock:
+            entries = defaultdict(int)
+            sizes = defaultdict(int)
+            for (name, _), (_, size) in self._entries.items():
+                entries[name] += 1
+                sizes[name] += size
+            names = sorted(set(self.hits) | set(self.misses) | set(entries))
+            return pd.DataFrame({
+                'function': names,
+                'hits': [self.hits[name] for name in names],
+                'misses': [self.misses[name] for name in names],
+                'entries': [entries[name] for name in names],
+                'bytes': [sizes[name] for name in names],
+            })
+
+    def memoize(self, func):
+        """Cache func by its arguments; like st.cache_data, parameters starting with '_' are not hashed."""
+        signature = inspect.signature(func)
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = state_key({arg: value for arg, value in bound.arguments.items() if not arg.startswith('_')})
+            entry = self.get(name, key)
+            if entry is not None:
+                return entry[0]
+            result = func(*args, **kwargs)
+            self.put(name, key, result)
+            return result
+
+        return wrapper
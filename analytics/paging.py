@@ -0,0 +1,68 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Columns whose sort order is kept for the raw-data viewer, least recently used dropped first
+SORT_INDEX_COLUMNS = int(os.environ.get('DASHBOARD_SORT_COLUMNS', 4))
+
+
+def sort_order(values):
+    """Stable ascending order of a column's rows, missing values last.
+
+    Returns the row positions and the number of non-missing values; the positions
+    are int32 when the row count allows, to halve the index size.
+    """
+    series = pd.Series(values).reset_index(drop=True)
+    order = series.sort_values(kind='stable', na_position='last').index.to_numpy()
+    dtype = np.int32 if len(order) < np.iinfo(np.int32).max else np.int64
+    return order.astype(dtype), int(series.notna().sum())
+
+
+class SortIndex:
+    """Precomputed sort orders of the columns of one dataset snapshot.
+
+    ``read_column`` returns all values of a column in row-position order; each order
+    is computed on first use and reused by every session and every page after that.
+    """
+
+    def __init__(self, read_column, max_columns=SORT_INDEX_COLUMNS):
+        self.read_column = read_column
+        self.max_columns = max_columns
+        self._orders = OrderedDict()
+        self._lock = threading.Lock()
+        self._last = (None, None)
+
+    def order(self, column):
+        with self._lock:
+            if column in self._orders:
+                self._orders.move_to_end(column)
+                return self._orders[column]
+        result = sort_order(self.read_column(column))
+        with self._lock:
+            self._orders[column] = result
+            while len(self._orders) > self.max_columns:
+                self._orders.popitem(last=False)
+        return result
+
+    def arrange(self, column, rows, n_rows, descending=False, key=None):
+        """Selected row positions (None for all rows) in the sort order of a column.
+
+        Walks the precomputed order once and keeps the selected rows, so nothing is sorted
+        per selection. Descending order keeps missing values last. The result for the
+        last ``key`` (the selection) is memoized, so paging through it is a slice.
+        """
+        last_key, last_rows = self._last
+        if key is not None and (key, column, descending) == last_key:
+            return last_rows
+        order, n_valid = self.order(column)
+        if descending:
+            order = np.concatenate([order[:n_valid][::-1], order[n_valid:]])
+        if rows is not None:
+            selected = np.zeros(n_rows, dtype=bool)
+            selected[rows] = True
+            order = order[selected[order]]
+        self._last = ((key, column, descending), order)
+        return order
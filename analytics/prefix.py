@@ -0,0 +1,116 @@
+import datetime
+
+import numpy as np
+
+from .cube import DELIVERY_STATUS
+from .filters import FILTER_DIMENSIONS, to_day_number
+from .store import _active
+
+# Additive cube measures kept as per-day running totals
+PREFIX_MEASURES = ['sales', 'order_profit_per_order', 'order_item_quantity', 'shipping_time', 'shipping_time_count', 'rows']
+
+
+def cube_totals(cells):
+    """Totals of the prefix measures (and row counts per delivery status) over cube cells."""
+    totals = {measure: cells[measure].sum() for measure in PREFIX_MEASURES if measure in cells.columns}
+    if 'label' in cells.columns:
+        for code, status in DELIVERY_STATUS.items():
+            totals[status] = cells.loc[cells['label'] == code, 'rows'].sum()
+    return totals
+
+
+def previous_period(date_range):
+    """The range of the same length that ends the day before ``date_range`` starts."""
+    start, end = date_range
+    length = (end - start).days + 1
+    return start - datetime.timedelta(days=length), start - datetime.timedelta(days=1)
+
+
+class PrefixIndex:
+    """Per-day running totals of the additive measures, overall and per value of each filter dimension.
+
+    The total of a measure over any date range is the difference of two lookups,
+    for the whole dataset or for one dimension value. Selections on several
+    dimensions at once return None and are answered from the cube instead.
+    """
+
+    def __init__(self, cube, dimensions=FILTER_DIMENSIONS):
+        cells = cube.cells
+        days = cells['order_day'].to_numpy()
+        dated = days > np.iinfo(np.int64).min
+        self.first_day = int(days[dated].min()) if dated.any() else 0
+        self.n_days = int(days[dated].max()) - self.first_day + 1 if dated.any() else 0
+        # Undated cells go to one extra slot after the last day, counted only without a date filter
+        slot = np.where(dated, days - self.first_day, self.n_days)
+
+        self.measures = [measure for measure in PREFIX_MEASURES if measure in cells.columns]
+        weights = [cells[measure].to_numpy(dtype=np.float64) for measure in self.measures]
+        if 'label' in cells.columns:
+            labels = cells['label'].to_numpy()
+            rows = cells['rows'].to_numpy(dtype=np.float64)
+            for code, status in DELIVERY_STATUS.items():
+                self.measures.append(status)
+                weights.append(np.where(labels == code, rows, 0.0))
+        self.integer = {
+            measure for measure in self.measures
+            if measure not in cells.columns or np.issubdtype(cells[measure].dtype, np.integer)
+        }
+
+        self.overall = self._running(slot, np.zeros(len(cells), dtype=np.int64), 1, weights)[:, 0]
+        self.categories = {}
+        self.by_dimension = {}
+        for dim in dimensions:
+            if dim not in cells.columns:
+                continue
+            values = cells[dim].astype('category')
+            self.categories[dim] = values.cat.categories
+            codes = values.cat.codes.to_numpy()
+            known = codes >= 0
+            self.by_dimension[dim] = self._running(
+                slot[known], codes[known], len(self.categories[dim]), [weight[known] for weight in weights],
+            )
+
+    def _running(self, slot, codes, n_codes, weights):
+        # (measure, code, slot) running totals with a leading zero, so a range sum is two lookups
+        n_slots = self.n_days + 1
+        flat = codes.astype(np.int64) * n_slots + slot
+        sums = np.stack([
+            np.bincount(flat, weights=weight, minlength=n_codes * n_slots).reshape(n_codes, n_slots)
+            for weight in weights
+        ])
+        return np.concatenate([np.zeros(sums.shape[:2] + (1,)), np.cumsum(sums, axis=2)], axis=2)
+
+    def _bounds(self, date_range):
+        if date_range is None:
+            return 0, self.n_days + 1
+        lo = to_day_number(date_range[0]) - self.first_day
+        hi = to_day_number(date_range[1]) - self.first_day + 1
+        return int(np.clip(lo, 0, self.n_days)), int(np.clip(hi, 0, self.n_days))
+
+    def totals(self, date_range=None, **selections):
+        """Measure totals for a selection, or None when it filters on more than one dimension."""
+        active = _active(selections)
+        if len(active) > 1 or not set(active) <= set(self.by_dimension):
+            return None
+        lo, hi = self._bounds(date_range)
+        if active:
+            dim, value = next(iter(active.items()))
+            code = self.categories[dim].get_indexer([value])[0]
+            if code < 0:
+                return {measure: 0 for measure in self.measures}
+            running = self.by_dimension[dim][:, code]
+        else:
+            running = self.overall
+        sums = running[:, max(hi, lo)] - running[:, lo]
+        return {
+            measure: int(round(value)) if measure in self.integer else float(value)
+            for measure, value in zip(self.measures, sums)
+        }
+
+
+def period_totals(index, cube, date_range=None, **selections):
+    """Measure totals from the prefix index, falling back to the cube for multi-dimension selections."""
+    totals = index.totals(date_range, **selections)
+    if totals is None:
+        totals = cube_totals(cube.slice(date_range, **selections))
+    return totals
@@ -0,0 +1,175 @@
+import contextlib
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+
+import pandas as pd
+
+# Per-section profiling of a rerun: '' or '0' is off, 'time' records wall time and rows,
+# anything else ('1', 'memory') also traces peak memory (slower: every allocation is traced)
+PROFILE_MODE = os.environ.get('DASHBOARD_PROFILE', '')
+
+# Where profiles are written: appended as JSON lines, or Prometheus text format for a '.prom' file
+PROFILE_LOG = os.environ.get('DASHBOARD_PROFILE_LOG', 'profile.jsonl')
+
+# Runs whose samples a '.prom' file keeps; older runs are dropped when it is rewritten
+PROMETHEUS_RUNS = int(os.environ.get('DASHBOARD_PROFILE_PROM_RUNS', 10))
+
+# Prometheus metrics written per section, with the record field they come from
+PROMETHEUS_METRICS = {
+    'dashboard_section_seconds': ('seconds', "Wall time of a dashboard section."),
+    'dashboard_section_rows': ('rows', "Rows a dashboard section worked on."),
+    'dashboard_section_peak_bytes': ('peak_bytes', "Peak traced memory of a dashboard section above its start."),
+}
+
+# Latest records of the recent runs per '.prom' file of this process: {path: {run: {section: record}}}
+_prometheus_runs = {}
+_prometheus_lock = threading.Lock()
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(runs):
+    """Prometheus text format of ``{run: {section: record}}``.
+
+    Each metric is one block under its HELP/TYPE lines, with one sample per run and
+    section and no timestamps, as the node_exporter textfile collector expects.
+    """
+    lines = []
+    for metric, (field, help_text) in PROMETHEUS_METRICS.items():
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+        for run, sections in runs.items():
+            for section, record in sections.items():
+                if record[field] is not None:
+                    lines.append(f'{metric}{{run="{run}",section="{_label(section)}"}} {record[field]}')
+    return '\n'.join(lines) + '\n'
+
+
+class SectionProfiler:
+    """Wall time, rows and peak memory of the named sections of one script run.
+
+    Sections may nest; a section's peak includes the peaks of the sections inside it.
+    Memory is measured with tracemalloc, which sees the allocations of Python objects
+    and NumPy/pandas buffers but not Arrow's memory pool, and is process-wide: with
+    several sessions rerunning at once, their allocations mix. A disabled profiler
+    (the default) only yields a record and costs next to nothing.
+    """
+
+    def __init__(self, mode=PROFILE_MODE):
+        self.enabled = mode not in ('', '0')
+        self.trace_memory = self.enabled and mode != 'time'
+        self.run = uuid.uuid4().hex[:12]
+        self.started = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        self.records = []
+        self._written = 0
+        self._stack = []
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def section(self, name, rows=None):
+        """Time the block as section ``name``; yields its record.
+
+        ``rows`` is a number or a callable returning one; a callable is evaluated
+        after the section ends, so counting rows is not part of its time or memory.
+        """
+        record = {'section': name, 'depth': len(self._stack), 'seconds': None, 'rows': None, 'peak_bytes': None}
+        if not self.enabled:
+            yield record
+            return
+        if self.trace_memory:
+            if self._stack:
+                # The enclosing section keeps the peak reached so far before it is reset
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            frame = {'base': tracemalloc.get_traced_memory()[0], 'peak': 0}
+        else:
+            frame = None
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._stack.pop()
+            if self.trace_memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = max(0, peak - frame['base'])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            self.records.append(record)
+        rows = rows() if callable(rows) else rows
+        if rows is not None and record['rows'] is None:
+            record['rows'] = int(rows)
+
+    def timed(self, name=None, rows=None, skip=0):
+        """Decorator running each call of a function as a section named after its arguments.
+
+        The first ``skip`` positional arguments are left out of the name. ``rows`` is a
+        number, or a callable given the same arguments after each call.
+        """
+        def decorate(func):
+            label = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                described = ', '.join([repr(arg) for arg in args[skip:]] + [f'{key}={value!r}' for key, value in kwargs.items()])
+                row_count = (lambda: rows(*args, **kwargs)) if callable(rows) else rows
+                with self.section(f'{label}({described})', rows=row_count):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    def frame(self):
+        """The sections recorded so far, in the order they ended."""
+        frame = pd.DataFrame(self.records, columns=['section', 'depth', 'seconds', 'rows', 'peak_bytes'])
+        return frame.astype({'rows': 'Int64', 'peak_bytes': 'Int64'})
+
+    def total_seconds(self):
+        """Wall time of the top-level sections."""
+        return sum(record['seconds'] for record in self.records if record['depth'] == 0)
+
+    def write(self, path=PROFILE_LOG):
+        """Write the sections recorded since the last write to ``path``; returns how many.
+
+        JSON lines are appended. A '.prom' file is rewritten instead, with the latest
+        sample per section of the last PROMETHEUS_RUNS runs written by this process.
+        """
+        records = self.records[self._written:]
+        if not self.enabled or not records:
+            return 0
+        if path.endswith('.prom'):
+            self._write_prometheus(path, records)
+        else:
+            with open(path, 'a') as handle:
+                handle.write(''.join(
+                    json.dumps({'run': self.run, 'started': self.started, **record}) + '\n' for record in records
+                ))
+        self._written += len(records)
+        return len(records)
+
+    def _write_prometheus(self, path, records):
+        with _prometheus_lock:
+            runs = _prometheus_runs.setdefault(path, {})
+            # The run written last moves to the end; the oldest runs go first
+            sections = runs.pop(self.run, {})
+            sections.update((record['section'], record) for record in records)
+            runs[self.run] = sections
+            while len(runs) > PROMETHEUS_RUNS:
+                del runs[next(iter(runs))]
+            # Replace atomically: a scrape never reads a half-written file
+            tmp = f"{path}.tmp-{os.getpid()}"
+            with open(tmp, 'w') as handle:
+                handle.write(prometheus_text(runs))
+            os.replace(tmp, path)
@@ -0,0 +1,81 @@
+import threading
+
+from .chunked import CHUNK_ROWS, append_partitioned, open_partitioned
+from .ingest import (
+    CACHE_DIR,
+    cache_path,
+    complete_size,
+    dataset_version,
+    load_snapshot,
+    normalize_dates,
+    read_tail,
+    save_appended,
+    source_change,
+    source_watermark,
+)
+from .shared import SharedDataset
+
+
+class LiveDataset:
+    """Process-wide handle that keeps the dataset current while rows are appended to the CSV.
+
+    ``current`` returns an immutable snapshot (SharedDataset, or ChunkedDataset in
+    'chunked' mode). When the file only grew since that snapshot, just the new tail
+    is parsed and applied to the indexes and aggregates; any other change reloads
+    from scratch. Sessions still holding an older snapshot keep working on it.
+    """
+
+    def __init__(self, path, mode='memory', cache_dir=CACHE_DIR, chunksize=CHUNK_ROWS):
+        self.path = path
+        self.mode = mode
+        self.cache_dir = cache_dir
+        self.chunksize = chunksize
+        self.snapshot = None
+        self.last_refresh = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self.mode == 'chunked':
+            return open_partitioned(self.path, self.cache_dir, self.chunksize)
+        version = dataset_version(self.path)
+        frame, watermark = load_snapshot(self.path, self.cache_dir)
+        return SharedDataset(frame, version, watermark=watermark)
+
+    def _append(self, snapshot):
+        if self.mode == 'chunked':
+            return append_partitioned(snapshot, self.path, self.chunksize)
+        version = dataset_version(self.path)
+        start = snapshot.watermark['size']
+        stop = complete_size(self.path)
+        rows = normalize_dates(read_tail(self.path, start, stop))
+        watermark = source_watermark(self.path, stop)
+        dataset = snapshot.appended(rows, version, watermark)
+        try:
+            # Only the new rows are written, as a segment after the snapshot's cache file
+            previous = cache_path(self.path, self.cache_dir, snapshot.version)
+            save_appended(dataset.frame, len(snapshot.frame), self.path, watermark, previous, self.cache_dir)
+        except OSError:
+            # Read-only deployment: the in-memory snapshot is still current
+            pass
+        return dataset
+
+    def current(self):
+        """The snapshot for the CSV as it is now, refreshing it first when the file changed."""
+        version = dataset_version(self.path)
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self.snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+            change = 'rewritten' if snapshot is None else source_change(self.path, snapshot.watermark)
+            if change == 'unchanged':
+                snapshot = snapshot.relabeled(version, snapshot.watermark)
+            elif change == 'appended':
+                snapshot = self._append(snapshot)
+            else:
+                snapshot = self._open()
+            self.snapshot = snapshot
+            self.last_refresh = change
+            return snapshot
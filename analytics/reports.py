@@ -0,0 +1,316 @@
+import argparse
+import concurrent.futures
+import datetime
+import html
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import traceback
+
+import pyarrow as pa
+from plotly.offline import get_plotlyjs
+
+from .api import Analytics
+from .backends import QUERY_BACKEND, QUERY_BACKENDS, open_backend
+from .chunked import CHUNK_ROWS, ChunkedDataset
+from .figures import CHART_TABS, tab_figures
+from .ingest import CACHE_DIR, cache_path, read_cache
+from .refresh import LiveDataset
+from .shared import SharedDataset
+from .topk import TOP_K
+
+# Worker processes rendering reports; one per core by default
+REPORT_WORKERS = int(os.environ.get('DASHBOARD_REPORT_WORKERS', os.cpu_count() or 1))
+
+# Report tabs: the chart tabs plus the statistics of the Detail Data tab
+REPORT_TABS = CHART_TABS + ["Detail Data"]
+
+REPORT_FORMATS = ('html', 'png')
+
+# Filter dimensions of the default report grid
+REPORT_GRID = ('market', 'customer_segment')
+
+# The analytics a worker renders from; set before the pool forks, or by the initializer after a spawn
+_worker_queries = None
+
+
+def _slug(text):
+    return re.sub(r'[^0-9A-Za-z]+', '-', str(text)).strip('-').lower() or 'x'
+
+
+def report_name(state):
+    """Directory name of the report for a filter state, e.g. 'market-europe__customer-segment-consumer'."""
+    parts = []
+    for key, value in state.items():
+        if key == 'date_range':
+            value = f'{value[0]}-{value[1]}'
+        parts.append(f'{_slug(key)}-{_slug(value)}')
+    return '__'.join(parts) or 'all'
+
+
+def _describe(state):
+    return ', '.join(
+        f"{key}: {value[0]} s/d {value[1]}" if key == 'date_range' else f"{key}: {value}" for key, value in state.items()
+    ) or "Semua data"
+
+
+def _json_state(state):
+    return {key: [day.isoformat() for day in value] if key == 'date_range' else value for key, value in state.items()}
+
+
+def parse_state(state):
+    """A filter state read from JSON: ``date_range`` as two ISO dates, dimensions as values."""
+    state = dict(state)
+    if 'date_range' in state:
+        state['date_range'] = tuple(datetime.date.fromisoformat(str(day)) for day in state['date_range'])
+    return state
+
+
+def filter_grid(queries, dims=REPORT_GRID, date_range=None):
+    """Every combination of the values of ``dims`` that has rows, as filter states."""
+    base = {'date_range': tuple(date_range)} if date_range is not None else {}
+    values = [queries.options(dim, **base) for dim in dims]
+    states = []
+    for combination in itertools.product(*values):
+        state = {**base, **dict(zip(dims, combination))}
+        if queries.count(**state) > 0:
+            states.append(state)
+    return states
+
+
+def png_support():
+    """None when figures can be exported as PNG, otherwise the reason they cannot."""
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return "kaleido is not installed (pip install kaleido)"
+    return None
+
+
+def _metrics_table(rows):
+    cells = ''.join(f"<tr><th>{html.escape(label)}</th><td>{html.escape(value)}</td></tr>" for label, value in rows)
+    return f"<table class=\"metrics\">{cells}</table>"
+
+
+def _tab_metrics(queries, tab, state):
+    # The metric cards the dashboard shows at the top of a tab
+    columns = queries.columns
+    rows = []
+    if tab == "Performa Penjualan":
+        kpis = queries.kpi_totals(**state)
+        if 'sales' in columns:
+            rows.append(("Total Penjualan", f"${kpis['sales']:,.2f}"))
+        if 'order_profit_per_order' in columns:
+            rows.append(("Total Profit", f"${kpis['order_profit_per_order']:,.2f}"))
+        if 'order_id' in columns:
+            rows.append(("Jumlah Pesanan", f"{queries.distinct_count('order_id', **state)[0]:,}"))
+        if 'order_item_quantity' in columns:
+            rows.append(("Total Items Terjual", f"{kpis['order_item_quantity']:,}"))
+    elif tab == "Analisis Pelanggan" and 'customer_id' in columns:
+        rows.append(("Jumlah Pelanggan", f"{queries.distinct_count('customer_id', **state)[0]:,}"))
+    return rows
+
+
+def _write_html(target, tab, state, header, body):
+    with open(target, 'w', encoding='utf-8') as handle:
+        handle.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(tab)} | {html.escape(_describe(state))}</title>"
+            # plotly.js is written once at the top of the output directory
+            "<script src=\"../plotly.min.js\"></script>"
+            "<style>body{font-family:sans-serif;margin:24px;color:#2c3e50}"
+            ".metrics th{text-align:left;padding-right:16px}</style></head><body>"
+            f"<h1>{html.escape(tab)}</h1><p>{html.escape(header)}</p>{body}</body></html>\n"
+        )
+
+
+def render_report(queries, state, out_dir, formats=REPORT_FORMATS, top_n=TOP_K):
+    """Write every tab of the dashboard for one filter state; returns a summary record.
+
+    Each tab becomes ``<out_dir>/<report name>/<tab>.html`` and, with 'png', one PNG
+    per chart in ``<tab>/``. Errors, including PNGs that cannot be exported, are
+    recorded instead of raised, so one bad state does not stop a batch.
+    """
+    name = report_name(state)
+    record = {'name': name, 'filters': _json_state(state), 'rows': None, 'seconds': None, 'files': [], 'error': None}
+    start = time.perf_counter()
+    try:
+        report_dir = os.path.join(out_dir, name)
+        os.makedirs(report_dir, exist_ok=True)
+        record['rows'] = int(queries.count(**state))
+        header = f"{_describe(state)} | {record['rows']:,} baris | versi data {queries.version}"
+        for tab in REPORT_TABS:
+            figures = tab_figures(queries, tab, state, top_n=top_n)
+            parts = [_metrics_table(_tab_metrics(queries, tab, state))]
+            parts += [fig.to_html(full_html=False, include_plotlyjs=False) for fig in figures.values()]
+            if tab == "Detail Data":
+                stats_df, estimated = queries.statistics(**state)
+                if stats_df is not None:
+                    parts.append("<h2>Statistik Data</h2>" + stats_df.to_html(index=False, float_format='{:,.2f}'.format))
+                    if estimated:
+                        parts.append("<p>Kuartil diestimasi dari t-digest per partisi; statistik lainnya eksak.</p>")
+            if 'html' in formats:
+                target = os.path.join(report_dir, f"{_slug(tab)}.html")
+                _write_html(target, tab, state, header, '\n'.join(parts))
+                record['files'].append(target)
+            if 'png' in formats and figures:
+                reason = png_support()
+                if reason is not None:
+                    raise RuntimeError(f"PNG export failed: {reason}")
+                os.makedirs(os.path.join(report_dir, _slug(tab)), exist_ok=True)
+                for chart, fig in figures.items():
+                    target = os.path.join(report_dir, _slug(tab), f"{chart}.png")
+                    fig.write_image(target, width=1200, height=fig.layout.height or 500)
+                    record['files'].append(target)
+    except Exception as e:
+        record['error'] = ''.join(traceback.format_exception_only(type(e), e)).strip()
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+
+def _restore_dataset(prebuilt, path, mode, cache_dir, chunksize):
+    # The parent's snapshot with its indexes and summaries; only the rows are mapped again
+    if mode == 'chunked':
+        return ChunkedDataset.from_prebuilt(prebuilt)
+    try:
+        frame = read_cache(cache_path(path, cache_dir, prebuilt['version']))
+    except (OSError, pa.ArrowInvalid):
+        # No cache to map (read-only deployment): load the dataset from scratch
+        return LiveDataset(path, mode=mode, cache_dir=cache_dir, chunksize=chunksize).current()
+    return SharedDataset.from_prebuilt(frame, prebuilt)
+
+
+def _init_worker(prebuilt, path, mode, backend, cache_dir, chunksize):
+    # Arrow's thread pool would oversubscribe the cores the pool already uses
+    pa.set_cpu_count(1)
+    global _worker_queries
+    if _worker_queries is None:
+        # Spawned worker: map the columnar cache the parent built (its pages are shared, not
+        # copied) and take the indexes and summaries the parent pickled instead of rebuilding them
+        dataset = _restore_dataset(prebuilt['dataset'], path, mode, cache_dir, chunksize)
+        derived = prebuilt['derived'] if dataset.version == prebuilt['dataset']['version'] else None
+        _worker_queries = Analytics(dataset, open_backend(backend, dataset), derived)
+    elif backend != 'pandas':
+        # Forked worker: database connections must not cross a fork, so each worker opens its own
+        dataset = _worker_queries.dataset
+        _worker_queries = Analytics(dataset, open_backend(backend, dataset))
+
+
+def _render_in_worker(state, out_dir, formats, top_n):
+    return render_report(_worker_queries, state, out_dir, formats, top_n)
+
+
+def run_reports(path, states=None, out_dir='reports', formats=REPORT_FORMATS, workers=REPORT_WORKERS,
+                mode='memory', backend=QUERY_BACKEND, cache_dir=CACHE_DIR, chunksize=CHUNK_ROWS, top_n=TOP_K,
+                grid=REPORT_GRID, date_range=None, start_method=None):
+    """Render a report per filter state in a process pool and write ``summary.json``; returns the summary.
+
+    The dataset is loaded once, into the memory-mapped columnar cache, and every index
+    and summary the reports use is built before the pool starts. With the 'fork' start
+    method (the default where available) the workers inherit them copy-on-write; with
+    'spawn' each worker maps the same cache file and unpickles the prebuilt structures.
+    A report that asked for PNGs fails when they cannot be exported.
+    ``states`` defaults to the combinations of the ``grid`` dimensions (market ×
+    customer_segment) within ``date_range``.
+    """
+    global _worker_queries
+    started = datetime.datetime.now(datetime.timezone.utc)
+    clock = time.perf_counter()
+    dataset = LiveDataset(path, mode=mode, cache_dir=cache_dir, chunksize=chunksize).current()
+    queries = Analytics(dataset, open_backend('pandas', dataset))
+    if states is None:
+        states = filter_grid(queries, grid, date_range)
+
+    formats = list(formats)
+    notes = []
+    if 'png' in formats and png_support() is not None:
+        notes.append(f"PNG export unavailable, reports fail: {png_support()}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'plotly.min.js'), 'w', encoding='utf-8') as handle:
+        handle.write(get_plotlyjs())
+
+    if start_method is None:
+        start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(start_method)
+    # Build every shared index and summary once, before the pool starts
+    queries.warm()
+    prebuilt = None
+    if context.get_start_method() == 'fork':
+        # Forked workers inherit them
+        _worker_queries = queries
+    else:
+        # Spawned workers unpickle them
+        prebuilt = queries.prebuilt()
+    workers = max(1, min(workers, len(states)))
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            workers, mp_context=context, initializer=_init_worker,
+            initargs=(prebuilt, path, mode, backend, cache_dir, chunksize),
+        ) as pool:
+            futures = [pool.submit(_render_in_worker, state, out_dir, formats, top_n) for state in states]
+            reports = [future.result() for future in futures]
+    finally:
+        _worker_queries = None
+
+    summary = {
+        'started': started.isoformat(timespec='seconds'),
+        'seconds': time.perf_counter() - clock,
+        'dataset': {'path': os.path.abspath(path), 'version': dataset.version, 'rows': int(queries.count())},
+        'workers': workers,
+        'start_method': context.get_start_method(),
+        'formats': formats,
+        'notes': notes,
+        'reports': reports,
+        'failed': sum(report['error'] is not None for report in reports),
+        'render_seconds': sum(report['seconds'] for report in reports),
+    }
+    with open(os.path.join(out_dir, 'summary.json'), 'w') as handle:
+        json.dump(summary, handle, indent=1)
+    return summary
+
+
+def main(argv=None):
+    # python -m analytics.reports incom2024_delay_example_dataset.csv --out reports
+    # python -m analytics.reports data.csv --grid market order_region --date-range 2017-01-01 2017-12-31
+    # python -m analytics.reports data.csv --states states.json   (a JSON list of filter states)
+    parser = argparse.ArgumentParser(description="Render HTML/PNG reports of every dashboard tab per filter state.")
+    parser.add_argument('path', help='source CSV')
+    parser.add_argument('--out', default='reports', help='output directory')
+    parser.add_argument('--grid', nargs='+', default=list(REPORT_GRID), help='dimensions whose value combinations are rendered')
+    parser.add_argument('--date-range', nargs=2, metavar=('START', 'END'), help='ISO dates applied to the whole grid')
+    parser.add_argument('--states', help='JSON file with a list of filter states, instead of the grid')
+    parser.add_argument('--formats', nargs='+', default=list(REPORT_FORMATS), choices=REPORT_FORMATS)
+    parser.add_argument('--workers', type=int, default=REPORT_WORKERS)
+    parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'], help="default: 'fork' where available")
+    parser.add_argument('--mode', default=os.environ.get('DASHBOARD_INGEST_MODE', 'memory'), choices=['memory', 'chunked'])
+    parser.add_argument('--backend', default=QUERY_BACKEND, choices=QUERY_BACKENDS)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--top-k', type=int, default=TOP_K)
+    args = parser.parse_args(argv)
+
+    states = None
+    if args.states:
+        with open(args.states) as handle:
+            states = [parse_state(state) for state in json.load(handle)]
+    date_range = parse_state({'date_range': args.date_range})['date_range'] if args.date_range else None
+
+    summary = run_reports(
+        args.path, states, args.out, args.formats, args.workers, args.mode, args.backend, args.cache_dir,
+        top_n=args.top_k, grid=args.grid, date_range=date_range, start_method=args.start_method,
+    )
+    for note in summary['notes']:
+        print(note)
+    print(
+        f"{len(summary['reports'])} reports ({summary['failed']} failed) in {summary['seconds']:.1f}s "
+        f"with {summary['workers']} workers; summary in {os.path.join(args.out, 'summary.json')}"
+    )
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
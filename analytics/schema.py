@@ -0,0 +1,97 @@
+import pandas as pd
+
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORY_COLUMNS = [
+    'market',
+    'order_region',
+    'customer_segment',
+    'category_name',
+    'shipping_mode',
+    'payment_type',
+    'order_status',
+    'customer_country',
+    'customer_state',
+    'customer_city',
+    'department_name',
+    'order_state',
+    'product_name',
+    'product_image',
+]
+
+# Columns with a fixed narrow dtype
+FIXED_DTYPES = {
+    'label': 'int8',
+}
+
+# Monetary measures keep float64 so summed KPIs stay exact to the cent
+EXACT_FLOAT_COLUMNS = [
+    'sales',
+    'sales_per_customer',
+    'profit_per_order',
+    'order_profit_per_order',
+    'order_item_total_amount',
+    'order_item_product_price',
+    'product_price',
+    'order_item_discount',
+]
+
+
+def apply_schema(df):
+    """Return a compact copy of df: categoricals, narrow ints, float32 for non-measure floats."""
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if col in FIXED_DTYPES:
+            series = series.astype(FIXED_DTYPES[col])
+        elif col in CATEGORY_COLUMNS:
+            series = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series):
+            series = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series) and col not in EXACT_FLOAT_COLUMNS:
+            series = pd.to_numeric(series, downcast='float')
+        out[col] = series
+    return pd.DataFrame(out, index=df.index)
+
+
+def shipping_days(df):
+    """Shipping time in whole days."""
+    return (df['shipping_date'] - df['order_date']).dt.days
+
+
+def add_derived_columns(df):
+    """Columns the pages need, computed once at load instead of on every rerun."""
+    if 'order_date' in df.columns and 'shipping_date' in df.columns:
+        df['shipping_time'] = pd.to_numeric(shipping_days(df), downcast='integer')
+    return df
+
+
+def extend_frame(base, rows):
+    """Append freshly parsed rows to a compact frame without re-encoding the existing rows.
+
+    New categories go after the known ones, so existing category codes (and the
+    indexes built on them) stay valid. Narrow integer columns widen when needed.
+    The result is a new contiguous frame: every column is copied once, so this is
+    O(total rows) in memory and time even though only the new rows are parsed.
+    """
+    rows = add_derived_columns(apply_schema(rows))
+    base = base.copy(deep=False)
+    for col in base.columns:
+        if isinstance(base[col].dtype, pd.CategoricalDtype) and col in rows.columns:
+            known = base[col].cat.categories
+            new = pd.Index(rows[col].dropna().unique()).difference(known)
+            base[col] = base[col].cat.add_categories(new)
+            rows[col] = pd.Categorical(rows[col], categories=base[col].cat.categories)
+    return pd.concat([base, rows[base.columns]], ignore_index=True)
+
+
+def memory_report(before, after):
+    """Per-column dtype and deep memory usage of two versions of the same frame."""
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.reindex(before.columns).astype(str),
+        'bytes_before': before.memory_usage(deep=True, index=False),
+        'bytes_after': after.memory_usage(deep=True, index=False).reindex(before.columns),
+    })
+    report['ratio'] = report['bytes_after'] / report['bytes_before']
+    report.index.name = 'column'
+    return report.reset_index()
@@ -0,0 +1,105 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from .cube import SalesCube
+from .derived import DerivedSummaries
+from .schema import extend_frame
+from .sketches import DistinctSketches
+from .store import FrameStore
+
+# Rows sampled when fingerprinting the shared frame
+FINGERPRINT_SAMPLE = 1024
+
+
+def frame_fingerprint(df):
+    """Cheap fingerprint of a frame: layout plus hashes of a fixed sample of rows."""
+    sample = np.unique(np.linspace(0, max(len(df) - 1, 0), num=min(len(df), FINGERPRINT_SAMPLE), dtype=np.int64))
+    hashed = pd.util.hash_pandas_object(df.iloc[sample], index=False).to_numpy()
+    return (
+        tuple(df.columns),
+        tuple(str(dtype) for dtype in df.dtypes),
+        len(df),
+        int(hashed.sum(dtype=np.uint64)),
+    )
+
+
+class SharedDataset:
+    """Process-wide, read-only handle on the loaded dataset and its indexes.
+
+    One instance is shared by every session, so page code must derive new frames
+    (``take_rows``) instead of modifying ``frame``. ``is_unmodified`` detects
+    layout changes and sampled value changes made by mistake.
+    """
+
+    def __init__(self, frame, version, watermark=None, store=None, cube=None, sketches=None, summaries=None):
+        self.frame = frame
+        self.version = version
+        self.watermark = watermark
+        self.store = store if store is not None else FrameStore(frame)
+        self.cube = cube if cube is not None else SalesCube.from_frame(frame)
+        self.sketches = sketches if sketches is not None else DistinctSketches(frame)
+        self.summaries = summaries if summaries is not None else DerivedSummaries()
+        self._fingerprint = frame_fingerprint(frame)
+
+    def prebuilt(self):
+        """Everything but the frame: the indexes, aggregates and summaries built so far.
+
+        Picklable, for ``from_prebuilt`` in a process that maps the same cache file.
+        """
+        return {
+            'version': self.version,
+            'watermark': self.watermark,
+            'index': self.store.index,
+            'cube': self.cube,
+            'sketches': self.sketches,
+            'summaries': self.summaries,
+        }
+
+    @classmethod
+    def from_prebuilt(cls, frame, prebuilt):
+        """The snapshot ``prebuilt`` came from, on ``frame`` (the same rows, mapped again)."""
+        return cls(
+            frame,
+            prebuilt['version'],
+            watermark=prebuilt['watermark'],
+            store=FrameStore(frame, prebuilt['index']),
+            cube=prebuilt['cube'],
+            sketches=prebuilt['sketches'],
+            summaries=prebuilt['summaries'],
+        )
+
+    def relabeled(self, version, watermark):
+        """The same data under a new version, for a CSV that was touched but not changed."""
+        dataset = copy.copy(self)
+        dataset.version = version
+        dataset.watermark = watermark
+        return dataset
+
+    def appended(self, rows, version, watermark):
+        """A new snapshot with freshly parsed rows added at the end.
+
+        The filter index, cube, sketches and the summaries built so far are updated
+        with the new rows only; this snapshot is left untouched, so sessions still
+        using it are unaffected. The frame itself is copied into one new contiguous
+        frame (see ``extend_frame``); the on-disk cache only gains a segment with
+        the new rows.
+        """
+        if rows.empty:
+            return self.relabeled(version, watermark)
+        first_row = len(self.frame)
+        frame = extend_frame(self.frame, rows)
+        added = frame.iloc[first_row:]
+        return SharedDataset(
+            frame,
+            version,
+            watermark=watermark,
+            store=FrameStore(frame, self.store.index.extended(frame, first_row)),
+            cube=self.cube.merge(SalesCube.from_frame(added)),
+            sketches=copy.deepcopy(self.sketches).update(added).finish(),
+            summaries=self.summaries.copy().update(added).finish(),
+        )
+
+    def is_unmodified(self):
+        return frame_fingerprint(self.frame) == self._fingerprint
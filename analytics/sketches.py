@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+from .cube import order_days
+from .filters import FILTER_DIMENSIONS, to_day_number
+
+# 2**12 registers per HyperLogLog sketch: about 1.6% standard error
+SKETCH_PRECISION = 12
+
+# Selections with at most this many rows are counted exactly
+EXACT_THRESHOLD = 50_000
+
+# Columns with a distinct-count KPI
+DISTINCT_COLUMNS = ['order_id', 'customer_id']
+
+
+def register_updates(values, precision=SKETCH_PRECISION):
+    """Register index and rank (position of the first set bit) of each value's hash."""
+    hashes = pd.util.hash_array(np.asarray(values))
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    # The remaining bits fit in a float64 mantissa, so frexp gives their exact bit length
+    remainder = hashes & np.uint64((1 << (64 - precision)) - 1)
+    bit_length = np.frexp(remainder.astype(np.float64))[1]
+    rank = (64 - precision) - bit_length + 1
+    return index, rank.astype(np.uint8)
+
+
+def estimate_cardinality(registers):
+    """HyperLogLog estimate with the linear-counting correction for small cardinalities."""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = np.count_nonzero(registers == 0)
+    if raw <= 2.5 * m and zeros > 0:
+        return m * np.log(m / zeros)
+    return raw
+
+
+class DistinctSketches:
+    """Mergeable HyperLogLog sketches per (order day x filter dimensions) partition.
+
+    Each partition keeps only its non-empty registers. Date-only selections merge
+    one dense sketch per day instead, which is the common "All" case. Sketches can
+    be fed chunk by chunk with ``update``.
+    """
+
+    def __init__(self, df=None, columns=DISTINCT_COLUMNS, dimensions=FILTER_DIMENSIONS, precision=SKETCH_PRECISION):
+        self.precision = precision
+        self.m = 1 << precision
+        self.columns = list(columns)
+        self.dimensions = list(dimensions)
+        self.partitions = None
+        self.first_day = None
+        self.day_registers = {}
+        self.undated_registers = {}
+        self.entries = {}
+        self._pending = {}
+        if df is not None:
+            self.update(df).finish()
+
+    @classmethod
+    def from_chunks(cls, chunks, **kwargs):
+        sketches = cls(**kwargs)
+        for chunk in chunks:
+            sketches.update(chunk)
+        return sketches.finish()
+
+    def _partition_ids(self, frame, keys):
+        # Map each row's (day, dimensions) key to a partition id, registering new keys
+        grouped = frame.groupby(keys, observed=True, dropna=False, sort=False)
+        local = grouped.ngroup().to_numpy()
+        _, first = np.unique(local, return_index=True)
+        chunk_keys = frame.iloc[first][keys].reset_index(drop=True)
+        chunk_keys = chunk_keys.astype({dim: object for dim in self.dimensions})
+        if self.partitions is None:
+            self.partitions = chunk_keys.astype({dim: 'category' for dim in self.dimensions})
+            return local
+        known = self.partitions.astype({dim: object for dim in self.dimensions})
+        known['_id'] = np.arange(len(known))
+        matched = chunk_keys.merge(known, on=keys, how='left')['_id'].to_numpy(dtype=np.float64, copy=True)
+        new = np.isnan(matched)
+        matched[new] = len(known) + np.arange(new.sum())
+        added = pd.concat([known.drop(columns='_id'), chunk_keys[new]], ignore_index=True)
+        self.partitions = added.astype({dim: 'category' for dim in self.dimensions})
+        return matched.astype(np.int64)[local]
+
+    def _day_block(self, day_min, day_max):
+        # Grow the dense per-day registers so they cover [day_min, day_max]
+        if self.first_day is None:
+            self.first_day = day_min
+            for col in self.columns:
+                self.day_registers[col] = np.zeros((day_max - day_min + 1, self.m), dtype=np.uint8)
+            return
+        n_days = len(next(iter(self.day_registers.values())))
+        before = max(self.first_day - day_min, 0)
+        after = max(day_max - (self.first_day + n_days - 1), 0)
+        if before or after:
+            for col in self.columns:
+                self.day_registers[col] = np.pad(self.day_registers[col], ((before, after), (0, 0)))
+            self.first_day -= before
+
+    def update(self, df):
+        """Add the rows of df to the sketches."""
+        self.columns = [col for col in self.columns if col in df.columns]
+        self.dimensions = [dim for dim in self.dimensions if dim in df.columns]
+        days = order_days(df)
+        frame = pd.DataFrame({dim: df[dim] for dim in self.dimensions}, index=df.index)
+        frame['order_day'] = days
+        keys = ['order_day'] + self.dimensions
+        partition = self._partition_ids(frame, keys)
+
+        dated = ~np.isnat(df['order_date'].to_numpy())
+        if dated.any():
+            self._day_block(int(days[dated].min()), int(days[dated].max()))
+
+        for col in self.columns:
+            values = df[col]
+            present = values.notna().to_numpy()
+            index, rank = register_updates(values.to_numpy()[present], self.precision)
+
+            # Dense per-day sketches for date-only selections
+            in_day = dated[present]
+            if self.first_day is not None:
+                day_regs = self.day_registers[col]
+                day_pos = days[present][in_day] - self.first_day
+                np.maximum.at(day_regs.reshape(-1), day_pos * self.m + index[in_day], rank[in_day])
+            undated = self.undated_registers.setdefault(col, np.zeros(self.m, dtype=np.uint8))
+            np.maximum.at(undated, index[~in_day], rank[~in_day])
+
+            # Sparse per-partition sketches, consolidated lazily
+            flat = partition[present].astype(np.int64) * self.m + index
+            self._pending.setdefault(col, []).append((flat, rank))
+            pending = sum(len(part[0]) for part in self._pending[col])
+            consolidated = len(self.entries[col][0]) if col in self.entries else 0
+            if pending > max(consolidated, 1_000_000):
+                self._consolidate(col)
+        return self
+
+    def finish(self):
+        """Consolidate pending updates; call before sharing the sketches between threads."""
+        for col in list(self._pending):
+            self._consolidate(col)
+        return self
+
+    def _consolidate(self, col):
+        # Reduce pending (partition, register) updates to one max rank per pair
+        parts = self._pending.pop(col, [])
+        if not parts:
+            return
+        if col in self.entries:
+            partition, index, rank = self.entries[col]
+            parts.append((partition * self.m + index, rank))
+        flat = np.concatenate([part[0] for part in parts])
+        rank = np.concatenate([part[1] for part in parts])
+        best = pd.Series(rank).groupby(flat).max()
+        keys_flat = best.index.to_numpy()
+        self.entries[col] = (
+            keys_flat // self.m,
+            (keys_flat % self.m).astype(np.int32),
+            best.to_numpy().astype(np.uint8),
+        )
+
+    @property
+    def relative_error(self):
+        """Standard error of an estimate, as a fraction of the true count."""
+        return 1.04 / np.sqrt(self.m)
+
+    def registers(self, column, date_range=None, **selections):
+        """Merged sketch of every partition matching the filters."""
+        selections = {dim: value for dim, value in selections.items() if value is not None and value != 'All'}
+        if not selections:
+            day_regs = self.day_registers.get(column, np.zeros((0, self.m), dtype=np.uint8))
+            if date_range is None:
+                merged = np.maximum(day_regs.max(axis=0, initial=0), self.undated_registers[column])
+                return merged
+            first_day = self.first_day or 0
+            lo = max(to_day_number(date_range[0]) - first_day, 0)
+            hi = max(to_day_number(date_range[1]) - first_day + 1, 0)
+            return day_regs[lo:hi].max(axis=0, initial=0)
+
+        mask = np.ones(len(self.partitions), dtype=bool)
+        if date_range is not None:
+            days = self.partitions['order_day'].to_numpy()
+            mask &= (days >= to_day_number(date_range[0])) & (days <= to_day_number(date_range[1]))
+        for dim, value in selections.items():
+            mask &= (self.partitions[dim] == value).to_numpy()
+        self._consolidate(column)
+        partition, index, rank = self.entries[column]
+        selected = mask[partition]
+        merged = np.zeros(self.m, dtype=np.uint8)
+        np.maximum.at(merged, index[selected], rank[selected])
+        return merged
+
+    def estimate(self, column, date_range=None, **selections):
+        return estimate_cardinality(self.registers(column, date_range, **selections))
+
+
+def count_distinct(sketches, column, store, exact_threshold=EXACT_THRESHOLD, date_range=None, **selections):
+    """Distinct count and its relative standard error (0.0 when counted exactly).
+
+    ``store`` is a FrameStore or PartitionedStore; the column is only read when the
+    selection is small enough for an exact count.
+    """
+    if store.count(date_range, **selections) <= exact_threshold:
+        return store.read([column], date_range, **selections)[column].nunique(), 0.0
+    estimate = sketches.estimate(column, date_range, **selections)
+    return int(round(estimate)), sketches.relative_error
@@ -0,0 +1,179 @@
+import argparse
+import ast
+import datetime
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from .api import Analytics
+from .backends import QUERY_BACKEND, QUERY_BACKENDS
+from .figures import CHART_TABS, tab_figures
+from .ingest import CACHE_DIR, dataset_version
+from .topk import TOP_K
+
+# Most seconds the dashboard's imports may take in a fresh interpreter
+IMPORT_BUDGET = float(os.environ.get('DASHBOARD_IMPORT_BUDGET', 2.5))
+
+# The tab a new session opens on; the startup snapshot holds its default view
+STARTUP_TAB = CHART_TABS[0]
+
+# Key metrics of the startup tab that come straight from the KPI totals
+STARTUP_MEASURES = ['sales', 'order_profit_per_order', 'order_item_quantity']
+
+
+def startup_snapshot_path(path, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}.startup.json")
+
+
+def _metrics(kpis, columns):
+    if kpis is None:
+        return None
+    return {measure: kpis[measure].item() if hasattr(kpis[measure], 'item') else kpis[measure]
+            for measure in STARTUP_MEASURES if measure in columns}
+
+
+def startup_snapshot(queries, top_n=TOP_K):
+    """The default view of the startup tab: sidebar defaults, key metrics and figure JSON.
+
+    The filters are the ones a new session starts with (the whole date range, every
+    dimension on 'All'); the figures come from the same code the dashboard draws with.
+    """
+    filters = queries.select(date_range=queries.date_bounds()) if 'order_date' in queries.columns else {}
+    snapshot = {
+        'version': queries.version,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'tab': STARTUP_TAB,
+        'date_range': [day.isoformat() for day in filters.get('date_range', ())],
+        'rows': int(queries.count(**filters)),
+        'metrics': _metrics(queries.kpi_totals(**filters), queries.columns),
+        'previous_metrics': _metrics(queries.previous_kpi_totals(**filters), queries.columns),
+        'orders': None,
+        'figures': {
+            name: json.loads(fig.to_json())
+            for name, fig in tab_figures(queries, STARTUP_TAB, filters, top_n=top_n).items()
+        },
+    }
+    if 'order_id' in queries.columns:
+        orders, error = queries.distinct_count('order_id', **filters)
+        snapshot['orders'] = [int(orders), float(error)]
+    return snapshot
+
+
+def read_startup_snapshot(path, cache_dir=CACHE_DIR):
+    """The startup snapshot of the CSV as it is now, or None when missing or written for another version."""
+    try:
+        with open(startup_snapshot_path(path, cache_dir)) as handle:
+            snapshot = json.load(handle)
+        version = dataset_version(path)
+    except (OSError, ValueError):
+        return None
+    return snapshot if snapshot.get('version') == version else None
+
+
+def write_startup_snapshot(queries, path, cache_dir=CACHE_DIR, top_n=TOP_K, force=False):
+    """Write the startup snapshot for the dataset ``queries`` answers from, unless it is already there.
+
+    Returns the snapshot file, or None when the cache directory is read-only.
+    """
+    target = startup_snapshot_path(path, cache_dir)
+    if not force:
+        try:
+            with open(target) as handle:
+                if json.load(handle).get('version') == queries.version:
+                    return target
+        except (OSError, ValueError):
+            pass
+    snapshot = startup_snapshot(queries, top_n)
+    tmp = f"{target}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp, 'w') as handle:
+            json.dump(snapshot, handle)
+        os.replace(tmp, target)
+    except OSError:
+        # Read-only deployment: cold starts load the dataset before the first render
+        return None
+    return target
+
+
+def script_imports(script):
+    """Modules imported at the top level of a script, in order."""
+    with open(script) as handle:
+        tree = ast.parse(handle.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def import_times(modules, cwd=None):
+    """Seconds each module takes to import in a fresh interpreter, from ``python -X importtime``.
+
+    Returns a frame with the ``self`` and ``cumulative`` seconds and nesting ``depth``
+    of every module imported, and the total import time.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        capture_output=True, text=True, cwd=cwd, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        # import time:  <self us> | <cumulative us> | <two spaces per nesting level><module>
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self': int(own) / 1e6,
+            'cumulative': int(cumulative) / 1e6,
+        })
+    frame = pd.DataFrame(rows, columns=['module', 'depth', 'self', 'cumulative'])
+    return frame, float(frame.loc[frame['depth'] == 0, 'cumulative'].sum())
+
+
+def check_import_budget(script='dashboard.py', budget=IMPORT_BUDGET):
+    """Time the imports of ``script`` against ``budget`` seconds; returns (within budget, total, frame)."""
+    script = os.path.abspath(script)
+    frame, total = import_times(script_imports(script), cwd=os.path.dirname(script))
+    return total <= budget, total, frame
+
+
+def main(argv=None):
+    # python -m analytics.startup build incom2024_delay_example_dataset.csv
+    # python -m analytics.startup imports dashboard.py --budget 2.5
+    parser = argparse.ArgumentParser(description="Startup snapshot and import-time budget of the dashboard.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build the dataset cache and write the startup snapshot')
+    build.add_argument('path', help='source CSV')
+    build.add_argument('--mode', default=os.environ.get('DASHBOARD_INGEST_MODE', 'memory'), choices=['memory', 'chunked'])
+    build.add_argument('--backend', default=QUERY_BACKEND, choices=QUERY_BACKENDS)
+    build.add_argument('--cache-dir', default=CACHE_DIR)
+    imports = commands.add_parser('imports', help='check the import time of a script against a budget')
+    imports.add_argument('script', nargs='?', default='dashboard.py')
+    imports.add_argument('--budget', type=float, default=IMPORT_BUDGET, help='seconds')
+    imports.add_argument('--top', type=int, default=15, help='slowest modules to list')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        queries = Analytics.open(args.path, mode=args.mode, backend=args.backend, cache_dir=args.cache_dir)
+        target = write_startup_snapshot(queries, args.path, args.cache_dir, force=True)
+        print(f"startup snapshot of version {queries.version} written to {target}")
+        return 0
+
+    within, total, frame = check_import_budget(args.script, args.budget)
+    slowest = frame.sort_values('cumulative', ascending=False).head(args.top)
+    print(slowest.to_string(index=False))
+    print(f"{args.script}: imports take {total:.2f}s (budget {args.budget:.2f}s)")
+    return 0 if within else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
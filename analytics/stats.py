@@ -0,0 +1,251 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .filters import month_number, split_months
+from .store import _active
+
+# Selections up to this many rows get exact statistics from the rows themselves
+STATS_EXACT_ROWS = int(os.environ.get('DASHBOARD_STATS_EXACT_ROWS', 50_000))
+
+# Partition dimensions of the summaries, next to the order month
+STATS_PARTITION_DIMENSIONS = ['market', 'customer_segment']
+
+# t-digest compression: at most about this many centroids per partition and column
+DIGEST_COMPRESSION = 100
+
+# Columns with at most this many distinct values keep exact value counts instead of a t-digest
+DISCRETE_MAX_VALUES = int(os.environ.get('DASHBOARD_STATS_DISCRETE_VALUES', 256))
+
+# Numeric columns that hold codes rather than measures (on top of the *_id columns)
+NON_MEASURE_COLUMNS = ['customer_zipcode', 'label']
+
+DESCRIBE_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def measure_columns(columns):
+    """The numeric columns worth summarizing: everything but IDs and codes."""
+    return [col for col in columns if not col.endswith('_id') and col not in NON_MEASURE_COLUMNS]
+
+
+def _moments(group, values, n_groups):
+    # Count, mean, sum of squared deviations (Welford's M2), min and max per group
+    count = np.bincount(group, minlength=n_groups).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(group, weights=values, minlength=n_groups) / count
+    m2 = np.bincount(group, weights=(values - mean[group]) ** 2, minlength=n_groups)
+    low = np.full(n_groups, np.inf)
+    high = np.full(n_groups, -np.inf)
+    np.minimum.at(low, group, values)
+    np.maximum.at(high, group, values)
+    return {'count': count, 'mean': mean, 'm2': m2, 'min': low, 'max': high}
+
+
+def _merge_moments(group, moments, n_groups):
+    # Chan et al.: combine (count, mean, M2) of several parts into one per group
+    count = np.bincount(group, weights=moments['count'], minlength=n_groups)
+    weighted = np.where(moments['count'] > 0, moments['count'] * moments['mean'], 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(group, weights=weighted, minlength=n_groups) / count
+    spread = np.where(moments['count'] > 0, moments['count'] * (moments['mean'] - mean[group]) ** 2, 0.0)
+    m2 = np.bincount(group, weights=moments['m2'] + spread, minlength=n_groups)
+    low = np.full(n_groups, np.inf)
+    high = np.full(n_groups, -np.inf)
+    np.minimum.at(low, group, moments['min'])
+    np.maximum.at(high, group, moments['max'])
+    return {'count': count, 'mean': mean, 'm2': m2, 'min': low, 'max': high}
+
+
+def _digest(group, values, weights, compression=DIGEST_COMPRESSION):
+    """Compress weighted values into t-digest centroids per group.
+
+    Returns (group, mean, weight) arrays sorted by group, then by mean. The arcsine
+    scale keeps centroids small near the tails, where quantiles need precision.
+    """
+    order = np.lexsort((values, group))
+    group, values, weights = group[order], values[order], weights[order]
+    n_groups = int(group.max()) + 1 if len(group) else 0
+    totals = np.bincount(group, weights=weights, minlength=n_groups)
+    group_start = np.concatenate([[0.0], np.cumsum(totals)])[:-1]
+    before = np.cumsum(weights) - weights
+    q = (before - group_start[group] + weights / 2) / totals[group]
+    scale = np.floor(compression * (np.arcsin(2 * q - 1) / np.pi + 0.5)).astype(np.int64)
+    key = group * (compression + 1) + scale
+    # Keys are non-decreasing in this order, so each centroid is a contiguous run
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    weight = np.bincount(inverse, weights=weights)
+    mean = np.bincount(inverse, weights=values * weights) / weight
+    return group[first], mean, weight
+
+
+def _value_counts(group, values, weights):
+    """Exact weight of every distinct value per group, in the (group, mean, weight) layout of _digest."""
+    order = np.lexsort((values, group))
+    group, values, weights = group[order], values[order], weights[order]
+    change = np.concatenate([[True], (np.diff(group) != 0) | (np.diff(values) != 0)]) if len(group) else np.empty(0, bool)
+    run = np.cumsum(change) - 1
+    return group[change], values[change], np.bincount(run, weights=weights, minlength=int(change.sum()))
+
+
+def exact_quantiles(values, weights, quantiles):
+    """Quantiles of exact value counts, interpolated between order statistics as pandas does."""
+    order = np.argsort(values, kind='stable')
+    values, weights = values[order], weights[order]
+    # Rank (0-based) r holds the first value whose cumulative count exceeds r
+    ends = np.cumsum(weights)
+    position = np.asarray(quantiles) * (ends[-1] - 1)
+    below = values[np.searchsorted(ends, np.floor(position), side='right')]
+    above = values[np.searchsorted(ends, np.ceil(position), side='right')]
+    return below + (above - below) * (position - np.floor(position))
+
+
+def digest_quantiles(means, weights, low, high, quantiles):
+    """Quantiles from t-digest centroids, interpolating between centroid centers."""
+    order = np.argsort(means, kind='stable')
+    means, weights = means[order], weights[order]
+    total = weights.sum()
+    centers = np.cumsum(weights) - weights / 2
+    positions = np.concatenate([[0.0], centers, [total]])
+    values = np.concatenate([[low], means, [high]])
+    return np.interp(np.asarray(quantiles) * total, positions, values)
+
+
+class SummaryStatistics:
+    """Mergeable summaries of the measure columns per month x market x segment partition.
+
+    Each partition keeps Welford moments (count, mean, M2, min, max) and a t-digest
+    per column; columns with at most DISCRETE_MAX_VALUES distinct values (rates,
+    quantities, day counts) keep exact value counts instead, so their quartiles are
+    exact and always values that occur. The Detail Data table for a selection is
+    assembled by merging the partitions it covers; days at the edges of a date range
+    are read exactly. Built chunk by chunk with ``update``, like the other
+    partitioned summaries, which also extends it with appended rows.
+    """
+
+    def __init__(self, columns, dimensions=STATS_PARTITION_DIMENSIONS, compression=DIGEST_COMPRESSION):
+        self.columns = list(columns)
+        self.dimensions = list(dimensions)
+        self.compression = compression
+        self.partitions = None
+        self.moments = {}
+        self.digests = {}
+        self.discrete = {col: True for col in self.columns}
+        self._pending = []
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """Build from a FrameStore or PartitionedStore, batch by batch."""
+        stats = cls(measure_columns(store.numeric_columns), **kwargs)
+        stats.dimensions = [dim for dim in stats.dimensions if dim in store.columns]
+        for chunk in store.batches(stats.columns + ['order_date'] + stats.dimensions):
+            stats.update(chunk)
+        return stats.finish()
+
+    def _summarize(self, group, df, n_groups):
+        moments, digests, discrete = {}, {}, {}
+        for col in self.columns:
+            values = df[col].to_numpy(dtype=np.float64)
+            known = ~np.isnan(values)
+            moments[col] = _moments(group[known], values[known], n_groups)
+            points = (group[known], values[known], np.ones(known.sum()))
+            discrete[col] = self.discrete[col] and len(np.unique(points[1])) <= DISCRETE_MAX_VALUES
+            digests[col] = _value_counts(*points) if discrete[col] else _digest(*points, self.compression)
+        return moments, digests, discrete
+
+    def update(self, df):
+        """Add the rows of df."""
+        keys = pd.DataFrame({dim: df[dim].astype(object) for dim in self.dimensions}, index=df.index)
+        keys.insert(0, 'order_month', month_number(df['order_date']))
+        grouped = keys.groupby(list(keys.columns), dropna=False, sort=False)
+        group = grouped.ngroup().to_numpy()
+        _, first = np.unique(group, return_index=True)
+        table = keys.iloc[first].reset_index(drop=True)
+        self._pending.append((table,) + self._summarize(group, df, len(table)))
+        return self
+
+    def finish(self):
+        """Merge pending updates into one summary per partition."""
+        if not self._pending:
+            return self
+        parts = self._pending
+        if self.partitions is not None:
+            parts = [(self.partitions, self.moments, self.digests, self.discrete)] + parts
+        self._pending = []
+
+        tables = pd.concat([part[0] for part in parts], ignore_index=True)
+        keys = list(tables.columns)
+        group = tables.groupby(keys, dropna=False, sort=False).ngroup().to_numpy()
+        _, first = np.unique(group, return_index=True)
+        self.partitions = tables.iloc[first].reset_index(drop=True)
+        n_groups = len(self.partitions)
+        # Local partition ids of each part map to consecutive slices of the global ids
+        starts = np.cumsum([0] + [len(part[0]) for part in parts])
+
+        for col in self.columns:
+            moments = {
+                name: np.concatenate([part[1][col][name] for part in parts])
+                for name in ('count', 'mean', 'm2', 'min', 'max')
+            }
+            self.moments[col] = _merge_moments(group, moments, n_groups)
+            centroid_group = np.concatenate([
+                group[start + part[2][col][0]] for start, part in zip(starts, parts)
+            ])
+            centroids = (
+                centroid_group,
+                np.concatenate([part[2][col][1] for part in parts]),
+                np.concatenate([part[2][col][2] for part in parts]),
+            )
+            self.discrete[col] = (
+                all(part[3][col] for part in parts) and len(np.unique(centroids[1])) <= DISCRETE_MAX_VALUES
+            )
+            self.digests[col] = _value_counts(*centroids) if self.discrete[col] else _digest(*centroids, self.compression)
+        return self
+
+    def query(self, store, date_range=None, **selections):
+        """describe()-style table (count, mean, std, min, quartiles, max) for a selection.
+
+        Returns None when the selection filters on a dimension that is not a partition dimension.
+        """
+        active = _active(selections)
+        if not set(active) <= set(self.dimensions):
+            return None
+        chosen = np.ones(len(self.partitions), dtype=bool)
+        edges = []
+        if date_range is not None:
+            first, last, edges = split_months(date_range)
+            months = self.partitions['order_month'].to_numpy()
+            chosen &= (months >= first) & (months <= last)
+        for dim, value in active.items():
+            chosen &= (self.partitions[dim] == value).to_numpy()
+
+        edge_rows = [store.read(self.columns, date_range=edge, **active) for edge in edges]
+        rows = []
+        for col in self.columns:
+            parts = {name: values[chosen] for name, values in self.moments[col].items()}
+            group, means, weights = self.digests[col]
+            means, weights = means[chosen[group]], weights[chosen[group]]
+            for frame in edge_rows:
+                values = frame[col].to_numpy(dtype=np.float64)
+                values = values[~np.isnan(values)]
+                edge = _moments(np.zeros(len(values), dtype=np.int64), values, 1)
+                parts = {name: np.concatenate([parts[name], edge[name]]) for name in parts}
+                means = np.concatenate([means, values])
+                weights = np.concatenate([weights, np.ones(len(values))])
+
+            total = _merge_moments(np.zeros(len(parts['count']), dtype=np.int64), parts, 1)
+            count = total['count'][0]
+            if count == 0:
+                rows.append([0.0] + [np.nan] * 7)
+                continue
+            std = np.sqrt(total['m2'][0] / (count - 1)) if count > 1 else np.nan
+            if self.discrete[col]:
+                quartiles = exact_quantiles(means, weights, DESCRIBE_QUANTILES)
+            else:
+                quartiles = digest_quantiles(means, weights, total['min'][0], total['max'][0], DESCRIBE_QUANTILES)
+            rows.append([count, total['mean'][0], std, total['min'][0], *quartiles, total['max'][0]])
+        return pd.DataFrame(
+            rows,
+            index=pd.Index(self.columns),
+            columns=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+        )
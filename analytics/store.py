@@ -0,0 +1,255 @@
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .cube import day_to_date
+from .filters import FilterIndex, take_rows
+from .paging import SortIndex
+
+# Column of the partitioned files holding each row's position in the source CSV
+SOURCE_ROW = 'source_row'
+
+
+def _selection_key(date_range=None, **selections):
+    return (tuple(date_range) if date_range is not None else None, tuple(sorted(selections.items())))
+
+
+def _active(selections):
+    return {dim: value for dim, value in selections.items() if value is not None and value != 'All'}
+
+
+def _conjunction(conditions):
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+class FrameStore:
+    """Row-level reads from the in-memory frame, resolved through its FilterIndex.
+
+    Every method takes the sidebar filters as ``date_range`` plus one keyword per dimension.
+    """
+
+    def __init__(self, df, index=None):
+        self.frame = df
+        self.index = index if index is not None else FilterIndex(df)
+        self.sort_index = SortIndex(lambda column: self.frame[column])
+        self._last = (None, None)
+
+    @property
+    def columns(self):
+        return self.frame.columns.tolist()
+
+    @property
+    def numeric_columns(self):
+        return self.frame.select_dtypes(include=['number']).columns.tolist()
+
+    def date_bounds(self):
+        return self.frame['order_date'].min().date(), self.frame['order_date'].max().date()
+
+    def rows(self, date_range=None, **selections):
+        """Selected row positions, None for all rows; the last selection is memoized."""
+        key = _selection_key(date_range, **selections)
+        last_key, last_rows = self._last
+        if key == last_key:
+            return last_rows
+        rows = self.index.select(date_range=date_range, **selections)
+        self._last = (key, rows)
+        return rows
+
+    def options(self, dim, date_range=None, **selections):
+        return self.index.options(dim, self.rows(date_range, **selections))
+
+    def count(self, date_range=None, **selections):
+        rows = self.rows(date_range, **selections)
+        return len(self.frame) if rows is None else len(rows)
+
+    def read(self, columns, date_range=None, **selections):
+        return take_rows(self.frame[columns], self.rows(date_range, **selections))
+
+    def batches(self, columns):
+        """All rows of some columns as an iterator of frames (a single one here)."""
+        yield self.frame[columns]
+
+    def page(self, columns, start, stop, sort_by=None, descending=False, date_range=None, **selections):
+        """Rows ``start:stop`` of the selection, optionally in the order of the ``sort_by`` column.
+
+        Only the cells of the page are copied, never a column subset of the whole selection.
+        """
+        rows = self.rows(date_range, **selections)
+        if sort_by is not None:
+            key = _selection_key(date_range, **selections)
+            rows = self.sort_index.arrange(sort_by, rows, len(self.frame), descending, key=key)
+        page_rows = np.arange(start, min(stop, len(self.frame))) if rows is None else rows[start:stop]
+        return self.frame.iloc[page_rows, self.frame.columns.get_indexer(columns)]
+
+
+class PartitionedStore:
+    """Row-level reads from a month-partitioned Parquet dataset, scanned on demand.
+
+    Only the requested columns are read, and the filters are pushed down to the
+    scan: month partitions outside the date range are skipped entirely. Options,
+    counts and date bounds come from the cube, so they never touch the files.
+    Files are memory-mapped; pages of raw rows are read row group by row group.
+    Rows are stored by month, so unsorted pages follow the SOURCE_ROW column to
+    come back in file order.
+    """
+
+    def __init__(self, root, cube):
+        # pyarrow.dataset is only imported in chunked mode: it is slow to import
+        import pyarrow.dataset as ds
+        import pyarrow.fs as pafs
+
+        self.dataset = ds.dataset(
+            root, format='parquet', partitioning='hive', filesystem=pafs.LocalFileSystem(use_mmap=True),
+        )
+        self.cube = cube
+        self.sort_index = SortIndex(self._read_column)
+        self._groups = None
+        self._groups_lock = threading.Lock()
+        self._last = (None, None)
+
+    @property
+    def columns(self):
+        return [name for name in self.dataset.schema.names if name not in ('order_month', SOURCE_ROW)]
+
+    @property
+    def numeric_columns(self):
+        return [
+            field.name for field in self.dataset.schema
+            if (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)) and field.name != SOURCE_ROW
+        ]
+
+    def date_bounds(self):
+        days = self.cube.cells['order_day']
+        return day_to_date([days.min()])[0], day_to_date([days.max()])[0]
+
+    def _conditions(self, date_range=None, **selections):
+        # Conditions on the month partitions, and on the columns stored in the files
+        import pyarrow.dataset as ds
+
+        partitions, rows = [], []
+        if date_range is not None:
+            start, end = (pd.Timestamp(value) for value in date_range)
+            date_type = self.dataset.schema.field('order_date').type
+            partitions += [
+                ds.field('order_month') >= start.strftime('%Y-%m'),
+                ds.field('order_month') <= end.strftime('%Y-%m'),
+            ]
+            rows += [
+                ds.field('order_date') >= pa.scalar(start, type=date_type),
+                ds.field('order_date') < pa.scalar(end + datetime.timedelta(days=1), type=date_type),
+            ]
+        for dim, value in _active(selections).items():
+            rows.append(ds.field(dim) == value)
+        return partitions, rows
+
+    def expression(self, date_range=None, **selections):
+        """Arrow filter expression for the sidebar filters, or None when nothing is filtered."""
+        partitions, rows = self._conditions(date_range, **selections)
+        return _conjunction(partitions + rows)
+
+    def options(self, dim, date_range=None, **selections):
+        cells = self.cube.slice(date_range, **selections)
+        return sorted(cells[dim].dropna().unique().tolist())
+
+    def count(self, date_range=None, **selections):
+        return int(self.cube.slice(date_range, **selections)['rows'].sum())
+
+    def read(self, columns, date_range=None, **selections):
+        table = self.dataset.to_table(columns=columns, filter=self.expression(date_range, **selections))
+        return table.to_pandas()
+
+    def batches(self, columns):
+        """All rows of some columns, one record batch at a time."""
+        for batch in self.dataset.to_batches(columns=columns):
+            yield batch.to_pandas()
+
+    def row_groups(self):
+        """Every row group of the dataset in a fixed order, with global row offsets.
+
+        Returns the fragments by path, the (path, row group id) of each group and the
+        offsets of their first rows (plus the total row count). Read from file
+        metadata once; row positions in the pager refer to this order.
+        """
+        with self._groups_lock:
+            if self._groups is None:
+                fragments = {fragment.path: fragment for fragment in self.dataset.get_fragments()}
+                groups, sizes = [], []
+                for path in sorted(fragments):
+                    for row_group in fragments[path].row_groups:
+                        groups.append((path, row_group.id))
+                        sizes.append(row_group.num_rows)
+                self._groups = (fragments, groups, np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)]))
+            return self._groups
+
+    def _read_group(self, group, columns):
+        fragments, groups, _ = self.row_groups()
+        path, row_group = groups[group]
+        fragment = fragments[path].subset(row_group_ids=[row_group])
+        return fragment.to_table(columns=columns, schema=self.dataset.schema, use_threads=False)
+
+    def _read_column(self, column):
+        # All values of a column in row-position order, for the sort index
+        _, groups, _ = self.row_groups()
+        chunks = [self._read_group(group, [column]).column(column) for group in range(len(groups))]
+        return pa.chunked_array(chunks, type=self.dataset.schema.field(column).type).to_pandas()
+
+    def positions(self, date_range=None, **selections):
+        """Row positions of the selection, None for all rows; the last selection is memoized.
+
+        Month partitions and row groups whose statistics rule them out are skipped;
+        of the rest, only the filtered columns are read.
+        """
+        key = _selection_key(date_range, **selections)
+        last_key, last_rows = self._last
+        if key == last_key:
+            return last_rows
+        partitions, conditions = self._conditions(date_range, **selections)
+        if not conditions:
+            return None
+        _, groups, offsets = self.row_groups()
+        number = {group: i for i, group in enumerate(groups)}
+        condition = _conjunction(conditions)
+        filter_columns = list(_active(selections)) + (['order_date'] if date_range is not None else [])
+        found = []
+        for fragment in self.dataset.get_fragments(filter=_conjunction(partitions + conditions)):
+            for piece in fragment.split_by_row_group(condition):
+                group = number[(fragment.path, piece.row_groups[0].id)]
+                table = piece.to_table(columns=filter_columns, schema=self.dataset.schema, use_threads=False)
+                table = table.append_column('__row', pa.array(np.arange(table.num_rows, dtype=np.int64)))
+                found.append(table.filter(condition).column('__row').to_numpy() + offsets[group])
+        rows = np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+        self._last = (key, rows)
+        return rows
+
+    def page(self, columns, start, stop, sort_by=None, descending=False, date_range=None, **selections):
+        """Rows ``start:stop`` of the selection, in the order of the ``sort_by`` column or else in file order.
+
+        Only the row groups holding the rows of the page are read, and only their requested columns.
+        """
+        _, _, offsets = self.row_groups()
+        rows = self.positions(date_range, **selections)
+        if sort_by is None and SOURCE_ROW in self.dataset.schema.names:
+            sort_by, descending = SOURCE_ROW, False
+        if sort_by is not None:
+            key = _selection_key(date_range, **selections)
+            rows = self.sort_index.arrange(sort_by, rows, int(offsets[-1]), descending, key=key)
+        page_rows = np.arange(start, min(stop, offsets[-1])) if rows is None else np.asarray(rows[start:stop], dtype=np.int64)
+
+        group_of = np.searchsorted(offsets, page_rows, side='right') - 1
+        order = np.argsort(group_of, kind='stable')
+        tables = []
+        for group in np.unique(group_of):
+            local = page_rows[order][group_of[order] == group] - offsets[group]
+            tables.append(self._read_group(group, columns).take(pa.array(local)))
+        if not tables:
+            return self.dataset.schema.empty_table().select(columns).to_pandas()
+        # Tables follow the row groups; put the rows back in page order
+        return pa.concat_tables(tables).take(pa.array(np.argsort(order))).to_pandas()
@@ -0,0 +1,165 @@
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Rows generated and written per chunk; memory stays flat for any output size
+SYNTHETIC_CHUNK_ROWS = int(os.environ.get('DASHBOARD_SYNTHETIC_CHUNK_ROWS', 500_000))
+
+# Columns of the source CSV, in file order
+SOURCE_COLUMNS = [
+    'payment_type', 'profit_per_order', 'sales_per_customer', 'category_id', 'category_name',
+    'customer_city', 'customer_country', 'customer_id', 'customer_segment', 'customer_state',
+    'customer_zipcode', 'department_id', 'department_name', 'latitude', 'longitude',
+    'order_customer_id', 'order_date', 'order_id', 'order_item_cardprod_id', 'order_item_discount',
+    'order_item_discount_rate', 'order_item_id', 'order_item_product_price', 'order_item_profit_ratio',
+    'order_item_quantity', 'sales', 'order_item_total_amount', 'order_profit_per_order', 'order_region',
+    'order_state', 'order_status', 'product_card_id', 'product_category_id', 'product_description',
+    'product_image', 'product_name', 'product_price', 'product_status', 'shipping_date',
+    'shipping_mode', 'label', 'market',
+]
+
+MARKET_REGIONS = {
+    'Africa': ['North Africa', 'West Africa'],
+    'Europe': ['Northern Europe', 'Southern Europe', 'Western Europe'],
+    'LATAM': ['Caribbean', 'Central America', 'South America'],
+    'Pacific Asia': ['Eastern Asia', 'Oceania', 'Southeast Asia'],
+    'USCA': ['Canada', 'US Center', 'West of USA'],
+}
+
+CATEGORIES = ['Camping & Hiking', 'Cardio Equipment', 'Cleats', 'Fishing', 'Indoor/Outdoor Games', 'Water Sports']
+DEPARTMENTS = ['Apparel', 'Fan Shop', 'Golf']
+SEGMENTS = ['Consumer', 'Corporate', 'Home Office']
+PAYMENT_TYPES = ['CASH', 'DEBIT', 'PAYMENT', 'TRANSFER']
+ORDER_STATUSES = ['CLOSED', 'COMPLETE', 'PENDING', 'PROCESSING']
+CUSTOMER_PLACES = [('Brooklyn', 'NY', 'EE. UU.'), ('Caguas', 'PR', 'Puerto Rico'), ('Chicago', 'IL', 'EE. UU.'), ('Los Angeles', 'CA', 'EE. UU.')]
+ORDER_STATES = ['Java Occidental', 'Queensland', 'Rajastán']
+PRODUCT_NAMES = ["Nike Men's Free 5.0+", 'Perfect Fitness Perfect Rip Deck']
+DISCOUNT_RATES = [0.05, 0.1, 0.18, 0.25]
+
+# Shipping modes with their scheduled shipping days
+SHIPPING_MODES = {'First Class': 1, 'Same Day': 0, 'Second Class': 2, 'Standard Class': 4}
+
+
+def _choose(values, codes):
+    # Strings by code, gathered in Arrow: much faster than building object arrays
+    return pa.array(values).take(pa.array(codes))
+
+
+def synthetic_table(n_rows, seed=0, first_row=0, n_customers=None, start='2015-01-01', n_days=1100):
+    """Random rows in the layout of the source CSV (dates as ISO strings), as an Arrow table.
+
+    Regions belong to their market, the shipping date follows the order date by the
+    scheduled days of the shipping mode, and ``label`` (-1 early, 0 on time, 1 delayed)
+    matches the actual against the scheduled days. Rows are deterministic for a given
+    ``seed`` and ``first_row``, so a file can be generated chunk by chunk. Customer
+    IDs are drawn from ``n_customers`` (a fifth of the rows by default).
+    """
+    rng = np.random.default_rng([seed, first_row])
+
+    def pick(values):
+        return _choose(values, rng.integers(0, len(values), n_rows))
+
+    markets = list(MARKET_REGIONS)
+    market = rng.integers(0, len(markets), n_rows)
+    # Regions of all markets in one list; each market picks from its own slice
+    regions = [region for name in markets for region in MARKET_REGIONS[name]]
+    first_region = np.cumsum([0] + [len(MARKET_REGIONS[name]) for name in markets])[:-1]
+    region_count = np.array([len(MARKET_REGIONS[name]) for name in markets])
+    region = first_region[market] + rng.integers(0, 6, n_rows) % region_count[market]
+
+    modes = list(SHIPPING_MODES)
+    mode = rng.integers(0, len(modes), n_rows)
+    scheduled = np.array(list(SHIPPING_MODES.values()))[mode]
+    actual = np.clip(scheduled + rng.integers(-2, 3, n_rows), 0, None)
+    order_day = rng.integers(0, n_days, n_rows)
+    # ISO strings of every day an order or shipment can fall on, e.g. 2017-10-24T00:00:00.000Z
+    day_labels = [
+        f"{day}T00:00:00.000Z"
+        for day in np.datetime64(start, 'D') + np.arange(n_days + max(SHIPPING_MODES.values()) + 3)
+    ]
+
+    n_customers = n_customers or max(1000, (first_row + n_rows) // 5)
+    place = rng.integers(0, len(CUSTOMER_PLACES), n_rows)
+    category = rng.integers(0, len(CATEGORIES), n_rows)
+    product_price = np.round(rng.gamma(2.0, 100.0, n_rows) + 1, 2)
+    quantity = rng.integers(1, 6, n_rows)
+    discount_rate = np.asarray(DISCOUNT_RATES)[rng.integers(0, len(DISCOUNT_RATES), n_rows)]
+    sales = np.round(product_price * quantity * (1 - discount_rate) * rng.uniform(0.3, 1.0, n_rows), 2)
+    profit_ratio = np.round(rng.uniform(-0.8, 0.5, n_rows), 2)
+    product_card = rng.integers(1, 1400, n_rows)
+    row_number = first_row + np.arange(n_rows)
+
+    columns = {
+        'payment_type': pick(PAYMENT_TYPES),
+        'profit_per_order': np.round(rng.normal(20, 50, n_rows), 2),
+        'sales_per_customer': np.round(sales * rng.uniform(0.8, 2.5, n_rows), 2),
+        'category_id': category * 8 + rng.integers(1, 9, n_rows),
+        'category_name': _choose(CATEGORIES, category),
+        'customer_city': _choose([city for city, _, _ in CUSTOMER_PLACES], place),
+        'customer_country': _choose([country for _, _, country in CUSTOMER_PLACES], place),
+        'customer_id': rng.integers(1, n_customers + 1, n_rows),
+        'customer_segment': pick(SEGMENTS),
+        'customer_state': _choose([state for _, state, _ in CUSTOMER_PLACES], place),
+        'customer_zipcode': rng.integers(600, 99999, n_rows),
+        'department_id': rng.integers(2, 12, n_rows),
+        'department_name': pick(DEPARTMENTS),
+        'latitude': rng.uniform(-33.9, 48.8, n_rows),
+        'longitude': rng.uniform(-158.0, 115.3, n_rows),
+        'order_customer_id': rng.integers(1, 20_000, n_rows),
+        'order_date': _choose(day_labels, order_day),
+        'order_id': row_number // 3 + 1,
+        'order_item_cardprod_id': product_card,
+        'order_item_discount': np.round(product_price * quantity * discount_rate, 2),
+        'order_item_discount_rate': discount_rate,
+        'order_item_id': row_number + 1,
+        'order_item_product_price': product_price,
+        'order_item_profit_ratio': profit_ratio,
+        'order_item_quantity': quantity,
+        'sales': sales,
+        'order_item_total_amount': np.round(sales * rng.uniform(0.9, 1.3, n_rows), 2),
+        'order_profit_per_order': np.round(sales * profit_ratio, 2),
+        'order_region': _choose(regions, region),
+        'order_state': pick(ORDER_STATES),
+        'order_status': pick(ORDER_STATUSES),
+        'product_card_id': product_card,
+        'product_category_id': category * 12 + rng.integers(1, 13, n_rows),
+        'product_description': pa.nulls(n_rows, type=pa.float64()),
+        'product_image': pick(['http://images.acmesports.sports/x']),
+        'product_name': pick(PRODUCT_NAMES),
+        'product_price': np.round(product_price * rng.uniform(0.9, 1.2, n_rows), 2),
+        'product_status': np.zeros(n_rows, dtype=np.int64),
+        'shipping_date': _choose(day_labels, order_day + actual),
+        'shipping_mode': _choose(modes, mode),
+        'label': np.sign(actual - scheduled),
+        'market': _choose(markets, market),
+    }
+    return pa.table({col: columns[col] for col in SOURCE_COLUMNS})
+
+
+def synthetic_frame(n_rows, seed=0, first_row=0, **kwargs):
+    """synthetic_table as a pandas frame, as read_csv would return the raw file."""
+    return synthetic_table(n_rows, seed=seed, first_row=first_row, **kwargs).to_pandas()
+
+
+def write_synthetic_csv(path, n_rows, seed=0, chunk_rows=SYNTHETIC_CHUNK_ROWS):
+    """Write ``n_rows`` synthetic rows to a CSV in the source format, one chunk at a time.
+
+    Chunks are written with Arrow's multi-threaded CSV writer; missing values become empty fields.
+    """
+    tmp = f"{path}.tmp-{os.getpid()}"
+    writer = None
+    try:
+        for first_row in range(0, n_rows, chunk_rows):
+            table = synthetic_table(
+                min(chunk_rows, n_rows - first_row), seed=seed, first_row=first_row, n_customers=max(1000, n_rows // 5),
+            )
+            if writer is None:
+                writer = pacsv.CSVWriter(tmp, table.schema, write_options=pacsv.WriteOptions(quoting_style='needed'))
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp, path)
+    return path
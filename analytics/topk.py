@@ -0,0 +1,167 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .filters import month_number, split_months
+from .store import _active
+
+# Default number of entries in top-K charts
+TOP_K = int(os.environ.get('DASHBOARD_TOP_K', 10))
+
+# Partition dimensions of the per-key totals, next to the order month
+TOP_PARTITION_DIMENSIONS = ['market', 'customer_segment']
+
+
+def top_k(keys, totals, k):
+    """The ``k`` largest totals, in descending order (ties by key), without sorting everything."""
+    keys = np.asarray(keys)
+    totals = np.asarray(totals)
+    if k < len(totals):
+        # Totals tied with the k-th largest are taken by key, as a full sort would
+        threshold = -np.partition(-totals, k - 1)[k - 1]
+        above = np.flatnonzero(totals > threshold)
+        tied = np.flatnonzero(totals == threshold)
+        tied = tied[np.argsort(keys[tied], kind='stable')[:k - len(above)]]
+        chosen = np.concatenate([above, tied])
+        keys, totals = keys[chosen], totals[chosen]
+    order = np.lexsort((keys, -totals))
+    return keys[order], totals[order]
+
+
+def top_k_series(series, k):
+    """The ``k`` largest values of a Series, descending."""
+    index, values = top_k(np.arange(len(series)), series.to_numpy(), k)
+    return series.iloc[index]
+
+
+class PartitionTotals:
+    """Totals of a measure per key (e.g. sales per customer) in each month x market x segment partition.
+
+    Keys are factorized once into dense codes (``key_values`` maps them back), and
+    entries are grouped by partition, so a top-K query only touches the partitions a
+    selection covers and sums them with ``np.bincount`` over the codes before
+    ``np.partition`` finds the K largest; nothing is sorted. Like the sketches it is
+    built chunk by chunk with ``update``, also to extend it with appended rows.
+    """
+
+    def __init__(self, key='customer_id', measure='sales', dimensions=TOP_PARTITION_DIMENSIONS):
+        self.key = key
+        self.measure = measure
+        self.dimensions = list(dimensions)
+        self.partitions = None
+        self.offsets = None
+        self.codes = None
+        self.totals = None
+        self.key_values = None
+        self._key_index = None
+        self._pending = []
+
+    @property
+    def columns(self):
+        """Columns an update needs."""
+        return [self.key, self.measure, 'order_date'] + self.dimensions
+
+    @classmethod
+    def from_chunks(cls, chunks, **kwargs):
+        totals = cls(**kwargs)
+        for chunk in chunks:
+            totals.update(chunk)
+        return totals.finish()
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """Build from a FrameStore or PartitionedStore, batch by batch."""
+        totals = cls(**kwargs)
+        totals.dimensions = [dim for dim in totals.dimensions if dim in store.columns]
+        for chunk in store.batches(totals.columns):
+            totals.update(chunk)
+        return totals.finish()
+
+    def update(self, df):
+        """Add the rows of df."""
+        self.dimensions = [dim for dim in self.dimensions if dim in df.columns]
+        frame = pd.DataFrame({dim: df[dim].astype(object) for dim in self.dimensions}, index=df.index)
+        frame['order_month'] = month_number(df['order_date'])
+        frame[self.key] = df[self.key]
+        frame[self.measure] = df[self.measure].astype(np.float64)
+        keys = ['order_month'] + self.dimensions + [self.key]
+        self._pending.append(frame.groupby(keys, dropna=False, sort=False)[self.measure].sum().reset_index())
+        return self
+
+    def finish(self):
+        """Consolidate pending updates into partition-sorted arrays of key codes and totals."""
+        if not self._pending:
+            return self
+        partition_keys = ['order_month'] + self.dimensions
+        pending = pd.concat(self._pending, ignore_index=True)
+        self._pending = []
+        # Known keys come first, so their codes stay the same; new keys get the next ones
+        known = self.key_values if self.key_values is not None else pending[self.key].to_numpy()[:0]
+        codes, self.key_values = pd.factorize(np.concatenate([known, pending[self.key].to_numpy()]))
+        self.key_values = np.asarray(self.key_values)
+        self._key_index = None
+        pending = pending.drop(columns=self.key).assign(code=codes[len(known):])
+        # Rows without a key never rank
+        pending = pending[pending['code'] >= 0]
+        parts = [pending]
+        if self.partitions is not None:
+            existing = self.partitions.loc[self.partitions.index.repeat(np.diff(self.offsets))].reset_index(drop=True)
+            existing['code'] = self.codes
+            existing[self.measure] = self.totals
+            parts = [existing, pending]
+        merged = pd.concat(parts, ignore_index=True)
+        merged = merged.groupby(partition_keys + ['code'], dropna=False)[self.measure].sum().reset_index()
+
+        grouped = merged.groupby(partition_keys, dropna=False, sort=False)
+        partition = grouped.ngroup().to_numpy()
+        order = np.argsort(partition, kind='stable')
+        counts = np.bincount(partition)
+        self.partitions = merged.iloc[order].drop_duplicates(partition_keys)[partition_keys].reset_index(drop=True)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.codes = merged['code'].to_numpy(dtype=np.int64)[order]
+        self.totals = merged[self.measure].to_numpy()[order]
+        return self
+
+    def encode(self, keys):
+        """Codes of some key values; -1 for keys that have no code."""
+        if self._key_index is None:
+            self._key_index = pd.Index(self.key_values)
+        return self._key_index.get_indexer(keys)
+
+    def query(self, k, store, date_range=None, **selections):
+        """Top ``k`` keys by total for a selection, as a frame of key and measure.
+
+        Whole months come from the partitions; days at the edges of a date range are
+        read exactly from ``store``. Returns None when the selection filters on a
+        dimension that is not a partition dimension.
+        """
+        active = _active(selections)
+        if not set(active) <= set(self.dimensions):
+            return None
+        mask = np.ones(len(self.partitions), dtype=bool)
+        edges = []
+        if date_range is not None:
+            first, last, edges = split_months(date_range)
+            months = self.partitions['order_month'].to_numpy()
+            mask &= (months >= first) & (months <= last)
+        for dim, value in active.items():
+            mask &= (self.partitions[dim] == value).to_numpy()
+
+        chosen = np.flatnonzero(mask)
+        spans = [np.arange(self.offsets[i], self.offsets[i + 1]) for i in chosen]
+        rows = np.concatenate(spans) if spans else np.empty(0, dtype=np.int64)
+        codes = [self.codes[rows]]
+        totals = [self.totals[rows]]
+        for edge in edges:
+            edge_rows = store.read([self.key, self.measure], date_range=edge, **active)
+            codes.append(self.encode(edge_rows[self.key].to_numpy()))
+            totals.append(edge_rows[self.measure].to_numpy(dtype=np.float64))
+
+        codes = np.concatenate(codes)
+        valid = codes >= 0
+        n_keys = len(self.key_values)
+        sums = np.bincount(codes[valid], weights=np.concatenate(totals)[valid], minlength=n_keys)
+        present = np.flatnonzero(np.bincount(codes[valid], minlength=n_keys))
+        top_keys, top_totals = top_k(self.key_values[present], sums[present], k)
+        return pd.DataFrame({self.key: top_keys, self.measure: top_totals})
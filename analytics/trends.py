@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .cube import day_to_date
+
+# Most points a trend line draws; longer spans switch to a coarser resolution
+TREND_MAX_POINTS = int(os.environ.get('DASHBOARD_TREND_POINTS', 400))
+
+# Series with more points than this are drawn with WebGL traces
+WEBGL_MIN_POINTS = 1000
+
+# Resolutions from finest to coarsest, with their approximate length in days
+RESOLUTION_DAYS = {'day': 1, 'week': 7, 'month': 31}
+
+
+def pick_resolution(n_days, max_points=TREND_MAX_POINTS):
+    """Finest resolution that draws a span of ``n_days`` in at most ``max_points`` points."""
+    for resolution, days in RESOLUTION_DAYS.items():
+        if n_days / days <= max_points:
+            return resolution
+    return 'month'
+
+
+class TimeBuckets:
+    """Week (starting Monday) and month bucket of every day in a date span.
+
+    Built once per dataset version; a trend at any resolution is then two
+    ``np.bincount`` calls over the cube cells, with no date parsing per rerun.
+    """
+
+    def __init__(self, first_day, last_day):
+        self.first_day = first_day
+        self.n_days = max(last_day - first_day + 1, 0)
+        days = np.arange(first_day, first_day + self.n_days)
+        # Day 0 (1970-01-01) is a Thursday, so Mondays are days 4, 11, ...
+        starts = {
+            'day': days,
+            'week': days - (days - 4) % 7,
+            'month': days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64),
+        }
+        self.bucket = {}
+        self.labels = {}
+        for resolution, start in starts.items():
+            self.labels[resolution], self.bucket[resolution] = np.unique(start, return_inverse=True)
+
+    @classmethod
+    def from_cube(cls, cube):
+        days = cube.cells['order_day'].to_numpy()
+        # Undated rows have a NaT order day, which maps to a huge negative number
+        days = days[days > np.iinfo(np.int64).min]
+        if len(days) == 0:
+            return cls(0, -1)
+        return cls(int(days.min()), int(days.max()))
+
+    def series(self, cells, measure, resolution='day'):
+        """Sum of a measure per bucket start date, for the buckets that have rows."""
+        offsets = cells['order_day'].to_numpy() - self.first_day
+        valid = (offsets >= 0) & (offsets < self.n_days)
+        offsets = offsets[valid]
+        weights = cells[measure].to_numpy(dtype=np.float64)[valid]
+        bucket = self.bucket[resolution][offsets]
+        n_buckets = len(self.labels[resolution])
+        totals = np.bincount(bucket, weights=weights, minlength=n_buckets)
+        present = np.bincount(bucket, minlength=n_buckets) > 0
+        return pd.Series(totals[present], index=day_to_date(self.labels[resolution][present]), name=measure)
+
+
+def lttb(x, y, n_out):
+    """Positions of ``n_out`` points that keep the visual shape of (x, y).
+
+    Largest-Triangle-Three-Buckets: keeps the first and last points, and from each
+    bucket in between the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = [0]
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        a = selected[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        selected.append(lo + int(np.argmax(area)))
+    selected.append(n - 1)
+    return np.asarray(selected)
+
+
+def downsample(series, max_points=TREND_MAX_POINTS):
+    """A date-indexed series reduced to at most ``max_points`` points with LTTB.
+
+    A reduced series keeps its original number of points in ``attrs['points']``.
+    """
+    if len(series) <= max_points:
+        return series
+    x = pd.to_datetime(pd.Index(series.index)).to_numpy(dtype='datetime64[D]').astype(np.int64)
+    reduced = series.iloc[lttb(x, series.to_numpy(), max_points)]
+    reduced.attrs['points'] = len(series)
+    return reduced
+
+
+def source_points(series):
+    """Number of points a trend had before ``downsample``."""
+    return series.attrs.get('points', len(series))
@@ -1,12 +1,39 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import seaborn as sns
-from plotly.subplots import make_subplots
+import os
+import threading
+
+from analytics import (
+    AggregationCache,
+    Analytics,
+    ChartTooLarge,
+    DELAY_BREAKDOWNS,
+    LiveDataset,
+    QUERY_BACKEND,
+    SectionProfiler,
+    TOP_K,
+    TREND_MAX_POINTS,
+    category_sales_figure,
+    chart_points,
+    check_chart,
+    country_sales_figure,
+    delay_breakdown_figure,
+    delivery_status_figure,
+    load_memory_report,
+    market_shipping_time_figure,
+    open_backend,
+    profit_trend_figure,
+    region_delivery_figure,
+    region_sales_figure,
+    sales_trend_figure,
+    segment_average_sales_figure,
+    segment_sales_figure,
+    shipping_mode_figure,
+    shipping_profit_figure,
+    shipping_time_figure,
+    shipping_time_histogram_figure,
+    top_customers_figure,
+)
+from analytics.startup import read_startup_snapshot, write_startup_snapshot
 
 # Set page configuration
 st.set_page_config(
@@ -31,19 +58,15 @@ st.markdown("""
     h1, h2, h3 {
         color: #2c3e50;
     }
-    .stTabs [data-baseweb="tab-list"] {
+    div[role="radiogroup"] {
         gap: 8px;
     }
-    .stTabs [data-baseweb="tab"] {
-        height: 50px;
-        white-space: pre-wrap;
+    div[role="radiogroup"] > label {
         background-color: #f0f2f6;
-        border-radius: 4px 4px 0px 0px;
-        gap: 1px;
-        padding-top: 10px;
-        padding-bottom: 10px;
+        border-radius: 4px;
+        padding: 10px 16px;
     }
-    .stTabs [aria-selected="true"] {
+    div[role="radiogroup"] > label:has(input:checked) {
         background-color: #4e8df5;
         color: white;
     }
@@ -54,139 +77,320 @@ st.markdown("""
 st.title("📊 Supply Chain Analytics Dashboard")
 st.markdown("Visualisasi data supply chain untuk melihat tren penjualan, profitabilitas, dan performa pengiriman.")
 
-# Function to load data
-@st.cache_data
+# Opt-in timing, rows and peak memory per section of this rerun (DASHBOARD_PROFILE)
+profiler = SectionProfiler()
+
+# Source data file
+DATA_FILE = 'incom2024_delay_example_dataset.csv'
+
+# 'memory' loads the whole dataset; 'chunked' streams it into partitioned Parquet for files larger than RAM
+INGEST_MODE = os.environ.get('DASHBOARD_INGEST_MODE', 'memory')
+
+# Process-wide live handle on the data file; rows appended to it are picked up incrementally
+@st.cache_resource
+def get_live_dataset():
+    return LiveDataset(DATA_FILE, mode=INGEST_MODE)
+
+# Cold start: the dataset loads in a background thread, once per process
+@st.cache_resource
+def start_warmup():
+    warmup = threading.Thread(target=get_live_dataset().current, daemon=True)
+    warmup.start()
+    return warmup
+
+# Tooltip for a distinct count that came from a sketch
+def estimate_help(error):
+    return f"Estimasi HyperLogLog (galat standar ±{error:.1%})" if error else None
+
+def kpi_delta(current, previous, measure):
+    if previous is None or not previous[measure]:
+        return None
+    return f"{(current[measure] - previous[measure]) / abs(previous[measure]):+.1%}"
+
+# Default view of the opening tab from the startup snapshot, shown until the dataset is loaded
+def render_startup_snapshot(startup, warmup):
+    st.sidebar.header("Filter Data")
+    st.sidebar.caption("Filter tersedia setelah data selesai dimuat.")
+    st.info(f"Menampilkan ringkasan tersimpan ({startup['rows']:,} baris, filter default); data lengkap sedang dimuat...")
+    st.header(startup['tab'])
+    
+    metrics, previous = startup['metrics'], startup['previous_metrics']
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if 'sales' in metrics:
+            st.metric("Total Penjualan", f"${metrics['sales']:,.2f}", delta=kpi_delta(metrics, previous, 'sales'))
+    with col2:
+        if 'order_profit_per_order' in metrics:
+            st.metric("Total Profit", f"${metrics['order_profit_per_order']:,.2f}", delta=kpi_delta(metrics, previous, 'order_profit_per_order'))
+    with col3:
+        if startup['orders'] is not None:
+            st.metric("Jumlah Pesanan", f"{startup['orders'][0]:,}", help=estimate_help(startup['orders'][1]))
+    with col4:
+        if 'order_item_quantity' in metrics:
+            st.metric("Total Items Terjual", f"{metrics['order_item_quantity']:,}", delta=kpi_delta(metrics, previous, 'order_item_quantity'))
+    
+    # The trend across the page, the other charts in pairs, as in the tab itself
+    figures = list(startup['figures'].values())
+    if figures:
+        st.plotly_chart(figures[0], use_container_width=True)
+    for pair in range(1, len(figures), 2):
+        for col, figure in zip(st.columns(2), figures[pair:pair + 2]):
+            with col:
+                st.plotly_chart(figure, use_container_width=True)
+    
+    # Rerun the whole page once the background load has finished
+    if hasattr(st, 'fragment'):
+        @st.fragment(run_every=1)
+        def wait_for_dataset():
+            if not warmup.is_alive():
+                st.rerun()
+        wait_for_dataset()
+
+# Before the first load in this process, serve the startup snapshot while the data loads
+if get_live_dataset().snapshot is None:
+    startup = read_startup_snapshot(DATA_FILE)
+    if startup is not None:
+        warmup = start_warmup()
+        if warmup.is_alive():
+            with profiler.section("startup_snapshot", rows=startup['rows']):
+                render_startup_snapshot(startup, warmup)
+            profiler.write()
+            st.stop()
+
+# Function to load data: one read-only snapshot per dataset version, shared by all sessions
 def load_data():
     try:
-        df = pd.read_csv('incom2024_delay_example_dataset.csv')
-        
-        # Convert date columns to datetime
-        df["shipping_date"], df["order_date"] = df["shipping_date"].str[:10], df["shipping_date"].str[:10]
-        df["shipping_date"], df["order_date"] = pd.to_datetime(df["shipping_date"], format='%Y-%m-%d'), pd.to_datetime(df["order_date"], format='%Y-%m-%d')
-        
-        return df
+        return get_live_dataset().current()
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
 
 # Load data
-df = load_data()
+with profiler.section("load", rows=lambda: dataset.store.count() if dataset is not None else None):
+    dataset = load_data()
 
 # Check if data is loaded
-if df is None:
+if dataset is None:
     st.error("Tidak dapat memuat data. Silakan periksa file data Anda.")
     st.stop()
 
+# Filters and aggregations on the shared, read-only snapshot (analytics.Analytics), one per
+# dataset version; chart aggregations run on the DASHBOARD_QUERY_BACKEND engine
+@st.cache_resource(max_entries=1)
+def get_queries(version):
+    queries = Analytics(dataset, open_backend(QUERY_BACKEND, dataset))
+    # Default view for the next cold start, written in the background once per dataset version
+    threading.Thread(target=write_startup_snapshot, args=(queries, DATA_FILE), daemon=True).start()
+    return queries
+
+data_version = dataset.version
+with profiler.section("backend"):
+    queries = get_queries(data_version)
+columns = queries.columns
+
 # Sidebar for filters
 st.sidebar.header("Filter Data")
 
+# Active filters, as keyword arguments for the queries
+selection = {}
+
 # Date range filter
-if 'order_date' in df.columns:
-    min_date = df['order_date'].min().date()
-    max_date = df['order_date'].max().date()
-    
-    date_range = st.sidebar.date_input(
-        "Periode Waktu",
-        value=(min_date, max_date),
-        min_value=min_date,
-        max_value=max_date
-    )
+with profiler.section("filter:order_date", rows=lambda: queries.count(**selection)):
+    if 'order_date' in columns:
+        min_date, max_date = queries.date_bounds()
+    
+        date_range = st.sidebar.date_input(
+            "Periode Waktu",
+            value=(min_date, max_date),
+            min_value=min_date,
+            max_value=max_date
+        )
     
-    if len(date_range) == 2:
-        start_date, end_date = date_range
-        filtered_df = df[(df['order_date'].dt.date >= start_date) & 
-                        (df['order_date'].dt.date <= end_date)]
-    else:
-        filtered_df = df
-else:
-    filtered_df = df
+        if len(date_range) == 2:
+            selection['date_range'] = date_range
 
 # Market filter
-if 'market' in df.columns:
-    all_markets = ['All'] + sorted(filtered_df['market'].unique().tolist())
-    selected_market = st.sidebar.selectbox("Market", all_markets)
+with profiler.section("filter:market", rows=lambda: queries.count(**selection)):
+    if 'market' in columns:
+        all_markets = ['All'] + queries.options('market', **selection)
+        selected_market = st.sidebar.selectbox("Market", all_markets)
     
-    if selected_market != 'All':
-        filtered_df = filtered_df[filtered_df['market'] == selected_market]
+        if selected_market != 'All':
+            selection['market'] = selected_market
 
 # Region filter
-if 'order_region' in df.columns:
-    all_regions = ['All'] + sorted(filtered_df['order_region'].unique().tolist())
-    selected_region = st.sidebar.selectbox("Region", all_regions)
+with profiler.section("filter:order_region", rows=lambda: queries.count(**selection)):
+    if 'order_region' in columns:
+        all_regions = ['All'] + queries.options('order_region', **selection)
+        selected_region = st.sidebar.selectbox("Region", all_regions)
     
-    if selected_region != 'All':
-        filtered_df = filtered_df[filtered_df['order_region'] == selected_region]
+        if selected_region != 'All':
+            selection['order_region'] = selected_region
 
 # Customer segment filter
-if 'customer_segment' in df.columns:
-    all_segments = ['All'] + sorted(filtered_df['customer_segment'].unique().tolist())
-    selected_segment = st.sidebar.selectbox("Customer Segment", all_segments)
+with profiler.section("filter:customer_segment", rows=lambda: queries.count(**selection)):
+    if 'customer_segment' in columns:
+        all_segments = ['All'] + queries.options('customer_segment', **selection)
+        selected_segment = st.sidebar.selectbox("Customer Segment", all_segments)
     
-    if selected_segment != 'All':
-        filtered_df = filtered_df[filtered_df['customer_segment'] == selected_segment]
+        if selected_segment != 'All':
+            selection['customer_segment'] = selected_segment
 
 # Product category filter
-if 'category_name' in df.columns:
-    all_categories = ['All'] + sorted(filtered_df['category_name'].unique().tolist())
-    selected_category = st.sidebar.selectbox("Product Category", all_categories)
+with profiler.section("filter:category_name", rows=lambda: queries.count(**selection)):
+    if 'category_name' in columns:
+        all_categories = ['All'] + queries.options('category_name', **selection)
+        selected_category = st.sidebar.selectbox("Product Category", all_categories)
     
-    if selected_category != 'All':
-        filtered_df = filtered_df[filtered_df['category_name'] == selected_category]
+        if selected_category != 'All':
+            selection['category_name'] = selected_category
+
+# Length of the top-K rankings (customers, regions)
+top_n = st.sidebar.slider("Jumlah Top-K", min_value=5, max_value=50, value=TOP_K, key="top_k")
+
+# Partial reruns need st.fragment (Streamlit >= 1.37); older versions rerun the whole page
+fragment = getattr(st, 'fragment', lambda func: func)
+
+n_selected = queries.count(**selection)
+
+# Render a chart, refusing ones that would send more than DASHBOARD_MAX_CHART_POINTS points
+def show_chart(fig, name):
+    with profiler.section(f"serialize:{name}", rows=lambda: chart_points(fig)):
+        try:
+            st.plotly_chart(check_chart(fig), use_container_width=True)
+        except ChartTooLarge as e:
+            st.warning(f"Grafik tidak ditampilkan karena datanya terlalu besar: {e}")
+
+# Process-wide LRU cache of aggregation results, bounded by DASHBOARD_AGG_CACHE_MB
+@st.cache_resource
+def get_aggregation_cache():
+    return AggregationCache()
+
+aggregation_cache = get_aggregation_cache()
+
+# Aggregations are cached per (dataset version, filter state): only the visible
+# section computes anything, and switching back to a section reuses its results.
+# Cached results are shared between sessions, so callers must not modify them.
+
+# Profiled aggregations are named after their arguments past (version, filters); cache hits are timed too
+def profiled(func):
+    name = func.__name__.removeprefix('cached_')
+    return profiler.timed(f"aggregate:{name}", rows=n_selected, skip=2)(func)
+
+@profiled
+@aggregation_cache.memoize
+def cached_rollup(version, filters, by, measure):
+    return queries.rollup(by, measure, **filters)
+
+@profiled
+@aggregation_cache.memoize
+def cached_rollup_mean(version, filters, by, measure):
+    return queries.rollup_mean(by, measure, **filters)
+
+@profiled
+@aggregation_cache.memoize
+def cached_distinct_count(version, filters, column):
+    return queries.distinct_count(column, **filters)
 
-# Create tabs for different dashboard sections
-tab1, tab2, tab3, tab4 = st.tabs(["Performa Penjualan", "Analisis Pelanggan", "Performa Pengiriman", "Detail Data"])
+@profiled
+@aggregation_cache.memoize
+def cached_delivery_performance(version, filters):
+    return queries.delivery_performance(**filters)
+
+@profiled
+@aggregation_cache.memoize
+def cached_top_customers(version, filters, k):
+    return queries.top_customers(k, **filters)
+
+# Date-range totals of the additive measures: two lookups in the per-day prefix index
+@profiler.timed("aggregate:kpi_totals", rows=n_selected, skip=1)
+def kpi_totals(filters):
+    return queries.kpi_totals(**filters)
+
+# Totals over the same-length period just before the selected date range, for metric deltas
+@profiler.timed("aggregate:previous_kpi_totals", skip=1)
+def previous_kpi_totals(filters):
+    return queries.previous_kpi_totals(**filters)
+
+@profiled
+@aggregation_cache.memoize
+def cached_trend(version, filters, measure, resolution, downsample):
+    # Only a manually chosen fine resolution can exceed the point budget; LTTB then keeps its shape, if enabled
+    return queries.trend(measure, resolution, downsample=downsample, **filters)
+
+@profiled
+@aggregation_cache.memoize
+def cached_histogram(version, filters, column, nbins=30):
+    return queries.histogram(column, nbins, **filters)
+
+@profiled
+@aggregation_cache.memoize
+def cached_statistics(version, filters):
+    # Measure columns only (IDs and codes are left out); large selections merge per-partition summaries
+    return queries.statistics(**filters)
+
+# Trend chart resolutions; None picks one from the selected date span
+TREND_RESOLUTIONS = {"Otomatis": None, "Harian": 'day', "Mingguan": 'week', "Bulanan": 'month'}
+
+# Build a chart with the shared figure code (analytics.figures) and render it
+def draw_chart(name, build, *args):
+    with profiler.section(f"figure:{name}"):
+        fig = build(*args)
+    show_chart(fig, name)
 
 # Tab 1: Sales Performance
-with tab1:
+def render_sales_performance():
     st.header("Performa Penjualan")
     
-    # Key metrics row
+    # Key metrics row, with the change against the previous period of the same length
+    kpis = kpi_totals(selection)
+    previous_kpis = previous_kpi_totals(selection)
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        if 'sales' in df.columns:
-            total_sales = filtered_df['sales'].sum()
-            st.metric("Total Penjualan", f"${total_sales:,.2f}")
+        if 'sales' in columns:
+            total_sales = kpis['sales']
+            st.metric("Total Penjualan", f"${total_sales:,.2f}", delta=kpi_delta(kpis, previous_kpis, 'sales'))
         else:
             st.metric("Total Penjualan", "Data tidak tersedia")
     
     with col2:
-        if 'order_profit_per_order' in df.columns:
-            total_profit = filtered_df['order_profit_per_order'].sum()
-            st.metric("Total Profit", f"${total_profit:,.2f}")
+        if 'order_profit_per_order' in columns:
+            total_profit = kpis['order_profit_per_order']
+            st.metric("Total Profit", f"${total_profit:,.2f}", delta=kpi_delta(kpis, previous_kpis, 'order_profit_per_order'))
         else:
             st.metric("Total Profit", "Data tidak tersedia")
     
     with col3:
-        if 'order_id' in df.columns:
-            total_orders = filtered_df['order_id'].nunique()
-            st.metric("Jumlah Pesanan", f"{total_orders:,}")
+        if 'order_id' in columns:
+            total_orders, orders_error = cached_distinct_count(data_version, selection, 'order_id')
+            st.metric("Jumlah Pesanan", f"{total_orders:,}", help=estimate_help(orders_error))
         else:
             st.metric("Jumlah Pesanan", "Data tidak tersedia")
     
     with col4:
-        if 'order_item_quantity' in df.columns:
-            total_items = filtered_df['order_item_quantity'].sum()
-            st.metric("Total Items Terjual", f"{total_items:,}")
+        if 'order_item_quantity' in columns:
+            total_items = kpis['order_item_quantity']
+            st.metric("Total Items Terjual", f"{total_items:,}", delta=kpi_delta(kpis, previous_kpis, 'order_item_quantity'))
         else:
             st.metric("Total Items Terjual", "Data tidak tersedia")
     
     st.subheader("Tren Penjualan")
     
+    # Trend resolution: picked from the selected date span unless chosen manually
+    resolution_choice = st.selectbox("Resolusi Tren", list(TREND_RESOLUTIONS), key="trend_resolution")
+    resolution = TREND_RESOLUTIONS[resolution_choice]
+    if resolution is None:
+        resolution = queries.trend_resolution(selection.get('date_range'))
+    # Long fine-grained trends are reduced to the point budget unless switched off; the chart title says so
+    downsample = st.checkbox(
+        "Sederhanakan tren panjang (LTTB)", value=True, key="trend_downsample",
+        help=f"Tren dengan lebih dari {TREND_MAX_POINTS:,} titik digambar dengan {TREND_MAX_POINTS:,} titik yang menjaga bentuk garis.",
+    )
+    
     # Sales trend over time
-    if 'order_date' in df.columns and 'sales' in df.columns:
-        sales_over_time = filtered_df.groupby(filtered_df['order_date'].dt.date)['sales'].sum().reset_index()
-        sales_over_time.columns = ['Date', 'Sales']
-        
-        fig_sales = px.line(
-            sales_over_time, 
-            x='Date', 
-            y='Sales',
-            title='Penjualan Harian',
-            labels={'Sales': 'Penjualan ($)', 'Date': 'Tanggal'},
-        )
-        fig_sales.update_layout(height=400)
-        st.plotly_chart(fig_sales, use_container_width=True)
+    if 'order_date' in columns and 'sales' in columns:
+        draw_chart("sales", sales_trend_figure, cached_trend(data_version, selection, 'sales', resolution, downsample), resolution)
     else:
         st.warning("Data yang diperlukan untuk tren penjualan tidak tersedia.")
     
@@ -194,41 +398,14 @@ with tab1:
     col1, col2 = st.columns(2)
     
     with col1:
-        if 'category_name' in df.columns and 'sales' in df.columns:
-            sales_by_category = filtered_df.groupby('category_name')['sales'].sum().reset_index()
-            sales_by_category = sales_by_category.sort_values('sales', ascending=False)
-            
-            fig_category = px.bar(
-                sales_by_category,
-                x='category_name',
-                y='sales',
-                title='Penjualan berdasarkan Kategori Produk',
-                labels={'sales': 'Penjualan ($)', 'category_name': 'Kategori Produk'},
-                color='sales',
-                color_continuous_scale=px.colors.sequential.Blues,
-            )
-            fig_category.update_layout(height=400)
-            st.plotly_chart(fig_category, use_container_width=True)
+        if 'category_name' in columns and 'sales' in columns:
+            draw_chart("category", category_sales_figure, cached_rollup(data_version, selection, 'category_name', 'sales'))
         else:
             st.warning("Data yang diperlukan untuk penjualan berdasarkan kategori tidak tersedia.")
     
     with col2:
-        if 'order_region' in df.columns and 'sales' in df.columns:
-            sales_by_region = filtered_df.groupby('order_region')['sales'].sum().reset_index()
-            sales_by_region = sales_by_region.sort_values('sales', ascending=False).head(10)
-            
-            fig_region = px.bar(
-                sales_by_region,
-                x='sales',
-                y='order_region',
-                title='Top 10 Region berdasarkan Penjualan',
-                labels={'sales': 'Penjualan ($)', 'order_region': 'Region'},
-                orientation='h',
-                color='sales',
-                color_continuous_scale=px.colors.sequential.Blues,
-            )
-            fig_region.update_layout(height=400)
-            st.plotly_chart(fig_region, use_container_width=True)
+        if 'order_region' in columns and 'sales' in columns:
+            draw_chart("region", region_sales_figure, cached_rollup(data_version, selection, 'order_region', 'sales'), top_n)
         else:
             st.warning("Data yang diperlukan untuk penjualan berdasarkan region tidak tersedia.")
     
@@ -238,312 +415,218 @@ with tab1:
     col1, col2 = st.columns(2)
     
     with col1:
-        if 'order_profit_per_order' in df.columns and 'order_date' in df.columns:
-            profit_over_time = filtered_df.groupby(filtered_df['order_date'].dt.date)['order_profit_per_order'].sum().reset_index()
-            profit_over_time.columns = ['Date', 'Profit']
-            
-            fig_profit = px.line(
-                profit_over_time, 
-                x='Date', 
-                y='Profit',
-                title='Tren Profit Harian',
-                labels={'Profit': 'Profit ($)', 'Date': 'Tanggal'},
-            )
-            fig_profit.update_layout(height=400)
-            st.plotly_chart(fig_profit, use_container_width=True)
+        if 'order_profit_per_order' in columns and 'order_date' in columns:
+            profit_over_time = cached_trend(data_version, selection, 'order_profit_per_order', resolution, downsample)
+            draw_chart("profit", profit_trend_figure, profit_over_time, resolution)
         else:
             st.warning("Data yang diperlukan untuk tren profit tidak tersedia.")
     
     with col2:
-        if 'shipping_mode' in df.columns and 'order_profit_per_order' in df.columns:
-            profit_by_shipping = filtered_df.groupby('shipping_mode')['order_profit_per_order'].sum().reset_index()
-            profit_by_shipping = profit_by_shipping.sort_values('order_profit_per_order', ascending=False)
-            
-            fig_shipping_profit = px.pie(
-                profit_by_shipping,
-                values='order_profit_per_order',
-                names='shipping_mode',
-                title='Profit berdasarkan Mode Pengiriman',
-                hole=0.4,
-                labels={'order_profit_per_order': 'Profit ($)', 'shipping_mode': 'Mode Pengiriman'},
-            )
-            fig_shipping_profit.update_layout(height=400)
-            st.plotly_chart(fig_shipping_profit, use_container_width=True)
+        if 'shipping_mode' in columns and 'order_profit_per_order' in columns:
+            profit_by_shipping = cached_rollup(data_version, selection, 'shipping_mode', 'order_profit_per_order')
+            draw_chart("shipping_profit", shipping_profit_figure, profit_by_shipping)
         else:
             st.warning("Data yang diperlukan untuk profit berdasarkan mode pengiriman tidak tersedia.")
 
 # Tab 2: Customer Analysis
-with tab2:
+def render_customer_analysis():
     st.header("Analisis Pelanggan")
     
+    if 'customer_id' in columns:
+        total_customers, customers_error = cached_distinct_count(data_version, selection, 'customer_id')
+        st.metric("Jumlah Pelanggan", f"{total_customers:,}", help=estimate_help(customers_error))
+    
     # Customer segmentation
     col1, col2 = st.columns(2)
     
     with col1:
-        if 'customer_segment' in df.columns and 'sales' in df.columns:
-            sales_by_segment = filtered_df.groupby('customer_segment')['sales'].sum().reset_index()
-            
-            fig_segment = px.pie(
-                sales_by_segment,
-                values='sales',
-                names='customer_segment',
-                title='Penjualan berdasarkan Segmen Pelanggan',
-                hole=0.4,
-                labels={'sales': 'Penjualan ($)', 'customer_segment': 'Segmen Pelanggan'},
-            )
-            fig_segment.update_layout(height=400)
-            st.plotly_chart(fig_segment, use_container_width=True)
+        if 'customer_segment' in columns and 'sales' in columns:
+            draw_chart("segment", segment_sales_figure, cached_rollup(data_version, selection, 'customer_segment', 'sales'))
         else:
             st.warning("Data yang diperlukan untuk analisis segmen pelanggan tidak tersedia.")
     
     with col2:
-        if 'sales_per_customer' in df.columns and 'customer_segment' in df.columns:
-            avg_sales_by_segment = filtered_df.groupby('customer_segment')['sales_per_customer'].mean().reset_index()
-            
-            fig_avg_sales = px.bar(
-                avg_sales_by_segment,
-                x='customer_segment',
-                y='sales_per_customer',
-                title='Rata-rata Penjualan per Segmen Pelanggan',
-                labels={'sales_per_customer': 'Rata-rata Penjualan ($)', 'customer_segment': 'Segmen Pelanggan'},
-                color='sales_per_customer',
-                color_continuous_scale=px.colors.sequential.Viridis,
-            )
-            fig_avg_sales.update_layout(height=400)
-            st.plotly_chart(fig_avg_sales, use_container_width=True)
+        if 'sales_per_customer' in columns and 'customer_segment' in columns:
+            avg_sales_by_segment = cached_rollup_mean(data_version, selection, 'customer_segment', 'sales_per_customer')
+            draw_chart("avg_sales", segment_average_sales_figure, avg_sales_by_segment)
         else:
             st.warning("Data yang diperlukan untuk rata-rata penjualan per segmen tidak tersedia.")
     
     # Geographic analysis
     st.subheader("Analisis Geografis")
     
-    if 'customer_country' in df.columns and 'sales' in df.columns:
-        sales_by_country = filtered_df.groupby('customer_country')['sales'].sum().reset_index()
-        sales_by_country = sales_by_country.sort_values('sales', ascending=False)
-        
-        fig_country = px.choropleth(
-            sales_by_country,
-            locations='customer_country',
-            locationmode='country names',
-            color='sales',
-            hover_name='customer_country',
-            title='Penjualan berdasarkan Negara',
-            color_continuous_scale=px.colors.sequential.Plasma,
-        )
-        fig_country.update_layout(height=500)
-        st.plotly_chart(fig_country, use_container_width=True)
+    if 'customer_country' in columns and 'sales' in columns:
+        draw_chart("country", country_sales_figure, cached_rollup(data_version, selection, 'customer_country', 'sales'))
     else:
         st.warning("Data yang diperlukan untuk analisis geografis tidak tersedia.")
     
     # Top customers
-    if 'customer_id' in df.columns and 'sales' in df.columns:
-        top_customers = filtered_df.groupby('customer_id')['sales'].sum().reset_index()
-        top_customers = top_customers.sort_values('sales', ascending=False).head(10)
-        top_customers['customer_id'] = top_customers['customer_id'].astype(str)
-        
-        fig_top_customers = px.bar(
-            top_customers,
-            x='customer_id',
-            y='sales',
-            title='Top 10 Pelanggan berdasarkan Penjualan',
-            labels={'sales': 'Penjualan ($)', 'customer_id': 'ID Pelanggan'},
-            color='sales',
-            color_continuous_scale=px.colors.sequential.Greens,
-        )
-        fig_top_customers.update_layout(height=400)
-        st.plotly_chart(fig_top_customers, use_container_width=True)
+    if 'customer_id' in columns and 'sales' in columns:
+        draw_chart("top_customers", top_customers_figure, cached_top_customers(data_version, selection, top_n), top_n)
     else:
         st.warning("Data yang diperlukan untuk analisis top pelanggan tidak tersedia.")
 
 # Tab 3: Shipping Performance
-with tab3:
+def render_shipping_performance():
     st.header("Performa Pengiriman")
     
     # Delivery status analysis
     col1, col2 = st.columns(2)
     
     with col1:
-        if 'label' in df.columns:
-            # Convert label values to descriptive text
-            delivery_status = filtered_df['label'].map({-1: 'Early Arrival', 0: 'On Time', 1: 'Delayed'}).value_counts().reset_index()
-            delivery_status.columns = ['Status', 'Count']
-            
-            fig_delivery = px.pie(
-                delivery_status,
-                values='Count',
-                names='Status',
-                title='Status Pengiriman',
-                hole=0.4,
-                color_discrete_map={'Early Arrival': '#28a745', 'On Time': '#17a2b8', 'Delayed': '#dc3545'},
-            )
-            fig_delivery.update_layout(height=400)
-            st.plotly_chart(fig_delivery, use_container_width=True)
+        if 'label' in columns:
+            draw_chart("delivery", delivery_status_figure, kpi_totals(selection))
         else:
             st.warning("Data yang diperlukan untuk status pengiriman tidak tersedia.")
     
     with col2:
-        if 'shipping_mode' in df.columns:
-            shipping_mode_counts = filtered_df['shipping_mode'].value_counts().reset_index()
-            shipping_mode_counts.columns = ['Shipping Mode', 'Count']
-            
-            fig_shipping_mode = px.bar(
-                shipping_mode_counts,
-                x='Shipping Mode',
-                y='Count',
-                title='Jumlah Pesanan berdasarkan Mode Pengiriman',
-                labels={'Count': 'Jumlah Pesanan', 'Shipping Mode': 'Mode Pengiriman'},
-                color='Count',
-                color_continuous_scale=px.colors.sequential.Oranges,
-            )
-            fig_shipping_mode.update_layout(height=400)
-            st.plotly_chart(fig_shipping_mode, use_container_width=True)
+        if 'shipping_mode' in columns:
+            draw_chart("shipping_mode", shipping_mode_figure, cached_rollup(data_version, selection, 'shipping_mode', 'rows'))
         else:
             st.warning("Data yang diperlukan untuk mode pengiriman tidak tersedia.")
     
     # Shipping time analysis
-    if 'order_date' in df.columns and 'shipping_date' in df.columns:
-        filtered_df['shipping_time'] = (filtered_df['shipping_date'] - filtered_df['order_date']).dt.days
-        
+    if 'order_date' in columns and 'shipping_date' in columns:
         st.subheader("Analisis Waktu Pengiriman")
         
         col1, col2 = st.columns(2)
         
         with col1:
-            avg_shipping_time = filtered_df.groupby('shipping_mode')['shipping_time'].mean().reset_index()
-            avg_shipping_time = avg_shipping_time.sort_values('shipping_time')
-            
-            fig_shipping_time = px.bar(
-                avg_shipping_time,
-                x='shipping_mode',
-                y='shipping_time',
-                title='Rata-rata Waktu Pengiriman berdasarkan Mode',
-                labels={'shipping_time': 'Rata-rata Waktu (hari)', 'shipping_mode': 'Mode Pengiriman'},
-                color='shipping_time',
-                color_continuous_scale=px.colors.sequential.Purples,
-            )
-            fig_shipping_time.update_layout(height=400)
-            st.plotly_chart(fig_shipping_time, use_container_width=True)
+            avg_shipping_time = cached_rollup_mean(data_version, selection, 'shipping_mode', 'shipping_time')
+            draw_chart("shipping_time", shipping_time_figure, avg_shipping_time)
         
         with col2:
-            if 'market' in df.columns:
-                avg_shipping_by_market = filtered_df.groupby('market')['shipping_time'].mean().reset_index()
-                avg_shipping_by_market = avg_shipping_by_market.sort_values('shipping_time', ascending=False)
-                
-                fig_market_time = px.bar(
-                    avg_shipping_by_market,
-                    x='market',
-                    y='shipping_time',
-                    title='Rata-rata Waktu Pengiriman berdasarkan Market',
-                    labels={'shipping_time': 'Rata-rata Waktu (hari)', 'market': 'Market'},
-                    color='shipping_time',
-                    color_continuous_scale=px.colors.sequential.Purples,
-                )
-                fig_market_time.update_layout(height=400)
-                st.plotly_chart(fig_market_time, use_container_width=True)
+            if 'market' in columns:
+                avg_shipping_by_market = cached_rollup_mean(data_version, selection, 'market', 'shipping_time')
+                draw_chart("market_time", market_shipping_time_figure, avg_shipping_by_market)
             else:
                 st.warning("Data yang diperlukan untuk analisis waktu pengiriman berdasarkan market tidak tersedia.")
         
-        # Distribution of shipping times
-        fig_hist = px.histogram(
-            filtered_df,
-            x='shipping_time',
-            nbins=30,
-            title='Distribusi Waktu Pengiriman',
-            labels={'shipping_time': 'Waktu Pengiriman (hari)', 'count': 'Jumlah Pesanan'},
-            color_discrete_sequence=['#6c5ce7'],
-        )
-        fig_hist.update_layout(height=400)
-        st.plotly_chart(fig_hist, use_container_width=True)
+        # Distribution of shipping times, binned on the server
+        draw_chart("hist", shipping_time_histogram_figure, cached_histogram(data_version, selection, 'shipping_time'))
     else:
         st.warning("Data yang diperlukan untuk analisis waktu pengiriman tidak tersedia.")
     
     # Delivery performance by region
-    if 'label' in df.columns and 'order_region' in df.columns:
+    if 'label' in columns and 'order_region' in columns:
         st.subheader("Performa Pengiriman berdasarkan Region")
         
-        # Create a pivot table for delivery status by region
-        delivery_by_region = pd.crosstab(
-            filtered_df['order_region'], 
-            filtered_df['label'].map({-1: 'Early Arrival', 0: 'On Time', 1: 'Delayed'})
-        ).reset_index()
-        
-        # Melt the dataframe for plotting
-        delivery_by_region_melted = pd.melt(
-            delivery_by_region, 
-            id_vars=['order_region'], 
-            var_name='Status', 
-            value_name='Count'
-        )
-        
-        # Calculate the total orders per region for percentage calculation
-        region_totals = delivery_by_region_melted.groupby('order_region')['Count'].sum().reset_index()
-        region_totals.columns = ['order_region', 'Total']
-        
-        # Merge the total back into the melted dataframe
-        delivery_by_region_melted = pd.merge(delivery_by_region_melted, region_totals, on='order_region')
+        delivery_counts = cached_delivery_performance(data_version, selection)
+        draw_chart("region_delivery", region_delivery_figure, delivery_counts)
         
-        # Calculate percentage
-        delivery_by_region_melted['Percentage'] = delivery_by_region_melted['Count'] / delivery_by_region_melted['Total'] * 100
+        # Delay breakdown for any other dimension
+        st.subheader("Rincian Keterlambatan per Dimensi")
         
-        # Sort by delayed percentage
-        top_regions = delivery_by_region_melted[delivery_by_region_melted['Status'] == 'Delayed'].sort_values('Percentage', ascending=False).head(10)
-        regions_to_plot = top_regions['order_region'].unique()
-        
-        plot_data = delivery_by_region_melted[delivery_by_region_melted['order_region'].isin(regions_to_plot)]
-        
-        fig_region_delivery = px.bar(
-            plot_data,
-            x='order_region',
-            y='Percentage',
-            color='Status',
-            title='Top 10 Region dengan Persentase Keterlambatan Tertinggi',
-            labels={'Percentage': 'Persentase (%)', 'order_region': 'Region', 'Status': 'Status Pengiriman'},
-            color_discrete_map={'Early Arrival': '#28a745', 'On Time': '#17a2b8', 'Delayed': '#dc3545'},
-            barmode='group',
+        breakdown_dimensions = [dim for dim in DELAY_BREAKDOWNS if dim in delivery_counts]
+        breakdown_dim = st.selectbox(
+            "Dimensi",
+            breakdown_dimensions,
+            format_func=DELAY_BREAKDOWNS.get,
+            key="delay_dimension",
         )
-        fig_region_delivery.update_layout(height=500)
-        st.plotly_chart(fig_region_delivery, use_container_width=True)
+        draw_chart("breakdown", delay_breakdown_figure, delivery_counts, breakdown_dim)
     else:
         st.warning("Data yang diperlukan untuk analisis performa pengiriman berdasarkan region tidak tersedia.")
 
 # Tab 4: Data Detail
-with tab4:
+def render_data_detail():
     st.header("Detail Data")
     
     # Show data statistics
     st.subheader("Statistik Data")
     
-    # Select columns for statistics based on data types
-    numeric_cols = filtered_df.select_dtypes(include=['number']).columns.tolist()
+    stats_df, stats_estimated = cached_statistics(data_version, selection)
     
-    if numeric_cols:
-        stats_df = filtered_df[numeric_cols].describe().T
-        stats_df = stats_df.reset_index()
-        stats_df.columns = ['Metric'] + list(stats_df.columns[1:])
-        st.dataframe(stats_df, use_container_width=True)
+    if stats_df is not None:
+        with profiler.section("serialize:statistics", rows=len(stats_df)):
+            st.dataframe(stats_df, use_container_width=True)
+        if stats_estimated:
+            st.caption("Kuartil diestimasi dari t-digest per partisi; statistik lainnya eksak.")
     else:
         st.warning("Tidak ada kolom numerik untuk ditampilkan statistiknya.")
     
+    # Memory footprint of the compact dtype schema
+    memory_df = load_memory_report(DATA_FILE)
+    if memory_df is not None:
+        with st.expander("Penggunaan Memori Dataset"):
+            bytes_before = memory_df['bytes_before'].sum()
+            bytes_after = memory_df['bytes_after'].sum()
+            st.write(f"Sebelum: {bytes_before / 1024**2:,.1f} MB | Sesudah: {bytes_after / 1024**2:,.1f} MB ({bytes_after / bytes_before:.0%})")
+            st.dataframe(memory_df, use_container_width=True)
+    
     # Raw data viewer with pagination
     st.subheader("Data Mentah")
-    
+    render_raw_data()
+
+# Paging through raw rows reruns only this fragment, not the whole page
+@fragment
+def render_raw_data():
     # Select columns to display
-    all_columns = filtered_df.columns.tolist()
+    all_columns = list(columns)
     selected_columns = st.multiselect("Pilih Kolom untuk Ditampilkan", all_columns, default=all_columns[:10])
     
+    # Sorting, through the precomputed sort index of the store
+    sort_col1, sort_col2 = st.columns([3, 1])
+    with sort_col1:
+        sort_by = st.selectbox(
+            "Urutkan berdasarkan",
+            [None] + all_columns,
+            format_func=lambda col: "(Urutan asli)" if col is None else col,
+            key="raw_sort_by",
+        )
+    with sort_col2:
+        descending = st.checkbox("Menurun", value=False, key="raw_descending", disabled=sort_by is None)
+    
     # Pagination
     page_size = st.slider("Jumlah Baris per Halaman", min_value=5, max_value=100, value=20, step=5)
-    total_pages = (len(filtered_df) - 1) // page_size + 1
+    total_pages = (n_selected - 1) // page_size + 1
     
     if total_pages > 0:
         page_num = st.number_input("Halaman", min_value=1, max_value=total_pages, value=1, step=1)
         start_idx = (page_num - 1) * page_size
-        end_idx = min(start_idx + page_size, len(filtered_df))
+        end_idx = min(start_idx + page_size, n_selected)
         
-        st.dataframe(filtered_df[selected_columns].iloc[start_idx:end_idx], use_container_width=True)
-        st.write(f"Menampilkan {start_idx+1} hingga {end_idx} dari {len(filtered_df)} baris")
+        # Read only the rows and columns of the current page
+        with profiler.section("aggregate:page", rows=n_selected):
+            page_df = queries.page(selected_columns, start_idx, end_idx, sort_by=sort_by, descending=descending, **selection)
+        with profiler.section("serialize:page", rows=len(page_df)):
+            st.dataframe(page_df, use_container_width=True)
+        st.write(f"Menampilkan {start_idx+1} hingga {end_idx} dari {n_selected} baris")
     else:
         st.write("Tidak ada data untuk ditampilkan.")
+    
+    # A fragment rerun appends its sections to the profile of the page run it belongs to
+    profiler.write()
+
+# Sections of the dashboard; only the selected one is computed and rendered
+SECTIONS = {
+    "Performa Penjualan": render_sales_performance,
+    "Analisis Pelanggan": render_customer_analysis,
+    "Performa Pengiriman": render_shipping_performance,
+    "Detail Data": render_data_detail,
+}
+
+section = st.radio("Bagian Dashboard", list(SECTIONS), horizontal=True, label_visibility="collapsed", key="section")
+with profiler.section(f"render:{section}", rows=n_selected):
+    SECTIONS[section]()
+
+# Hit/miss counters of the aggregation cache
+with st.sidebar.expander("Cache Agregasi"):
+    cache_stats = aggregation_cache.stats()
+    st.write(f"{aggregation_cache.current_bytes / 1024**2:,.1f} MB dari {aggregation_cache.max_bytes / 1024**2:,.0f} MB, {aggregation_cache.evictions:,} eviksi")
+    st.dataframe(cache_stats, use_container_width=True, hide_index=True)
+
+# Timings of this rerun, also appended to DASHBOARD_PROFILE_LOG
+if profiler.enabled:
+    profiler.write()
+    with st.sidebar.expander("Profil Rerun"):
+        st.write(f"Total {profiler.total_seconds():,.2f} detik dalam {len(profiler.records)} bagian")
+        st.dataframe(profiler.frame(), use_container_width=True, hide_index=True)
+
+# The shared dataset must come out of every rerun untouched
+if not dataset.is_unmodified():
+    st.error("Dataset bersama telah dimodifikasi oleh kode halaman. Data akan dimuat ulang.")
+    st.cache_resource.clear()
 
 # Footer
 st.markdown("---")
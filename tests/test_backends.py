@@ -0,0 +1,41 @@
+import datetime
+
+import pytest
+
+from analytics import LiveDataset, SQLBackend, compare_backends, open_backend, write_synthetic_csv
+
+# Filter states checked on every chart query: none, two partition dimensions, a date range
+SELECTIONS = [
+    {},
+    {'market': 'Europe', 'customer_segment': 'Consumer'},
+    {'date_range': (datetime.date(2015, 3, 10), datetime.date(2016, 2, 20))},
+]
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    root = tmp_path_factory.mktemp('backends')
+    return write_synthetic_csv(str(root / 'data.csv'), 20_000, seed=7), str(root / 'cache')
+
+
+@pytest.fixture(scope='module', params=['memory', 'chunked'])
+def dataset(request, source):
+    path, cache_dir = source
+    return LiveDataset(path, mode=request.param, cache_dir=cache_dir, chunksize=4_000).current()
+
+
+@pytest.mark.parametrize('backend', ['duckdb', 'sqlite'])
+def test_sql_backends_match_pandas(dataset, backend):
+    if backend == 'duckdb':
+        pytest.importorskip('duckdb')
+    reference = open_backend('pandas', dataset)
+    assert compare_backends(reference, open_backend(backend, dataset), SELECTIONS) == []
+
+
+def test_incomplete_sql_backend_fails_on_creation():
+    class NoDates(SQLBackend):
+        def execute(self, sql, params):
+            return None
+
+    with pytest.raises(TypeError):
+        NoDates([], [])
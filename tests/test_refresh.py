@@ -0,0 +1,180 @@
+import datetime
+import gc
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pytest
+
+from analytics import Analytics, LiveDataset, open_backend, synthetic_table, write_synthetic_csv
+from analytics.filters import FILTER_DIMENSIONS
+from analytics.ingest import cache_path, cache_segments
+from analytics.stats import DESCRIBE_QUANTILES
+
+ROWS = 6_000
+CHUNK_ROWS = 2_500
+
+# A market (and region) the original file does not have, brought in by the first append
+NEW_MARKET = ('Antarctica', 'Antarctic Peninsula')
+
+SELECTIONS = [
+    {},
+    {'market': NEW_MARKET[0]},
+    {'market': 'Europe', 'customer_segment': 'Consumer'},
+    {'date_range': (datetime.date(2015, 3, 10), datetime.date(2017, 2, 20))},
+]
+
+PAGE_COLUMNS = ['order_item_id', 'order_id', 'customer_id', 'sales', 'market', 'order_region', 'order_date']
+
+
+def append_rows(path, first_row, n_rows, new_market=False):
+    """Append synthetic rows to the CSV, the way the export job does (no header)."""
+    table = synthetic_table(n_rows, seed=7, first_row=first_row, n_customers=ROWS // 5)
+    if new_market:
+        every_third = np.arange(n_rows) % 3 == 0
+        for col, value in zip(['market', 'order_region'], NEW_MARKET):
+            values = np.where(every_third, value, table.column(col).to_numpy(zero_copy_only=False))
+            table = table.set_column(table.schema.get_field_index(col), col, pa.array(values))
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(table, sink, write_options=pacsv.WriteOptions(include_header=False, quoting_style='needed'))
+    with open(path, 'ab') as handle:
+        handle.write(sink.getvalue().to_pybytes())
+
+
+def rewrite_head(path):
+    """Change the first row in place: same size, different content."""
+    with open(path, 'rb') as handle:
+        data = bytearray(handle.read())
+    # The last digit of the first row's profit_per_order field
+    first_row = data.index(b'\n') + 1
+    digit = data.index(b',', data.index(b',', first_row) + 1) - 1
+    data[digit] = ord('1') if data[digit] != ord('1') else ord('2')
+    stat = os.stat(path)
+    with open(path, 'wb') as handle:
+        handle.write(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert os.path.getsize(path) == stat.st_size
+
+
+def queries(dataset):
+    return Analytics(dataset, open_backend('pandas', dataset))
+
+
+def assert_same_answers(dataset, fresh):
+    """The snapshot answers every dashboard query like a snapshot loaded from scratch."""
+    actual, expected = queries(dataset), queries(fresh)
+    for selection in SELECTIONS:
+        assert actual.count(**selection) == expected.count(**selection)
+        kpis, expected_kpis = actual.kpi_totals(**selection), expected.kpi_totals(**selection)
+        assert kpis.keys() == expected_kpis.keys()
+        for name, value in expected_kpis.items():
+            assert kpis[name] == pytest.approx(value, rel=1e-9), name
+        for dim in FILTER_DIMENSIONS:
+            assert sorted(actual.options(dim, **selection)) == sorted(expected.options(dim, **selection))
+
+        for sort_by, descending in [(None, False), ('order_item_id', True)]:
+            page = actual.page(PAGE_COLUMNS, 0, 50, sort_by, descending, **selection)
+            expected_page = expected.page(PAGE_COLUMNS, 0, 50, sort_by, descending, **selection)
+            pd.testing.assert_frame_equal(
+                page.reset_index(drop=True).astype(object),
+                expected_page.reset_index(drop=True).astype(object),
+            )
+
+        top = actual.top_customers(10, **selection)
+        expected_top = expected.top_customers(10, **selection)
+        assert list(top['customer_id']) == list(expected_top['customer_id'])
+        np.testing.assert_allclose(top['sales'], expected_top['sales'], rtol=1e-9)
+
+        # The summaries behind the Detail Data tab, whatever the size of the selection
+        stats = actual.summary_statistics.query(actual.store, **selection)
+        expected_stats = expected.summary_statistics.query(expected.store, **selection)
+        moments = ['count', 'mean', 'std', 'min', 'max']
+        np.testing.assert_allclose(stats[moments], expected_stats[moments], rtol=1e-9, equal_nan=True)
+        quartiles = [f"{q:.0%}" for q in DESCRIBE_QUANTILES]
+        spread = np.nan_to_num(expected_stats['max'] - expected_stats['min'])[:, None]
+        # t-digests built in another order agree to a small part of the value range
+        diff = np.nan_to_num(abs(stats[quartiles] - expected_stats[quartiles]).to_numpy())
+        assert (diff <= 0.02 * spread).all()
+
+
+@pytest.fixture(params=['memory', 'chunked'])
+def live(request, tmp_path):
+    path = write_synthetic_csv(str(tmp_path / 'data.csv'), ROWS, seed=7)
+    live = LiveDataset(path, mode=request.param, cache_dir=str(tmp_path / 'cache'), chunksize=CHUNK_ROWS)
+    # Warm every summary, so appends extend them instead of building them lazily
+    queries(live.current()).warm()
+    return live
+
+
+def fresh_load(live, name):
+    cache_dir = os.path.join(os.path.dirname(live.cache_dir), name)
+    return LiveDataset(live.path, mode=live.mode, cache_dir=cache_dir, chunksize=CHUNK_ROWS).current()
+
+
+def test_appended_rows_match_fresh_load(live):
+    before = live.current()
+    append_rows(live.path, ROWS, 900, new_market=True)
+    dataset = live.current()
+    assert live.last_refresh == 'appended'
+    assert dataset.summaries.built == ['customer_totals', 'summary_statistics']
+    assert NEW_MARKET[0] in queries(dataset).options('market')
+    assert_same_answers(dataset, fresh_load(live, 'fresh-1'))
+    # The earlier snapshot still answers for the rows it had
+    assert queries(before).count() == ROWS
+    assert NEW_MARKET[0] not in queries(before).options('market')
+
+    append_rows(live.path, ROWS + 900, 700)
+    dataset = live.current()
+    assert live.last_refresh == 'appended'
+    assert queries(dataset).count() == ROWS + 1_600
+    assert_same_answers(dataset, fresh_load(live, 'fresh-2'))
+
+
+def test_rewritten_file_is_rebuilt(live):
+    append_rows(live.path, ROWS, 900, new_market=True)
+    live.current()
+    rewrite_head(live.path)
+
+    dataset = live.current()
+    assert live.last_refresh == 'rewritten'
+    assert dataset.summaries.built == []
+    assert_same_answers(dataset, fresh_load(live, 'fresh'))
+
+
+def test_restart_loads_appended_cache(live):
+    append_rows(live.path, ROWS, 900, new_market=True)
+    live.current()
+    append_rows(live.path, ROWS + 900, 700)
+    live.current()
+    if live.mode == 'memory':
+        # The cache is the original file plus one segment per append
+        assert len(cache_segments(cache_path(live.path, live.cache_dir))) == 3
+
+    restarted = LiveDataset(live.path, mode=live.mode, cache_dir=live.cache_dir, chunksize=CHUNK_ROWS)
+    dataset = restarted.current()
+    assert restarted.last_refresh == 'rewritten'
+    assert queries(dataset).count() == ROWS + 1_600
+    assert_same_answers(dataset, fresh_load(live, 'fresh'))
+
+
+def test_rebuild_keeps_older_chunked_snapshots_readable(tmp_path):
+    path = write_synthetic_csv(str(tmp_path / 'data.csv'), ROWS, seed=7)
+    live = LiveDataset(path, mode='chunked', cache_dir=str(tmp_path / 'cache'), chunksize=CHUNK_ROWS)
+    old = live.current()
+    expected_page = queries(old).page(PAGE_COLUMNS, 0, 50)
+    rewrite_head(path)
+
+    dataset = live.current()
+    assert live.last_refresh == 'rewritten'
+    assert dataset.root != old.root
+    # A session still holding the old snapshot reads the files it was built from
+    pd.testing.assert_frame_equal(queries(old).page(PAGE_COLUMNS, 0, 50), expected_page)
+    assert len(old.store.read(['sales'])) == ROWS
+
+    old_root = old.root
+    del old
+    gc.collect()
+    assert not os.path.exists(old_root)
+    assert os.path.isdir(dataset.root)
@@ -0,0 +1,109 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import (
+    STATS_EXACT_ROWS,
+    Analytics,
+    FrameStore,
+    SharedDataset,
+    SummaryStatistics,
+    add_derived_columns,
+    apply_schema,
+    measure_columns,
+    synthetic_frame,
+)
+from analytics.ingest import normalize_dates
+from analytics.stats import DESCRIBE_QUANTILES, DISCRETE_MAX_VALUES
+
+# Enough rows for the whole selection to be above STATS_EXACT_ROWS, and one market below it
+ROWS = 60_000
+
+QUARTILES = [f"{q:.0%}" for q in DESCRIBE_QUANTILES]
+
+# t-digest quartiles may be off by this fraction of the interquartile range; exact counts not at all
+QUARTILE_TOLERANCE = 0.01
+
+SELECTIONS = [
+    {},
+    {'market': 'Europe'},
+    {'market': 'USCA', 'customer_segment': 'Home Office'},
+    {'date_range': (datetime.date(2015, 4, 17), datetime.date(2016, 9, 8))},
+]
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return add_derived_columns(apply_schema(normalize_dates(synthetic_frame(ROWS, seed=5))))
+
+
+@pytest.fixture(scope='module')
+def merged(frame):
+    """Summaries built from six chunks in two rounds: the second round extends the first, as an append does."""
+    stats = SummaryStatistics(measure_columns(FrameStore(frame).numeric_columns))
+    chunks = np.array_split(np.arange(ROWS), 6)
+    for rows in chunks[:3]:
+        stats.update(frame.iloc[rows])
+    stats.finish()
+    for rows in chunks[3:]:
+        stats.update(frame.iloc[rows])
+    return stats.finish()
+
+
+def assert_matches_describe(stats, discrete, described):
+    """Moments as describe() up to rounding; quartiles exact for discrete columns, within tolerance otherwise."""
+    np.testing.assert_array_equal(stats['count'], described['count'])
+    # describe() works in float32 for the float32 columns; the summaries always in float64
+    for col in ['mean', 'std', 'min', 'max']:
+        np.testing.assert_allclose(stats[col], described[col], rtol=1e-6, atol=1e-9, equal_nan=True)
+    exact = [col for col in stats.index if discrete[col]]
+    np.testing.assert_array_equal(stats.loc[exact, QUARTILES], described.loc[exact, QUARTILES])
+    estimated = [col for col in stats.index if not discrete[col]]
+    spread = (described.loc[estimated, '75%'] - described.loc[estimated, '25%']).to_numpy()[:, None]
+    error = abs(stats.loc[estimated, QUARTILES] - described.loc[estimated, QUARTILES]).to_numpy()
+    assert (error <= QUARTILE_TOLERANCE * spread).all()
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_merged_summary_matches_describe(frame, merged, selection):
+    store = FrameStore(frame)
+    described = store.read(merged.columns, **selection).describe().T
+    assert_matches_describe(merged.query(store, **selection), merged.discrete, described)
+
+
+def test_low_cardinality_columns_keep_exact_counts(merged):
+    assert merged.discrete['order_item_quantity'] and merged.discrete['order_item_discount_rate']
+    assert not merged.discrete['sales'] and not merged.discrete['latitude']
+
+
+def test_discrete_column_switches_to_digest_when_merged(frame):
+    # Each chunk alone has few enough values for exact counts; together they have too many
+    values = np.arange(ROWS) % (2 * DISCRETE_MAX_VALUES)
+    df = frame[['order_date', 'market', 'customer_segment']].assign(code=values.astype(np.float64))
+    first = df['code'] < DISCRETE_MAX_VALUES
+    for part in (df[first], df[~first]):
+        assert SummaryStatistics(['code']).update(part).finish().discrete['code']
+    stats = SummaryStatistics(['code']).update(df[first]).finish().update(df[~first]).finish()
+    assert not stats.discrete['code']
+    assert_matches_describe(stats.query(FrameStore(df)), stats.discrete, df[['code']].describe().T)
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_statistics_below_and_above_exact_rows(frame, selection):
+    queries = Analytics(SharedDataset(frame, 'test'))
+    described = queries.store.read(queries.summary_statistics.columns, **selection).describe().T
+    table, estimated = queries.statistics(**selection)
+    table = table.set_index('Metric')
+    # Small selections describe() their rows; large ones merge the summaries
+    assert estimated == (queries.count(**selection) > STATS_EXACT_ROWS)
+    if estimated:
+        assert_matches_describe(table, queries.summary_statistics.discrete, described)
+    else:
+        pd.testing.assert_frame_equal(table, described, check_names=False)
+
+
+def test_selection_sizes_span_exact_rows(frame):
+    counts = [FrameStore(frame).count(**selection) for selection in SELECTIONS]
+    assert min(counts) <= STATS_EXACT_ROWS < max(counts)
@@ -0,0 +1,74 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import FrameStore, PartitionTotals, apply_schema, add_derived_columns, synthetic_frame, top_k
+from analytics.ingest import normalize_dates
+
+ROWS = 12_000
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return add_derived_columns(apply_schema(normalize_dates(synthetic_frame(ROWS, seed=3, n_customers=800))))
+
+
+def expected_top(df, k, key='customer_id', measure='sales'):
+    """Reference answer: full groupby, then nlargest (ties keep the smaller key, as groupby sorts keys)."""
+    totals = df.groupby(key)[measure].sum().nlargest(k)
+    return totals.index.to_numpy(), totals.to_numpy()
+
+
+@pytest.mark.parametrize('k', [1, 7, 50, 200, 1_000])
+def test_top_k_matches_nlargest(k):
+    rng = np.random.default_rng(k)
+    # Small integer totals over 200 keys: many ties, and k both below and above the number of keys
+    df = pd.DataFrame({'key': rng.integers(0, 200, 3_000), 'value': rng.integers(0, 4, 3_000).astype(float)})
+    totals = df.groupby('key')['value'].sum()
+    keys, values = top_k(totals.index.to_numpy(), totals.to_numpy(), k)
+    expected_keys, expected_values = expected_top(df, k, 'key', 'value')
+    np.testing.assert_array_equal(keys, expected_keys)
+    np.testing.assert_array_equal(values, expected_values)
+
+
+def test_top_k_of_nothing():
+    keys, values = top_k(np.array([], dtype=np.int64), np.array([]), 10)
+    assert len(keys) == 0 and len(values) == 0
+
+
+@pytest.mark.parametrize('selection', [
+    {},
+    {'market': 'Europe'},
+    {'market': 'LATAM', 'customer_segment': 'Corporate'},
+    {'date_range': (datetime.date(2015, 2, 11), datetime.date(2016, 7, 3))},
+    {'date_range': (datetime.date(2015, 5, 4), datetime.date(2015, 5, 6)), 'market': 'Africa'},
+])
+@pytest.mark.parametrize('measure', ['sales', 'order_item_quantity'])
+def test_partition_totals_match_groupby(frame, selection, measure):
+    store = FrameStore(frame)
+    # Built from chunks, finished twice: the second finish merges into the existing partitions
+    chunks = np.array_split(np.arange(ROWS), 5)
+    totals = PartitionTotals.from_chunks([frame.iloc[rows] for rows in chunks[:3]], measure=measure)
+    for rows in chunks[3:]:
+        totals.update(frame.iloc[rows])
+    totals.finish()
+
+    selected = store.read(['customer_id', measure], **selection)
+    # Quantities tie a lot; 10,000 is more than the number of customers in any selection
+    for k in (10, 10_000):
+        result = totals.query(k, store, **selection)
+        expected_keys, expected_values = expected_top(selected, k, measure=measure)
+        np.testing.assert_array_equal(result['customer_id'].to_numpy(), expected_keys)
+        np.testing.assert_allclose(result[measure].to_numpy(), expected_values, rtol=1e-9)
+
+
+def test_partition_totals_of_empty_selection(frame):
+    totals = PartitionTotals.from_store(FrameStore(frame))
+    empty = (datetime.date(2030, 1, 1), datetime.date(2030, 3, 15))
+    result = totals.query(10, FrameStore(frame), date_range=empty)
+    assert list(result.columns) == ['customer_id', 'sales']
+    assert result.empty
+    # Filtering on a dimension the partitions do not have cannot be answered from them
+    assert totals.query(10, FrameStore(frame), shipping_mode='Same Day') is None